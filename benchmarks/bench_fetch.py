@@ -0,0 +1,197 @@
+"""
+bench_fetch.py
+--------------
+End-to-end throughput benchmark of `fetch_helena_sessions`.
+
+Each scenario starts the local Helena stand-in (`resultplus_reports.mock_server`)
+with a synthetic dataset and optional injected faults, then runs a full
+(non-incremental) fetch in a fresh child process pointed at it, in a
+temporary working directory. The child reports wall time and peak RSS; the
+server reports pages, records and bytes served. Results are compared with
+`benchmarks/baselines.json` to catch regressions.
+
+Usage:
+    python benchmarks/bench_fetch.py                      # default scenarios
+    python benchmarks/bench_fetch.py --scenarios 1m 10m   # large datasets
+    python benchmarks/bench_fetch.py --check              # fail on regression
+    python benchmarks/bench_fetch.py --update-baselines   # record new baselines
+
+Environment variables (optional):
+- BENCH_TOLERANCE: Allowed relative regression for --check (default: 0.25)
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(os.path.dirname(HERE), "src")
+sys.path.insert(0, SRC)
+
+from resultplus_reports.mock_server import Faults, serve  # noqa: E402
+
+BASELINES_FILE = os.path.join(HERE, "baselines.json")
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.25"))
+
+# The fetch window is the last 7 days; every dataset spans exactly that
+SPAN_DAYS = 7
+
+SCENARIOS = {
+    "10k": {"sessions": 10_000, "concurrency": 1},
+    "10k-concurrent": {"sessions": 10_000, "concurrency": 8},
+    "100k-concurrent": {"sessions": 100_000, "concurrency": 8},
+    "10k-latency": {"sessions": 10_000, "concurrency": 8, "latency": 0.02, "jitter": 0.02},
+    "10k-faults": {
+        "sessions": 10_000, "concurrency": 8,
+        "error_rate": 0.02, "throttle_rate": 0.03, "retry_after": 0,
+    },
+    "1m": {"sessions": 1_000_000, "concurrency": 8},
+    "10m": {"sessions": 10_000_000, "concurrency": 16},
+}
+DEFAULT_SCENARIOS = ("10k", "10k-concurrent", "100k-concurrent", "10k-latency", "10k-faults")
+
+_RESULT_PREFIX = "BENCH_RESULT "
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _child(concurrency):
+    """Runs one fetch in this process and prints its measurements."""
+    from resultplus_reports.fetch_result import fetch_helena_sessions
+
+    started = time.perf_counter()
+    result = fetch_helena_sessions(max_in_flight=concurrency, incremental=False)
+    wall = time.perf_counter() - started
+    print(_RESULT_PREFIX + json.dumps({
+        "records": result["count"],
+        "wall_s": wall,
+        "peak_rss_mb": _peak_rss_mb(),
+    }))
+
+
+def run_scenario(name, spec):
+    """
+    Runs a scenario against a fresh mock server.
+
+    Returns:
+        dict: `wall_s`, `pages_per_s`, `records_per_s`, `peak_rss_mb` and raw counts.
+    """
+    faults = Faults(
+        latency=spec.get("latency", 0.0),
+        jitter=spec.get("jitter", 0.0),
+        error_rate=spec.get("error_rate", 0.0),
+        throttle_rate=spec.get("throttle_rate", 0.0),
+        retry_after=spec.get("retry_after", 1),
+    )
+    server = serve(spec["sessions"], span_days=SPAN_DAYS, faults=faults)
+    try:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as workdir:
+            env = dict(
+                os.environ,
+                PYTHONPATH=os.pathsep.join(filter(None, [SRC, os.getenv("PYTHONPATH")])),
+                HELENA_API_URL=server.url,
+                HELENA_API_KEY="benchmark",
+                HELENA_CACHE="0",
+                # Measure the pipeline, not the client-side pacing
+                HELENA_RATE="10000",
+                HELENA_RATE_MAX="10000",
+                HELENA_RATE_BURST="100",
+            )
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", str(spec["concurrency"])],
+                cwd=workdir, env=env, capture_output=True, text=True,
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    lines = [l for l in proc.stdout.splitlines() if l.startswith(_RESULT_PREFIX)]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"scenario {name} failed:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+    result = json.loads(lines[-1][len(_RESULT_PREFIX):])
+    stats = server.stats
+    wall = result["wall_s"]
+    return {
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(stats["pages"] / wall, 1),
+        "records_per_s": round(result["records"] / wall, 1),
+        "peak_rss_mb": round(result["peak_rss_mb"], 1),
+        "records": result["records"],
+        "requests": stats["requests"],
+        "mb_served": round(stats["bytes"] / 1024 / 1024, 1),
+    }
+
+
+def check(name, result, baseline, tolerance=TOLERANCE):
+    """
+    Compares a result with its baseline.
+
+    Returns:
+        list[str]: Regression messages (empty when within tolerance).
+    """
+    problems = []
+    for metric in ("records_per_s", "pages_per_s"):
+        floor = baseline[metric] * (1 - tolerance)
+        if result[metric] < floor:
+            problems.append(f"{name}: {metric} {result[metric]} < {floor:.1f} (baseline {baseline[metric]})")
+    ceiling = baseline["peak_rss_mb"] * (1 + tolerance)
+    if result["peak_rss_mb"] > ceiling:
+        problems.append(f"{name}: peak_rss_mb {result['peak_rss_mb']} > {ceiling:.1f} "
+                        f"(baseline {baseline['peak_rss_mb']})")
+    return problems
+
+
+def _load_baselines():
+    if not os.path.exists(BASELINES_FILE):
+        return {}
+    with open(BASELINES_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fetch_helena_sessions against the mock API.")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(DEFAULT_SCENARIOS))
+    parser.add_argument("--check", action="store_true", help="exit 1 if a scenario regresses")
+    parser.add_argument("--update-baselines", action="store_true", help="store these results as baselines")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        return _child(args.child)
+
+    baselines = _load_baselines()
+    results = {}
+    problems = []
+    print(f"{'scenario':<18}{'wall s':>9}{'pages/s':>10}{'records/s':>12}{'RSS MB':>9}{'requests':>10}")
+    for name in args.scenarios:
+        result = results[name] = run_scenario(name, SCENARIOS[name])
+        print(f"{name:<18}{result['wall_s']:>9}{result['pages_per_s']:>10}"
+              f"{result['records_per_s']:>12}{result['peak_rss_mb']:>9}{result['requests']:>10}")
+        if name in baselines:
+            problems.extend(check(name, result, baselines[name]))
+
+    if args.update_baselines:
+        baselines.update(results)
+        with open(BASELINES_FILE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"💾 Baselines written to {BASELINES_FILE}")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if args.check and problems:
+        sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
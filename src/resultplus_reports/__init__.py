@@ -3,11 +3,31 @@ ResultPlus Reports Package
 
 Provides diagnostic scripts and utilities for interacting with the Helena CRM API,
 including data fetching, endpoint discovery, and report generation.
+
+Importing the package only loads the configuration (`.env`); submodules such
+as `fetch_result` or `generate_report` are imported on first attribute access,
+so the Google client libraries are never loaded by commands that do not use
+them. The command-line interface lives in `cli.py`.
 """
 
+import importlib
+
+from . import config
+
 __version__ = "1.0.0"
 __author__ = "Luiz Phillipe"
 __email__ = "your.email@example.com"
 
-from .fetch_result import main as fetch_result
-from .generate_report import main as generate_report
\ No newline at end of file
+config.load()
+
+
+def __getattr__(name):
+    if name == "main":
+        from .cli import main
+        return main
+    try:
+        return importlib.import_module(f".{name}", __name__)
+    except ModuleNotFoundError as e:
+        if e.name != f"{__name__}.{name}":
+            raise
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -1,11 +1,11 @@
 """
 Entry point for running ResultPlus Reports as a module.
 Example:
-    python -m resultplus_reports
+    python -m resultplus_reports fetch
+    python -m resultplus_reports report --backfill 2025-09-01 2025-09-30
 """
 
-from . import fetch_result
+from .cli import main
 
 if __name__ == "__main__":
-    print("Running ResultPlus Reports...")
-    fetch_result()
\ No newline at end of file
+    main()
@@ -0,0 +1,532 @@
+"""
+archive.py
+----------
+Memory-mapped columnar archive of historical leads.
+
+Daily `leads_*.json` files are convenient exports but poor history: any
+multi-month question means parsing dozens of pretty-printed files in full,
+and consecutive files overlap by six days. The archive stores every lead
+once, partitioned by UTC month, one file per column:
+
+- `created.i64`: creation time as int64 epoch microseconds, sorted
+  ascending, so a time range is two binary searches;
+- `status.u8`: status codes into the partition's status dictionary;
+- `<field>.off` + `<field>.heap` for the text fields (`id`, `criado_em`,
+  `ultima_mensagem`, `link_chat`): uint64 offsets into a UTF-8 string heap,
+  with an optional `<field>.nul` mask when the field has missing values.
+
+`manifest.json` lists each partition's directory, row count, time bounds and
+status dictionary. Readers prune partitions by month from the manifest and
+`mmap` column files only when first used, so a status count over a year
+reads two small fixed-width columns per month and never touches the text.
+
+Partitions are rewritten as a whole (converting merges into the existing
+month, deduplicating by `id`, last file wins) into a new directory, and the
+manifest is swapped atomically before the old directory is removed, so
+readers never see a half-written partition.
+
+`LeadArchive.summarize()` returns the same hourly-bucketed counts as
+`LeadStore.summarize()` (see `rollup.rollup_buckets`), and
+`generate_report --backfill START END --archive` builds reports from it.
+
+Usage:
+    python -m resultplus_reports.archive convert leads_*.json
+    python -m resultplus_reports.archive summary --since 2025-01-01 --by month
+    python -m resultplus_reports.archive info
+
+Environment variables (optional):
+- LEAD_ARCHIVE_DIR: Archive directory (default: archive)
+"""
+
+import argparse
+import bisect
+import glob
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .lead import Lead, epoch_us, from_epoch_us, iter_leads_from_records
+from .lead_writer import iter_lead_file
+
+ARCHIVE_DIR = os.getenv("LEAD_ARCHIVE_DIR", "archive")
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+# Text columns, stored as offsets + heap
+TEXT_FIELDS = ("id", "criado_em", "ultima_mensagem", "link_chat")
+
+_HOUR_US = 3600 * 1_000_000
+
+
+def month_key(created_us):
+    """Returns the `YYYY-MM` partition of an epoch-microsecond timestamp (UTC)."""
+    return from_epoch_us(created_us).strftime("%Y-%m")
+
+
+def _bound(value):
+    return None if value is None else epoch_us(value)
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# --- Partitions ------------------------------------------------------------------
+
+class Partition:
+    """
+    One month of leads; columns are memory-mapped on first access.
+
+    Args:
+        directory (str): Partition directory.
+        meta (dict): Partition entry from the manifest.
+    """
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.count = meta["count"]
+        self.statuses = meta["statuses"]
+        self._maps = {}
+        self._views = {}
+
+    def _view(self, file_name, typecode):
+        view = self._views.get(file_name)
+        if view is None:
+            with open(os.path.join(self.directory, file_name), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    view = memoryview(b"").cast(typecode)
+                else:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._maps[file_name] = mapped
+                    view = memoryview(mapped).cast(typecode)
+            self._views[file_name] = view
+        return view
+
+    @property
+    def created(self):
+        """Epoch microseconds per row, ascending (int64 view)."""
+        return self._view("created.i64", "q")
+
+    @property
+    def status_codes(self):
+        """Status dictionary codes per row (uint8 view)."""
+        return self._view("status.u8", "B")
+
+    def text(self, field):
+        """
+        Returns a reader for a text column.
+
+        Returns:
+            Callable[[int], str | None]: Value of row `i`.
+        """
+        offsets = self._view(f"{field}.off", "Q")
+        heap = self._view(f"{field}.heap", "B")
+        nulls = self._view(f"{field}.nul", "B") if field in self.meta["nullable"] else None
+
+        def value(i):
+            if nulls is not None and nulls[i]:
+                return None
+            return str(heap[offsets[i]:offsets[i + 1]], "utf-8")
+
+        return value
+
+    def slice(self, start_us=None, end_us=None):
+        """Returns the row range `[lo, hi)` created in `[start_us, end_us)`."""
+        if start_us is None and end_us is None:
+            return 0, self.count
+        created = self.created
+        lo = 0 if start_us is None else bisect.bisect_left(created, start_us)
+        hi = self.count if end_us is None else bisect.bisect_left(created, end_us)
+        return lo, hi
+
+    def close(self):
+        """Unmaps the column files (views still in use keep their map alive)."""
+        for view in self._views.values():
+            view.release()
+        for mapped in self._maps.values():
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # Unmapped when the last slice is garbage collected
+        self._views.clear()
+        self._maps.clear()
+
+
+def _write_text(directory, field, values):
+    encoded = [b"" if v is None else v.encode("utf-8") for v in values]
+    offsets = array("Q", [0])
+    offsets.extend(accumulate(len(v) for v in encoded))
+    with open(os.path.join(directory, f"{field}.off"), "wb") as f:
+        offsets.tofile(f)
+    with open(os.path.join(directory, f"{field}.heap"), "wb") as f:
+        f.write(b"".join(encoded))
+    if any(v is None for v in values):
+        with open(os.path.join(directory, f"{field}.nul"), "wb") as f:
+            f.write(bytes(v is None for v in values))
+        return True
+    return False
+
+
+def write_partition(directory, leads):
+    """
+    Writes a partition's column files.
+
+    Args:
+        directory (str): New, empty partition directory.
+        leads (list[Lead]): Leads of one month, sorted by `created_us`.
+
+    Returns:
+        dict: Manifest entry (without `path`).
+    """
+    statuses = list(dict.fromkeys(lead.status for lead in leads))
+    if len(statuses) > 255:
+        raise ValueError(f"Too many distinct statuses in one partition ({len(statuses)})")
+    codes = {status: code for code, status in enumerate(statuses)}
+
+    os.makedirs(directory)
+    with open(os.path.join(directory, "created.i64"), "wb") as f:
+        array("q", (lead.created_us for lead in leads)).tofile(f)
+    with open(os.path.join(directory, "status.u8"), "wb") as f:
+        f.write(bytes(codes[lead.status] for lead in leads))
+    nullable = [
+        field for field in TEXT_FIELDS
+        if _write_text(directory, field, [getattr(lead, field) for lead in leads])
+    ]
+    return {
+        "count": len(leads),
+        "min_us": leads[0].created_us,
+        "max_us": leads[-1].created_us,
+        "statuses": statuses,
+        "nullable": nullable,
+    }
+
+
+# --- Archive ---------------------------------------------------------------------
+
+class LeadArchive:
+    """
+    Month-partitioned columnar lead archive.
+
+    Example:
+        with LeadArchive() as archive:
+            archive.add(leads)
+            print(archive.summarize(start, end, by=("month", "status")))
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or ARCHIVE_DIR
+        self.manifest = self._load_manifest()
+        self._partitions = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Unmaps every open partition."""
+        for partition in self._partitions.values():
+            partition.close()
+        self._partitions.clear()
+
+    def _load_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        if not os.path.exists(path):
+            return {"version": FORMAT_VERSION, "byteorder": sys.byteorder, "partitions": {}}
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported archive version {manifest.get('version')}")
+        if manifest.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Archive was written on a {manifest.get('byteorder')}-endian host")
+        return manifest
+
+    @property
+    def months(self):
+        """Partition keys (`YYYY-MM`), oldest first."""
+        return sorted(self.manifest["partitions"])
+
+    def partition(self, month):
+        """Returns the (lazily mapped) partition of `month`."""
+        partition = self._partitions.get(month)
+        if partition is None:
+            meta = self.manifest["partitions"][month]
+            partition = Partition(os.path.join(self.directory, meta["path"]), meta)
+            self._partitions[month] = partition
+        return partition
+
+    def _scan(self, start=None, end=None, newest_first=False):
+        """Yields `(partition, lo, hi)` for partitions overlapping `[start, end)`."""
+        start_us, end_us = _bound(start), _bound(end)
+        months = self.months
+        for month in reversed(months) if newest_first else months:
+            meta = self.manifest["partitions"][month]
+            if start_us is not None and meta["max_us"] < start_us:
+                continue
+            if end_us is not None and meta["min_us"] >= end_us:
+                continue
+            partition = self.partition(month)
+            # Whole partitions inside the range need no binary search
+            lo, hi = partition.slice(
+                start_us if start_us is not None and meta["min_us"] < start_us else None,
+                end_us if end_us is not None and meta["max_us"] >= end_us else None,
+            )
+            if lo < hi:
+                yield partition, lo, hi
+
+    # --- Reads ---------------------------------------------------------------
+
+    def count_range(self, start=None, end=None):
+        """Counts leads created in `[start, end)` (time column only)."""
+        return sum(hi - lo for _, lo, hi in self._scan(start, end))
+
+    def count_by_status(self, start=None, end=None):
+        """
+        Counts leads per status in `[start, end)`.
+
+        Returns:
+            dict[str, int]: Mapping of status → lead count.
+        """
+        result = Counter()
+        for partition, lo, hi in self._scan(start, end):
+            codes = partition.status_codes[lo:hi]
+            if np is not None:
+                counts = np.bincount(np.frombuffer(codes, dtype=np.uint8)).tolist()
+            else:
+                counts = Counter(codes)
+                counts = [counts.get(code, 0) for code in range(len(partition.statuses))]
+            for code, count in enumerate(counts):
+                if count:
+                    result[partition.statuses[code]] += count
+        return dict(result)
+
+    def iter_range(self, start=None, end=None, status=None):
+        """
+        Streams leads created in `[start, end)`, newest first.
+
+        Args:
+            start (datetime | None): Inclusive lower bound.
+            end (datetime | None): Exclusive upper bound.
+            status (str | None): Only leads with this status.
+
+        Yields:
+            Lead: Lead records.
+        """
+        for partition, lo, hi in self._scan(start, end, newest_first=True):
+            if status is not None and status not in partition.statuses:
+                continue
+            wanted = None if status is None else partition.statuses.index(status)
+            created, codes = partition.created, partition.status_codes
+            texts = [partition.text(field) for field in TEXT_FIELDS]
+            for i in range(hi - 1, lo - 1, -1):
+                code = codes[i]
+                if wanted is not None and code != wanted:
+                    continue
+                lead_id, criado_em, ultima_mensagem, link_chat = (t(i) for t in texts)
+                yield Lead(lead_id, created[i], criado_em, partition.statuses[code],
+                           ultima_mensagem, link_chat)
+
+    def iter_ids(self, start=None, end=None):
+        """Streams the IDs of leads created in `[start, end)` (id column only)."""
+        for partition, lo, hi in self._scan(start, end):
+            value = partition.text("id")
+            for i in range(lo, hi):
+                yield value(i)
+
+    def iter_buckets(self, start=None, end=None):
+        """
+        Streams hourly counts of leads created in `[start, end)`.
+
+        Yields:
+            tuple[int, str | None, int]: `(bucket_epoch, status, count)`, as
+            `LeadStore.iter_rollup_buckets()`.
+        """
+        for partition, lo, hi in self._scan(start, end):
+            created = partition.created[lo:hi]
+            codes = partition.status_codes[lo:hi]
+            if np is not None:
+                hours = np.frombuffer(created, dtype=np.int64) // _HOUR_US
+                keys = hours * 256 + np.frombuffer(codes, dtype=np.uint8)
+                unique, counts = np.unique(keys, return_counts=True)
+                rows = zip((unique // 256).tolist(), (unique % 256).tolist(), counts.tolist())
+            else:
+                counts = Counter(zip((c // _HOUR_US for c in created), codes))
+                rows = ((hour, code, count) for (hour, code), count in sorted(counts.items()))
+            for hour, code, count in rows:
+                yield hour * 3600, partition.statuses[code], count
+
+    def summarize(self, start=None, end=None, by=("day", "hour", "status"), tz=None):
+        """
+        Counts leads by day/hour/status/week/month (see `rollup.DIMENSIONS`).
+
+        Reads only the time and status columns of the partitions in range.
+
+        Args:
+            start (datetime | None): Inclusive lower bound.
+            end (datetime | None): Exclusive upper bound.
+            by (Sequence[str]): Dimensions.
+            tz (tzinfo | None): Timezone for partitioning (default: local).
+
+        Returns:
+            dict[tuple, int]: Mapping of dimension values → lead count.
+        """
+        # Imported here so reading leads never loads the rollup engine
+        from .rollup import rollup_buckets
+
+        return rollup_buckets(self.iter_buckets(start, end), by=by, tz=tz)
+
+    # --- Writes --------------------------------------------------------------
+
+    def _read_partition(self, month):
+        return {lead.id: lead for lead in self.iter_range(*_month_bounds(month))}
+
+    def add(self, leads):
+        """
+        Merges leads into their monthly partitions.
+
+        Each touched partition is rewritten once; a lead whose `id` is
+        already archived in the same month replaces the stored one (within
+        one call, the last record of an `id` wins across months). Leads
+        without an `id` are skipped.
+
+        Args:
+            leads (Iterable[Lead]): Lead records.
+
+        Returns:
+            dict[str, int]: Rows per rewritten partition.
+        """
+        # Deduplicate across months first: the last record of an id wins even
+        # when an earlier one fell into another month
+        latest = {lead.id: lead for lead in leads if lead.id}
+        by_month = {}
+        for lead in latest.values():
+            by_month.setdefault(month_key(lead.created_us), {})[lead.id] = lead
+
+        written = {}
+        for month, new_leads in sorted(by_month.items()):
+            merged = self._read_partition(month) if month in self.manifest["partitions"] else {}
+            merged.update(new_leads)
+            written[month] = self._replace_partition(
+                month, sorted(merged.values(), key=lambda l: (l.created_us, l.id))
+            )
+        return written
+
+    def _replace_partition(self, month, leads):
+        os.makedirs(self.directory, exist_ok=True)
+        old = self.manifest["partitions"].get(month)
+        path = f"{month}.{time.time_ns()}"
+        meta = write_partition(os.path.join(self.directory, path), leads)
+        meta["path"] = path
+
+        stale = self._partitions.pop(month, None)
+        if stale is not None:
+            stale.close()
+        self.manifest["partitions"][month] = meta
+        _write_atomic(
+            os.path.join(self.directory, MANIFEST), json.dumps(self.manifest, indent=2)
+        )
+        if old is not None:
+            shutil.rmtree(os.path.join(self.directory, old["path"]), ignore_errors=True)
+        return meta["count"]
+
+
+def _month_bounds(month):
+    year, mon = map(int, month.split("-"))
+    start = datetime(year, mon, 1, tzinfo=timezone.utc)
+    end = datetime(year + mon // 12, mon % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def convert(paths, directory=None):
+    """
+    Imports lead files (`.json` or `.ndjson`) into the archive.
+
+    Files are read in name order, so for a lead present in several daily
+    files the newest file's record wins.
+
+    Args:
+        paths (Iterable[str]): Lead files.
+        directory (str | None): Archive directory override.
+
+    Returns:
+        dict[str, int]: Rows per rewritten partition.
+    """
+    leads = []
+    for path in sorted(paths):
+        leads.extend(iter_leads_from_records(iter_lead_file(path)))
+    with LeadArchive(directory) as archive:
+        return archive.add(leads)
+
+
+def _parse_date(value):
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def main(argv=None):
+    """Command-line entry point: convert lead files or query the archive."""
+    parser = argparse.ArgumentParser(description="Columnar archive of historical leads.")
+    parser.add_argument("--dir", default=None, help=f"archive directory (default: {ARCHIVE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser("convert", help="import leads_*.json/.ndjson files")
+    convert_parser.add_argument("files", nargs="*", help="lead files (default: leads_*.json*)")
+
+    summary_parser = commands.add_parser("summary", help="per-period lead counts")
+    summary_parser.add_argument("--since", type=_parse_date, help="inclusive ISO date/time")
+    summary_parser.add_argument("--until", type=_parse_date, help="exclusive ISO date/time")
+    summary_parser.add_argument(
+        "--by", nargs="+", default=["month"], choices=("day", "hour", "status", "week", "month"),
+        help="dimensions (default: month)",
+    )
+
+    commands.add_parser("info", help="list partitions")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        files = args.files or glob.glob("leads_*.json") + glob.glob("leads_*.ndjson")
+        started = time.perf_counter()
+        written = convert(files, args.dir)
+        elapsed = time.perf_counter() - started
+        for month, count in written.items():
+            print(f"🗃️ {month} → {count} leads")
+        print(f"✅ Archived {len(files)} files into {len(written)} partitions in {elapsed:.2f}s")
+        return written
+
+    with LeadArchive(args.dir) as archive:
+        if args.command == "info":
+            for month in archive.months:
+                meta = archive.manifest["partitions"][month]
+                print(f"🗃️ {month}: {meta['count']} leads, {len(meta['statuses'])} statuses")
+            return archive.manifest
+
+        started = time.perf_counter()
+        summary = archive.summarize(args.since, args.until, by=tuple(args.by))
+        elapsed = (time.perf_counter() - started) * 1000
+    for key, count in summary.items():
+        print(f"📅 {' '.join(str(k) for k in key)} → {count} leads")
+    print(f"({len(summary)} rows in {elapsed:.1f} ms)")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
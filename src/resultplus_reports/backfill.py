@@ -0,0 +1,311 @@
+"""
+backfill.py
+-----------
+Sharded, resumable backfill of Helena sessions into the lead database.
+
+The regular fetch walks a single date window page by page from page 0, which
+gets slow (and fragile, as new sessions shift the pages) for long ranges.
+A backfill instead splits `[start, end)` into shards — one day by default —
+and fetches each shard's `startDate`/`endDate` window separately:
+
+- shards are fetched concurrently, capped at `workers` at a time;
+- a shard that is still not exhausted after `max_pages` pages is narrowed
+  instead of paginated further: its remainder (from `start` up to the oldest
+  session seen so far) is queued again as a new shard starting at page 0,
+  so dense days adapt their shard size and no request uses a deep offset;
+- leads are merged into the lead database (`leads.db`, see `lead_store.py`),
+  which dedups by `id`, so overlapping or retried shards are harmless;
+- progress is recorded in a state file after every shard. A failed or
+  interrupted backfill re-run with the same range only fetches the shards
+  it had not finished; the state file is removed once every shard is done.
+
+Environment variables (optional):
+- HELENA_BACKFILL_WORKERS: Shards fetched concurrently (default: 4)
+- HELENA_BACKFILL_STATE: Resume state file (default: backfill_state.json)
+"""
+
+import argparse
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, time, timedelta, timezone
+
+from . import http_client, metrics
+from .fetch_result import SESSION_PATH, iter_pages, session_params
+from .lead import Lead, epoch_us
+from .lead_store import LeadStore
+from .watermark import parse_timestamp
+
+log = logging.getLogger("resultplus_reports.backfill")
+
+WORKERS = int(os.getenv("HELENA_BACKFILL_WORKERS", "4"))
+STATE_FILE = os.getenv("HELENA_BACKFILL_STATE", "backfill_state.json")
+
+DEFAULT_SHARD = timedelta(days=1)
+
+# Pages fetched from one shard before its remainder is requeued
+MAX_SHARD_PAGES = 20
+
+# `endDate` is inclusive: the remainder ends just after the oldest session seen
+_RESOLUTION = timedelta(microseconds=1)
+
+
+def split_range(start, end, shard=DEFAULT_SHARD):
+    """
+    Splits `[start, end)` into consecutive shards of at most `shard`.
+
+    Returns:
+        list[tuple[datetime, datetime]]: Shards, oldest first.
+    """
+    shards = []
+    cursor = start
+    while cursor < end:
+        shard_end = min(cursor + shard, end)
+        shards.append((cursor, shard_end))
+        cursor = shard_end
+    return shards
+
+
+def fetch_shard(start, end, max_pages=MAX_SHARD_PAGES, account=None):
+    """
+    Fetches the leads created in `[start, end)`.
+
+    Args:
+        start (datetime): Shard start (inclusive, timezone-aware).
+        end (datetime): Shard end (exclusive, timezone-aware).
+        max_pages (int): Stop after this many pages and return the part of
+            the shard not covered yet.
+        account (http_client.Account | None): Account to fetch from.
+            Defaults to the `HELENA_API_URL`/`HELENA_API_KEY` account.
+
+    Returns:
+        tuple: (leads, remainder). `remainder` is None when the shard was
+        exhausted, else the `(start, end)` range still to fetch.
+
+    Raises:
+        http_client.APIError: If the API returns an error response.
+    """
+    with metrics.span("backfill_shard"):
+        return _fetch_shard(start, end, max_pages, account or http_client.DEFAULT_ACCOUNT)
+
+
+def _fetch_shard(start, end, max_pages, account):
+    headers = account.headers()
+    params = session_params(start, end)
+    start_us, end_us = epoch_us(start), epoch_us(end)
+    leads = []
+    last_batch_ids = set()
+
+    for page, (status_code, items, error) in iter_pages(headers, params, account=account):
+        if items is None:
+            raise http_client.APIError(status_code, error, account.url(SESSION_PATH))
+        if not items:
+            return leads, None
+
+        current_ids = {s.get("id") for s in items if s.get("id")}
+        if current_ids == last_batch_ids:
+            return leads, None
+        last_batch_ids = current_ids
+
+        for session in items:
+            lead = Lead.from_session(session)
+            if lead is not None and start_us <= lead.created_us < end_us:
+                leads.append(lead)
+
+        oldest = parse_timestamp(items[-1].get("createdAt"))
+        if oldest is not None and oldest < start:
+            return leads, None
+        # Narrow the window rather than paging deeper, as long as it shrinks
+        if page + 1 >= max_pages and oldest is not None and oldest + _RESOLUTION < end:
+            return leads, (start, oldest + _RESOLUTION)
+
+
+def _shard_key(shard):
+    return [shard[0].isoformat(), shard[1].isoformat()]
+
+
+def _shard_from_key(key):
+    return parse_timestamp(key[0]), parse_timestamp(key[1])
+
+
+def load_state(start, end, path=None):
+    """
+    Loads the progress of a previous backfill of `[start, end)`.
+
+    Returns:
+        tuple | None: (pending, done) shard lists, or None when there is no
+        state file for this exact range.
+    """
+    path = path or STATE_FILE
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            state = json.load(f)
+        except json.JSONDecodeError:
+            return None
+    if state.get("range") != _shard_key((start, end)):
+        return None
+    pending = [_shard_from_key(key) for key in state.get("pending", [])]
+    done = [_shard_from_key(key) for key in state.get("done", [])]
+    return pending, done
+
+
+def save_state(start, end, pending, done, path=None):
+    """Atomically records the pending and finished shards of a backfill."""
+    path = path or STATE_FILE
+    state = {
+        "range": _shard_key((start, end)),
+        "pending": [_shard_key(s) for s in sorted(pending)],
+        "done": [_shard_key(s) for s in sorted(done)],
+        "updatedAt": datetime.now(timezone.utc).isoformat(),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def backfill_sessions(
+    start, end, shard=DEFAULT_SHARD, workers=None, max_pages=MAX_SHARD_PAGES,
+    state_file=None, resume=True, lead_db_file=None, account=None,
+):
+    """
+    Fetches every session in `[start, end)` into the lead database.
+
+    Args:
+        start (datetime): Range start (inclusive, timezone-aware).
+        end (datetime): Range end (exclusive, timezone-aware).
+        shard (timedelta): Initial shard size.
+        workers (int | None): Shards fetched concurrently.
+            Defaults to `HELENA_BACKFILL_WORKERS`.
+        max_pages (int): Pages per request window before a shard is narrowed.
+        state_file (str | None): Resume state path override.
+        resume (bool): Continue a previous backfill of the same range.
+        lead_db_file (str | None): Lead database path override.
+        account (http_client.Account | None): Account to fetch from.
+            Defaults to the `HELENA_API_URL`/`HELENA_API_KEY` account.
+
+    Returns:
+        dict: Summary with `shards`, `leads`, `stored` (total rows in the
+        range after the merge) and `failed` shard count.
+    """
+    workers = max(1, workers or WORKERS)
+    state_file = state_file or STATE_FILE
+
+    state = load_state(start, end, state_file) if resume else None
+    if state is not None:
+        pending, done = state
+        log.info(f"⏯️ Resuming backfill — {len(pending)} shards left, {len(done)} done")
+    else:
+        pending, done = split_range(start, end, shard), []
+        log.info(f"🔄 Backfilling {start:%Y-%m-%d %H:%M} → {end:%Y-%m-%d %H:%M} "
+                 f"in {len(pending)} shards ({workers} workers)")
+
+    queue = deque(pending)
+    in_flight = {}
+    failed = []
+    fetched = 0
+
+    with LeadStore(lead_db_file) as store, ThreadPoolExecutor(max_workers=workers) as pool:
+        while queue or in_flight:
+            while queue and len(in_flight) < workers:
+                shard_range = queue.popleft()
+                future = pool.submit(
+                    fetch_shard, *shard_range, max_pages=max_pages, account=account
+                )
+                in_flight[future] = shard_range
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                shard_range = in_flight.pop(future)
+                label = f"{shard_range[0]:%Y-%m-%d %H:%M} → {shard_range[1]:%Y-%m-%d %H:%M}"
+                try:
+                    leads, remainder = future.result()
+                except Exception as e:
+                    log.error(f"❌ Shard {label} failed: {e}")
+                    metrics.inc("backfill_shards_total", result="failed")
+                    failed.append(shard_range)
+                    continue
+
+                # Upserts happen on this thread only; the store dedups by id
+                with metrics.span("backfill_store"):
+                    store.upsert_many(leads)
+                fetched += len(leads)
+                metrics.inc("backfill_leads_total", len(leads))
+                if remainder is None:
+                    done.append(shard_range)
+                    metrics.inc("backfill_shards_total", result="done")
+                    log.info(f"   ✓ {label}: {len(leads)} leads")
+                else:
+                    done.append((remainder[1], shard_range[1]))
+                    queue.append(remainder)
+                    metrics.inc("backfill_shards_total", result="narrowed")
+                    log.info(f"   ✂️ {label}: {len(leads)} leads, page limit reached — "
+                             f"requeued up to {remainder[1]:%Y-%m-%d %H:%M}")
+
+            save_state(start, end, list(queue) + list(in_flight.values()) + failed,
+                       done, state_file)
+
+        stored = store.count_range(start, end)
+
+    if failed:
+        log.warning(f"⚠️ {len(failed)} shards failed — rerun the same range to resume "
+                    f"(state in {state_file})")
+    elif os.path.exists(state_file):
+        os.remove(state_file)
+
+    log.info(f"✅ Backfill fetched {fetched} leads; {stored} stored in range")
+    return {"shards": len(done), "leads": fetched, "stored": stored, "failed": len(failed)}
+
+
+def _day_start(value):
+    return datetime.combine(date.fromisoformat(value), time.min).astimezone()
+
+
+def main(argv=None):
+    """Command-line entry point: backfill a date range into the lead database."""
+    parser = argparse.ArgumentParser(description="Backfill Helena sessions by date shards.")
+    parser.add_argument("start", help="first day to fetch (YYYY-MM-DD, local time)")
+    parser.add_argument("end", help="last day to fetch, inclusive (YYYY-MM-DD)")
+    parser.add_argument(
+        "--shard-hours", type=float, default=DEFAULT_SHARD.total_seconds() / 3600,
+        help="initial shard size in hours (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=WORKERS,
+        help="shards fetched concurrently (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-pages", type=int, default=MAX_SHARD_PAGES,
+        help="pages per request window before narrowing it (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--restart", action="store_true",
+        help="ignore any saved progress and fetch every shard again",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="write a cProfile dump of the run next to the metrics",
+    )
+    args = parser.parse_args(argv)
+
+    start = _day_start(args.start)
+    end = _day_start((date.fromisoformat(args.end) + timedelta(days=1)).isoformat())
+    if end <= start:
+        parser.error("end must not be before start")
+
+    with metrics.run("backfill", profile=args.profile):
+        return backfill_sessions(
+            start, end,
+            shard=timedelta(hours=args.shard_hours),
+            workers=args.workers,
+            max_pages=args.max_pages,
+            resume=not args.restart,
+        )
+
+
+if __name__ == "__main__":
+    main()
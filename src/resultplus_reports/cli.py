@@ -0,0 +1,119 @@
+"""
+cli.py
+------
+Command-line interface: `python -m resultplus_reports <command> [options]`
+(or the `resultplus-reports` console script).
+
+Commands:
+- fetch:    fetch recent sessions (`fetch_result.py`)
+- report:   generate the Google Docs/Sheets report (`generate_report.py`)
+- backfill: sharded historical fetch into the lead database (`backfill.py`)
+- archive:  convert lead files to / query the columnar archive (`archive.py`)
+- tenants:  fetch/report many white-label accounts (`tenants.py`)
+- daemon:   resident poll/report loop with a health endpoint (`daemon.py`)
+- probe:    run one of the API diagnostic scripts (most are `probe.py` presets)
+
+Each command's module is imported only when that command runs, so e.g.
+`fetch` never loads the Google client libraries. Options after the command
+name are passed to that command (`python -m resultplus_reports fetch --help`).
+Without a command, `fetch` runs, as `python -m resultplus_reports` always did.
+"""
+
+import argparse
+import importlib
+import sys
+
+# command → (module, help)
+COMMANDS = {
+    "fetch": ("fetch_result", "fetch recent Helena sessions"),
+    "report": ("generate_report", "generate the Google Docs/Sheets report"),
+    "backfill": ("backfill", "fetch a historical date range into the lead database"),
+    "archive": ("archive", "convert lead files to / query the columnar lead archive"),
+    "tenants": ("tenants", "fetch and report many accounts from the tenant registry"),
+    "daemon": ("daemon", "poll and report continuously, with a health endpoint"),
+    "probe": (None, "run an API diagnostic script"),
+}
+
+DEFAULT_COMMAND = "fetch"
+
+# Diagnostic scripts runnable with `probe <name> [options]`
+PROBES = {
+    "hidden-sessions": ("find_hidden_sessions", "probe session routes for recent data"),
+    "new-endpoint": ("find_new_endpoint", "look for alternative session endpoints"),
+    "swagger-json": ("find_real_swagger_json", "locate the real Swagger/OpenAPI JSON"),
+    "scan-api-swagger": ("scan_api_swagger", "scan the API for hidden routes"),
+    "scan-swagger": ("scan_swagger", "list endpoints from the Swagger docs"),
+    "endpoints": ("test_endpoints", "check endpoint accessibility"),
+    "pagination": ("test_pagination", "check pagination behaviour"),
+    "query-params": ("test_query_params", "try date/paging query parameter combinations"),
+    "search-post": ("test_search_post", "try the POST search endpoint"),
+}
+
+
+def _package():
+    return __package__ or "resultplus_reports"
+
+
+def run_probe(argv=None):
+    """
+    Runs a diagnostic script by name (`probe --list` to see them).
+
+    Options after the name go to the script (`probe query-params --help`).
+    """
+    parser = argparse.ArgumentParser(prog="resultplus-reports probe", description="Run an API diagnostic script.")
+    parser.add_argument("name", nargs="?", choices=sorted(PROBES), help="diagnostic to run")
+    parser.add_argument("--list", action="store_true", help="list the available diagnostics")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="options for the diagnostic")
+    args = parser.parse_args(argv)
+
+    if args.list or not args.name:
+        for name, (_, help_text) in sorted(PROBES.items()):
+            print(f"  {name:<18} {help_text}")
+        return None
+    module_name, _ = PROBES[args.name]
+    module = importlib.import_module(f".{module_name}", _package())
+    return module.main(args.args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="resultplus-reports",
+        description="Helena CRM lead fetching, reporting and diagnostics.",
+        epilog="commands:\n" + "\n".join(
+            f"  {name:<10} {help_text}" for name, (_, help_text) in COMMANDS.items()
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "command", nargs="?", default=DEFAULT_COMMAND, choices=list(COMMANDS),
+        help="command to run (default: %(default)s)",
+    )
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="options for the command")
+    return parser
+
+
+def main(argv=None):
+    """
+    Dispatches to a subcommand, importing only the module it needs.
+
+    Args:
+        argv (list[str] | None): Arguments (default: `sys.argv[1:]`).
+
+    Returns:
+        The subcommand's return value.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        # Options without a command belong to the default command
+        argv.insert(0, DEFAULT_COMMAND)
+    args = build_parser().parse_args(argv)
+
+    if args.command == "probe":
+        return run_probe(args.args)
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(f".{module_name}", _package())
+    return module.main(args.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+config.py
+---------
+One-time configuration loading for the whole package.
+
+Settings are read from environment variables by each module at import time
+(see the "Environment variables" section of every module). This module loads
+`.env` into the environment exactly once, when the package is first
+imported, so those constants see it no matter which module is imported
+first; individual modules no longer call `load_dotenv()` themselves.
+
+Variables already set in the environment take precedence over `.env`.
+
+Environment variables (optional):
+- RESULTPLUS_ENV_FILE: Path of the dotenv file (default: .env, searched from
+  the working directory upwards)
+"""
+
+import os
+import threading
+
+from dotenv import find_dotenv, load_dotenv
+
+_lock = threading.Lock()
+_loaded_from = None
+
+
+def load(path=None):
+    """
+    Loads the dotenv file into `os.environ` once per process.
+
+    Args:
+        path (str | None): Dotenv path. Defaults to `RESULTPLUS_ENV_FILE`,
+            then the nearest `.env` from the working directory.
+
+    Returns:
+        str: The file that was loaded ("" if none was found).
+    """
+    global _loaded_from
+    with _lock:
+        if _loaded_from is None:
+            path = path or os.getenv("RESULTPLUS_ENV_FILE") or find_dotenv(usecwd=True)
+            if path:
+                load_dotenv(path, override=False)
+            _loaded_from = path or ""
+        return _loaded_from
@@ -0,0 +1,455 @@
+"""
+daemon.py
+---------
+Resident fetch/report loop with a local health and status endpoint.
+
+`fetch` and `report` are one-shot commands: every cron tick starts a new
+interpreter, reloads `.env`, imports the Google stack, opens new HTTP
+connections and rebuilds the Google clients, and a lead waits for the next
+tick before it reaches the sheet. The daemon keeps one process alive
+instead:
+
+- it polls Helena every `interval` seconds with the persisted watermark
+  (see `watermark.py`), so each poll only fetches the newest page or two,
+  through the same pooled session (`http_client.py`) and rate controller;
+- it flushes new leads to Google Docs/Sheets every `report_interval`
+  seconds, with the credentials and clients built once at startup
+  (`google_clients.py`). With `report_interval` 0 leads are reported right
+  after the poll that fetched them, so lead-to-sheet latency is one poll;
+- a failed poll is retried with exponential backoff (up to
+  `MAX_BACKOFF_SECONDS`) and never advances the watermark; a failed flush
+  leaves the leads unsent for the next one;
+- SIGTERM/SIGINT stop it gracefully: the current poll finishes, pending
+  leads are flushed, connections are closed and the metrics are written.
+  A second signal exits immediately;
+- a small HTTP server on `127.0.0.1` answers `GET /health` (200, or 503
+  when polls or flushes keep failing), `GET /status` (JSON state) and
+  `GET /metrics` (Prometheus text of the live registry, see `metrics.py`);
+- counters and timings accumulate for the daemon's lifetime, while the
+  trace restarts with every poll; the metric files are rewritten after
+  every poll or flush, so `daemon_trace.json` holds the latest cycle.
+
+With `--tenants` every poll fetches all accounts of the tenant registry and
+every flush reports each of them (see `tenants.py`).
+
+The daemon writes NDJSON lead files by default: same-day JSON files are
+rewritten whole on every incremental merge, NDJSON ones are appended to.
+
+Usage:
+    python -m resultplus_reports daemon [--interval 30] [--report-interval 0]
+    python -m resultplus_reports daemon --tenants --port 8766
+    curl -s localhost:8765/status
+
+Environment variables (optional):
+- DAEMON_INTERVAL: Seconds between polls (default: 60)
+- DAEMON_REPORT_INTERVAL: Seconds between report flushes; 0 reports after
+  every poll that fetched leads (default: 300)
+- DAEMON_HOST: Health endpoint address (default: 127.0.0.1)
+- DAEMON_PORT: Health endpoint port; 0 disables it (default: 8765)
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import http_client, metrics
+from .fetch_result import fetch_helena_sessions
+from .watermark import load_watermark
+
+log = logging.getLogger("resultplus_reports.daemon")
+
+INTERVAL = float(os.getenv("DAEMON_INTERVAL", "60"))
+REPORT_INTERVAL = float(os.getenv("DAEMON_REPORT_INTERVAL", "300"))
+HOST = os.getenv("DAEMON_HOST", "127.0.0.1")
+PORT = int(os.getenv("DAEMON_PORT", "8765"))
+
+# Longest wait between polls while they keep failing
+MAX_BACKOFF_SECONDS = 900
+
+# Consecutive failures after which /health reports 503
+UNHEALTHY_AFTER_FAILURES = 3
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat() if epoch else None
+
+
+class Daemon:
+    """
+    Polling loop and its state.
+
+    Args:
+        interval (float): Seconds between polls.
+        report_interval (float | None): Seconds between report flushes
+            (0: after every poll with new leads). None disables reporting.
+        tenants (list[Tenant] | None): Poll these registry tenants instead of
+            the `HELENA_API_URL`/`HELENA_API_KEY` account.
+        output_format (str): Lead file format (`ndjson` or `json`).
+        workers (int | None): Tenant workers (see `tenants.fetch_tenants`).
+    """
+
+    def __init__(self, interval=INTERVAL, report_interval=REPORT_INTERVAL, tenants=None,
+                 output_format="ndjson", workers=None):
+        self.interval = interval
+        self.report_interval = report_interval
+        self.tenants = tenants
+        self.output_format = output_format
+        self.workers = workers
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.polls = 0
+        self.poll_failures = 0
+        self.flush_failures = 0
+        self.last_poll = {}
+        self.last_flush = {}
+        self.last_success = None
+        self.next_poll = self.started_at
+        self.next_flush = self.started_at
+        # Unknown at startup: leads from earlier runs may still be unsent
+        self.pending = None
+
+    # --- Lifecycle ------------------------------------------------------------
+
+    def stop(self):
+        """Asks the loop to exit after the current poll or flush."""
+        self._stop.set()
+
+    @property
+    def stopping(self):
+        return self._stop.is_set()
+
+    def warm_up(self):
+        """Builds the Google credentials and clients before the first flush."""
+        if self.report_interval is None:
+            return
+        try:
+            from . import google_clients
+
+            with metrics.span("daemon_warm_up"):
+                google_clients.docs_service()
+                google_clients.sheets_service()
+        except Exception as e:
+            log.warning(f"⚠️ Google clients not ready yet ({e}); retrying at the first flush.")
+        else:
+            log.info("🔥 Google clients ready")
+
+    def run(self, once=False):
+        """
+        Polls and flushes until `stop()` is called (or once with `once`).
+
+        Pending leads are flushed before returning.
+        """
+        self.warm_up()
+        while not self.stopping:
+            now = time.time()
+            worked = now >= self.next_poll
+            if worked:
+                self.poll()
+            if self._flush_due(time.time()):
+                self.flush()
+                worked = True
+            if worked and metrics.METRICS_ENABLED:
+                metrics.export("daemon")
+            if once:
+                break
+            self._stop.wait(max(0.0, min(self.next_poll, self._next_flush_at()) - time.time()))
+
+        if self.report_interval is not None and self.pending:
+            log.info("🛑 Flushing pending leads before exit")
+            self.flush()
+
+    # --- Work -----------------------------------------------------------------
+
+    def poll(self):
+        """Fetches the sessions newer than the watermark(s)."""
+        # Each poll starts a new trace, so `MAX_TRACE_EVENTS` bounds one
+        # cycle instead of filling up once and dropping events for good
+        metrics.REGISTRY.reset_events()
+        started = time.time()
+        error, count, failed = None, 0, []
+        try:
+            with metrics.span("daemon_poll"):
+                if self.tenants is None:
+                    result = fetch_helena_sessions(output_format=self.output_format)
+                    count = result["count"]
+                else:
+                    from .tenants import fetch_tenants
+
+                    results = fetch_tenants(
+                        self.tenants, workers=self.workers, output_format=self.output_format
+                    )
+                    count = sum(r["count"] for r in results.values())
+                    failed = sorted(name for name, r in results.items() if r["error"])
+                    if failed and len(failed) == len(results):
+                        error = f"all {len(failed)} tenants failed"
+        except Exception as e:
+            error = str(e)
+        finished = time.time()
+
+        with self._lock:
+            self.polls += 1
+            self.last_poll = {
+                "at": _iso(started), "seconds": round(finished - started, 3),
+                "leads": count, "failed_tenants": failed, "error": error,
+            }
+            if error is None:
+                self.poll_failures = 0
+                self.last_success = finished
+                if count:
+                    self.pending = (self.pending or 0) + count
+                    if self.report_interval == 0:
+                        self.next_flush = finished
+                # Fixed rate: the next poll is scheduled from this one's start
+                self.next_poll = started + self.interval
+            else:
+                self.poll_failures += 1
+                delay = min(self.interval * 2 ** self.poll_failures, MAX_BACKOFF_SECONDS)
+                self.next_poll = finished + max(self.interval, delay)
+
+        if error is None:
+            metrics.inc("daemon_polls_total", result="ok")
+            if count:
+                log.info(f"📥 Poll fetched {count} leads")
+        else:
+            metrics.inc("daemon_polls_total", result="failed")
+            log.error(f"❌ Poll failed ({error}); watermark not advanced, "
+                      f"retrying in {self.next_poll - finished:.0f}s")
+
+    def _next_flush_at(self):
+        if self.report_interval is None or self.pending == 0:
+            return float("inf")
+        return self.next_flush
+
+    def _flush_due(self, now):
+        return self.report_interval is not None and self.pending != 0 and now >= self.next_flush
+
+    def flush(self):
+        """Reports the leads not sent yet to Google Docs/Sheets."""
+        started = time.time()
+        error, count = None, 0
+        try:
+            with metrics.span("daemon_flush"):
+                if self.tenants is None:
+                    from .generate_report import report_new_leads
+
+                    count = report_new_leads()
+                else:
+                    from .tenants import report_tenants
+
+                    results = report_tenants(self.tenants)
+                    count = sum(r["count"] for r in results.values())
+                    errors = [name for name, r in results.items() if r["error"]]
+                    if errors:
+                        error = f"tenants failed: {', '.join(errors)}"
+        except Exception as e:
+            error = str(e)
+        finished = time.time()
+
+        with self._lock:
+            self.last_flush = {
+                "at": _iso(started), "seconds": round(finished - started, 3),
+                "leads": count, "error": error,
+            }
+            if error is None:
+                self.flush_failures = 0
+                self.pending = 0
+                self.next_flush = started + self.report_interval
+            else:
+                # Retry no sooner than the next poll
+                self.flush_failures += 1
+                self.next_flush = started + max(self.report_interval, self.interval)
+
+        if error is None:
+            metrics.inc("daemon_flushes_total", result="ok")
+            if count:
+                log.info(f"📤 Flushed {count} leads to Google Docs/Sheets")
+        else:
+            metrics.inc("daemon_flushes_total", result="failed")
+            log.error(f"❌ Report flush failed ({error}); leads stay pending")
+
+    # --- Health ---------------------------------------------------------------
+
+    def healthy(self):
+        """bool: False once polls or flushes have failed repeatedly."""
+        with self._lock:
+            return (self.poll_failures < UNHEALTHY_AFTER_FAILURES
+                    and self.flush_failures < UNHEALTHY_AFTER_FAILURES)
+
+    def status(self):
+        """dict: JSON-serializable snapshot of the daemon state."""
+        watermark = None
+        if self.tenants is None:
+            watermark = load_watermark()
+        with self._lock:
+            return {
+                "healthy": (self.poll_failures < UNHEALTHY_AFTER_FAILURES
+                            and self.flush_failures < UNHEALTHY_AFTER_FAILURES),
+                "started_at": _iso(self.started_at),
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "interval": self.interval,
+                "report_interval": self.report_interval,
+                "tenants": [t.name for t in self.tenants] if self.tenants is not None else None,
+                "watermark": watermark.isoformat() if watermark else None,
+                "polls": self.polls,
+                "poll_failures": self.poll_failures,
+                "last_poll": self.last_poll,
+                "last_success": _iso(self.last_success),
+                "next_poll": _iso(self.next_poll),
+                "pending_leads": self.pending,
+                "flush_failures": self.flush_failures,
+                "last_flush": self.last_flush,
+                "stopping": self.stopping,
+            }
+
+
+class HealthServer(ThreadingHTTPServer):
+    """Threaded HTTP server exposing a `Daemon`'s health, status and metrics."""
+
+    daemon_threads = True
+
+    def __init__(self, address, owner):
+        super().__init__(address, _HealthHandler)
+        self.owner = owner
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        daemon = self.server.owner
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            healthy = daemon.healthy()
+            self._send(200 if healthy else 503, json.dumps({"healthy": healthy}))
+        elif path == "/status":
+            self._send(200, json.dumps(daemon.status(), indent=2))
+        elif path == "/metrics":
+            self._send(200, metrics.REGISTRY.prometheus(job="daemon"), "text/plain; version=0.0.4")
+        else:
+            self._send(404, json.dumps({"message": "Not Found"}))
+
+
+def serve_health(daemon, host=HOST, port=PORT):
+    """
+    Starts the health/status endpoint on a background thread.
+
+    Returns:
+        HealthServer: The running server; call `shutdown()` to stop it.
+    """
+    server = HealthServer((host, port), daemon)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _install_signal_handlers(daemon):
+    def handle(signum, frame):
+        log.info(f"🛑 Received {signal.Signals(signum).name} — stopping after the current step "
+                 f"(send it again to exit immediately)")
+        daemon.stop()
+        # A second signal falls back to the default behaviour
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+def main(argv=None):
+    """Command-line entry point: run the polling daemon until stopped."""
+    parser = argparse.ArgumentParser(description="Resident fetch/report loop with a health endpoint.")
+    parser.add_argument(
+        "--interval", type=float, default=INTERVAL,
+        help="seconds between polls (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--report-interval", type=float, default=REPORT_INTERVAL,
+        help="seconds between report flushes, 0 = after every poll with leads (default: %(default)s)",
+    )
+    parser.add_argument("--no-report", action="store_true", help="only fetch, never report")
+    parser.add_argument(
+        "--tenants", nargs="?", const="", metavar="FILE",
+        help="poll every tenant of the registry (default file: TENANTS_FILE)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="tenant workers (with --tenants)")
+    parser.add_argument(
+        "--format", choices=("json", "ndjson"), default="ndjson",
+        help="lead file format (default: %(default)s)",
+    )
+    parser.add_argument("--host", default=HOST, help="health endpoint address (default: %(default)s)")
+    parser.add_argument(
+        "--port", type=int, default=PORT,
+        help="health endpoint port, 0 disables it (default: %(default)s)",
+    )
+    parser.add_argument("--once", action="store_true", help="run a single poll (and flush) and exit")
+    args = parser.parse_args(argv)
+    if args.interval <= 0 or args.report_interval < 0:
+        parser.error("--interval must be positive and --report-interval not negative")
+
+    tenants = None
+    if args.tenants is not None:
+        from .tenants import load_registry
+
+        try:
+            tenants = load_registry(args.tenants or None)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+
+    metrics.setup_logging()
+    metrics.REGISTRY.reset()
+    daemon = Daemon(
+        interval=args.interval,
+        report_interval=None if args.no_report else args.report_interval,
+        tenants=tenants,
+        output_format=args.format,
+        workers=args.workers,
+    )
+
+    server = None
+    if args.port:
+        server = serve_health(daemon, args.host, args.port)
+        log.info(f"🩺 Health endpoint on {server.url}/health (/status, /metrics)")
+    if threading.current_thread() is threading.main_thread():
+        _install_signal_handlers(daemon)
+
+    scope = f"{len(tenants)} tenants" if tenants is not None else http_client.BASE_URL
+    flushes = "off" if args.no_report else f"every {args.report_interval:g}s"
+    log.info(f"🚀 Daemon started — polling {scope} every {args.interval:g}s, reports {flushes}")
+    try:
+        daemon.run(once=args.once)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        http_client.close()
+        if metrics.METRICS_ENABLED:
+            trace_path, prom_path = metrics.export("daemon")
+            log.info(f"📈 Metrics written to {trace_path} and {prom_path}")
+        log.info(f"👋 Daemon stopped after {daemon.polls} polls")
+        metrics.flush_logging()
+    return daemon.status()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,131 +4,521 @@ fetch_result.py
 Fetches recent chat sessions (leads) from the Helena CRM private API.
 
 This module connects to the CRM endpoint, handles pagination automatically,
-filters recent sessions (last 7 days), and exports validated data to `leads.json`.
+filters recent sessions (last 7 days), and writes the validated leads to a
+dated lead file (`leads_YYYYMMDD.json` or `.ndjson`), upserts them into the
+lead database (`leads.db`) and saves the watermark (`watermark.json`).
+
+Pages are fetched serially by default, paced by the shared adaptive rate
+controller (see `rate_limit.py`). With `max_in_flight > 1` several pages
+are requested concurrently on a thread pool, prefetching ahead of the page
+being processed, and results are still consumed strictly in page order so
+the output is identical to the serial path.
+
+Because results are sorted `createdAt,desc`, pagination stops at the first
+page that reaches the 7-day cutoff. Incremental runs (the default) also stop
+once a page goes past the newest `createdAt` ingested by the previous run,
+persisted as a watermark (see `watermark.py`), and merge the new leads into
+the day's file. The watermark itself is inclusive: sessions created at
+exactly that instant are fetched again, and `LeadExport` drops the ones the
+lead database already holds, so a session sharing the watermark's
+timestamp but published after the previous run is still ingested. Without
+a `watermark.json` an incremental run resumes from the newest lead already
+in the lead database (at whole-second precision).
+
+Every fetch function takes an optional `http_client.Account` (base URL,
+token, rate scope); without one the `HELENA_API_URL`/`HELENA_API_KEY`
+account is used. The output side of a fetch (lead file, lead database,
+watermark) is a `LeadExport`, so the multi-tenant scheduler (`tenants.py`)
+can run one per account and feed it page by page.
+
+`iter_sessions()` and `iter_leads()` expose the same pipeline as generators:
+sessions are projected onto compact `Lead` records (see `lead.py`) and
+filtered as each page arrives, and the exporter streams them to disk, so
+long backfills run in constant memory. Leads are
+also upserted into the local lead database (`leads.db`, see `lead_store.py`).
+Long historical ranges are better fetched with `backfill.py`, which shards
+the range by date and fetches the shards concurrently.
 
 Environment variables required:
 - HELENA_API_URL: Base URL of the Helena API
 - HELENA_API_KEY: Bearer token for authentication
+
+Environment variables (optional):
+- HELENA_MAX_IN_FLIGHT: Number of pages fetched concurrently (default: 1)
+- HELENA_OUTPUT_FORMAT: `json` (default) or `ndjson` (append-only, streamed)
 """
 
+import argparse
+import logging
 import os
-import json
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from dotenv import load_dotenv
 
-# Load .env variables (Helena API credentials, etc.)
-load_dotenv()
+import requests
+
+from . import http_client, jsonlib, metrics
+from .http_client import BASE_URL, TOKEN
+from .lead import Lead, epoch_us, from_epoch_us, iter_leads_from_records
+from .lead_store import LeadStore
+from .lead_writer import JSONArrayWriter, NDJSONWriter, iter_lead_file
+from .watermark import load_watermark, parse_timestamp, save_watermark
+
+log = logging.getLogger("resultplus_reports.fetch_result")
+
+SESSION_PATH = "/chat/v1/session"
+API_URL = f"{BASE_URL}{SESSION_PATH}"
+
+MAX_IN_FLIGHT = int(os.getenv("HELENA_MAX_IN_FLIGHT", "1"))
+OUTPUT_FORMAT = os.getenv("HELENA_OUTPUT_FORMAT", "json")
+
+# Sessions older than this are never exported
+RECENT_DAYS = 7
 
-BASE_URL = os.getenv("HELENA_API_URL", "https://api.chat.resultplus.com.br")
-API_URL = f"{BASE_URL}/chat/v1/session"
-TOKEN = os.getenv("HELENA_API_KEY")
+# Leads upserted into the lead database per transaction
+STORE_BATCH_SIZE = 500
 
 
-def fetch_helena_sessions():
+def _fetch_page(headers, params, page, account=None):
     """
-    Fetch recent sessions from Helena CRM and store them in a local JSON file.
+    Fetches a single page of sessions.
 
-    This function handles pagination, filters sessions from the last 7 days,
-    and exports structured lead data to `leads.json`.
+    Only the session fields in `jsonlib.SESSION_FIELDS` are decoded.
 
     Returns:
-        dict: Summary with total leads and output file name
+        tuple: (status_code, items, error_text). `items` is None on non-200.
     """
-    print("🔄 Fetching recent sessions from Helena CRM...")
+    page_params = dict(params, page=str(page))
+    url, scope = (account.url(SESSION_PATH), account.rate_scope) if account else (API_URL, None)
+    started = time.perf_counter()
+    response = http_client.get(url, headers=headers, params=page_params, rate_scope=scope)
+    fetched = time.perf_counter()
+    metrics.observe("fetch_stage_seconds", fetched - started, stage="network")
+    if response.status_code != 200:
+        return response.status_code, None, response.text[:300]
+    items = jsonlib.decode_page(response.content)
+    metrics.observe("fetch_stage_seconds", time.perf_counter() - fetched, stage="decode")
+    return response.status_code, items, None
 
-    headers = {
-        "Authorization": f"Bearer {TOKEN}",
-        "Accept": "application/json"
-    }
 
-    # --- Dynamic date range (last 30 days) ---
-    end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=30)
+def _iter_pages_serial(headers, params, account=None):
+    page = 0
+    while True:
+        yield page, _fetch_page(headers, params, page, account)
+        page += 1
+
+
+def _iter_pages_concurrent(headers, params, max_in_flight, account=None):
+    """
+    Yields pages in order while keeping up to `max_in_flight` requests running.
+
+    Pages beyond the current one are prefetched; when the consumer stops
+    (empty page, duplicate batch, error), outstanding requests are cancelled.
+    """
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        pending = {}
+        next_page = 0
+        page = 0
+        try:
+            while True:
+                while len(pending) < max_in_flight:
+                    pending[next_page] = pool.submit(_fetch_page, headers, params, next_page, account)
+                    next_page += 1
+                yield page, pending.pop(page).result()
+                page += 1
+        finally:
+            for future in pending.values():
+                future.cancel()
 
-    params = {
-        "startDate": start_date.isoformat(),
-        "endDate": end_date.isoformat(),
+
+def iter_pages(headers, params, max_in_flight=1, account=None):
+    """
+    Yields `(page, (status_code, items, error_text))` tuples in page order.
+
+    Args:
+        headers (dict): Request headers.
+        params (dict): Query parameters shared by every page.
+        max_in_flight (int): Pages requested concurrently (1 = serial).
+        account (http_client.Account | None): Account to query (its URL and
+            rate scope; `headers` carry its token). Defaults to `API_URL`.
+    """
+    if max_in_flight <= 1:
+        return _iter_pages_serial(headers, params, account)
+    return _iter_pages_concurrent(headers, params, max_in_flight, account)
+
+
+def session_params(start, end):
+    """Returns the query parameters for sessions created in a date window."""
+    return {
+        "startDate": start.isoformat(),
+        "endDate": end.isoformat(),
         "sort": "createdAt,desc",
     }
 
-    all_sessions = []
-    page = 0
+
+def iter_session_pages(start, end, after=None, max_in_flight=None, account=None):
+    """
+    Streams pages of raw sessions created between `start` and `end`, newest first.
+
+    Sessions are yielded as each page arrives, so memory use stays constant
+    regardless of the window size. Pagination stops on an empty page, a
+    repeated batch, or once a page reaches sessions older than `start` or
+    `after`. An error response (after the transport's
+    retries) raises instead of silently ending the stream early.
+
+    Args:
+        start (datetime): Oldest `createdAt` of interest (timezone-aware).
+        end (datetime): Newest `createdAt` of interest (timezone-aware).
+        after (datetime | None): Watermark; stop once sessions are older.
+        max_in_flight (int | None): Pages fetched concurrently.
+            Defaults to `HELENA_MAX_IN_FLIGHT` (1 = serial).
+        account (http_client.Account | None): Account to fetch from.
+            Defaults to the `HELENA_API_URL`/`HELENA_API_KEY` account.
+
+    Yields:
+        list[dict]: Sessions of one page, in API order, reduced to the
+        fields in `jsonlib.SESSION_FIELDS`.
+
+    Raises:
+        http_client.APIError: If a page cannot be fetched.
+    """
+    if account is None:
+        headers, url, tag = http_client.auth_headers(TOKEN), API_URL, ""
+    else:
+        headers, url = account.headers(), account.url(SESSION_PATH)
+        tag = f"[{account.rate_scope}] " if account.rate_scope else ""
+    params = session_params(start, end)
+    if max_in_flight is None:
+        max_in_flight = MAX_IN_FLIGHT
+
     last_batch_ids = set()
 
     # --- Pagination loop ---
-    while True:
-        params["page"] = str(page)
-        response = requests.get(API_URL, headers=headers, params=params)
-        print(f"📄 Page {page} | Status: {response.status_code}")
-
-        if response.status_code != 200:
-            print("❌ Response error:", response.text[:300])
-            break
+    for page, (status_code, items, error) in iter_pages(headers, params, max_in_flight, account):
+        log.info(f"{tag}📄 Page {page} | Status: {status_code}")
 
-        data = response.json()
-        items = data.get("items", [])
+        if items is None:
+            raise http_client.APIError(status_code, error, url)
 
         if not items:
-            print("⚠️ No items returned — pagination ended.")
-            break
+            log.warning(f"{tag}⚠️ No items returned — pagination ended.")
+            return
 
         # Prevent infinite loop if identical results repeat
         current_ids = {s.get("id") for s in items if s.get("id")}
         if current_ids == last_batch_ids:
-            print("⚠️ Duplicate batch detected — stopping pagination.")
-            break
+            log.warning(f"{tag}⚠️ Duplicate batch detected — stopping pagination.")
+            return
 
         last_batch_ids = current_ids
-        all_sessions.extend(items)
 
         first = items[0].get("createdAt")
         last = items[-1].get("createdAt")
-        print(f"   → {len(items)} items (from {first} to {last})")
+        log.info(f"{tag}   → {len(items)} items (from {first} to {last})")
+        metrics.inc("fetch_pages_total")
+        metrics.inc("fetch_sessions_total", len(items))
 
-        page += 1
-        time.sleep(0.3)
-
-    if not all_sessions:
-        print("⚠️ No sessions found.")
-        return {"count": 0, "file": None}
-
-    # --- Filter sessions created within the last 7 days ---
-    cutoff = datetime.now(timezone.utc) - timedelta(days=7)
-    leads = []
-    for s in all_sessions:
-        created = s.get("createdAt")
-        if not created:
-            continue
+        yield items
+
+        # Results are sorted newest first: nothing past this page is new
+        oldest = parse_timestamp(last)
+        if oldest is not None and (oldest < start or (after and oldest < after)):
+            log.info(f"{tag}⏹️ Reached cutoff/watermark — stopping pagination early.")
+            return
+
+
+def iter_sessions(start, end, after=None, max_in_flight=None, account=None):
+    """
+    Streams raw sessions created between `start` and `end`, newest first.
+
+    Flattens `iter_session_pages()`; see it for the stopping rules.
+
+    Yields:
+        dict: Sessions (see `iter_session_pages`), in API order.
+    """
+    pages = iter_session_pages(start, end, after=after, max_in_flight=max_in_flight, account=account)
+    for items in pages:
+        yield from items
+
+
+def iter_lead_pages(start, end, after=None, max_in_flight=None, account=None):
+    """
+    Streams the leads of each page (see `iter_leads()`), one list per page.
+
+    Yields:
+        list[Lead]: The page's leads that pass the filters (may be empty).
+    """
+    # Compare pre-parsed epochs; a missing watermark admits everything
+    start_us = epoch_us(start)
+    after_us = epoch_us(after) if after else start_us - 1
+    pages = iter_session_pages(start, end, after=after, max_in_flight=max_in_flight, account=account)
+    for items in pages:
+        started = time.perf_counter()
+        leads = []
+        for session in items:
+            lead = Lead.from_session(session)
+            if lead is None or lead.created_us < start_us or lead.created_us < after_us:
+                continue
+            leads.append(lead)
+        metrics.observe("fetch_stage_seconds", time.perf_counter() - started, stage="filter")
+        metrics.inc("fetch_leads_total", len(leads))
+        yield leads
+
+
+def iter_leads(start, end, after=None, max_in_flight=None, account=None):
+    """
+    Streams lead records created at or after `start` (and `after`).
+
+    Each session is filtered and projected as it arrives; sessions with a
+    missing or invalid `createdAt` are skipped.
+
+    Args:
+        start (datetime): Oldest `createdAt` to keep (timezone-aware).
+        end (datetime): Newest `createdAt` requested from the API.
+        after (datetime | None): Only keep sessions not older than this.
+            Sessions created exactly at `after` are included; callers drop
+            the ones they already have by id (see `LeadExport`).
+        max_in_flight (int | None): Pages fetched concurrently.
+        account (http_client.Account | None): Account to fetch from.
+
+    Yields:
+        Lead: Lead records (see `lead.py`).
+    """
+    for leads in iter_lead_pages(start, end, after=after, max_in_flight=max_in_flight, account=account):
+        yield from leads
+
+
+class LeadExport:
+    """
+    Output side of a fetch: the day's lead file, the lead database and the
+    watermark.
+
+    Pages of leads are passed to `add()` as they arrive. On a clean exit the
+    leads already saved today by a previous incremental run are merged back
+    (JSON) or were simply appended to (NDJSON), and the watermark is
+    advanced. If the block raises, the watermark is unchanged and the lead
+    file is restored: the JSON file is left untouched and the NDJSON lines
+    written by this run are truncated away, so the next run retries the same
+    window without duplicating lines. Leads already upserted into the lead
+    database stay there; it deduplicates by id.
+
+    Args:
+        incremental (bool): Resume from the stored watermark (or, without
+            one, the newest lead in the database) and merge into the day's
+            file.
+        watermark_file (str | None): Watermark path override.
+        output_format (str | None): `json` or `ndjson`.
+            Defaults to `HELENA_OUTPUT_FORMAT`.
+        lead_db_file (str | None): Lead database path override.
+        output_dir (str | None): Directory for the lead file
+            (default: working directory).
+
+    Example:
+        with LeadExport() as export:
+            for leads in iter_lead_pages(export.cutoff, export.end, after=export.watermark):
+                export.add(leads)
+        print(export.result)
+    """
+
+    def __init__(self, incremental=True, watermark_file=None, output_format=None,
+                 lead_db_file=None, output_dir=None):
+        self.end = datetime.now(timezone.utc)
+        self.cutoff = self.end - timedelta(days=RECENT_DAYS)
+        self.incremental = incremental
+        self.watermark_file = watermark_file
+        self.watermark = load_watermark(watermark_file) if incremental else None
+        self.output_format = output_format or OUTPUT_FORMAT
+        self.lead_db_file = lead_db_file
+        self.file_name = f"leads_{datetime.now():%Y%m%d}.{self.output_format}"
+        if output_dir:
+            self.file_name = os.path.join(output_dir, self.file_name)
+        self.result = None
+
+        self._writer = None
+        self._store = None
+        self._previous = []
+        self._new_ids = set()
+        self._batch = []
+        self._newest_us = epoch_us(self.watermark) if self.watermark else None
+        self._boundary_ids = set()
+
+    def __enter__(self):
+        if self.output_format == "ndjson":
+            # Same-day incremental reruns simply append the new lines
+            self._writer = NDJSONWriter(self.file_name, append=self.incremental)
+        else:
+            self._writer = JSONArrayWriter(self.file_name)
+            if self.incremental and os.path.exists(self.file_name):
+                self._previous = list(iter_leads_from_records(iter_lead_file(self.file_name)))
+        self._store = LeadStore(self.lead_db_file)
+        if self.incremental and self.watermark is None:
+            # No watermark file (deleted, or a new machine): resume after the
+            # newest lead the database already holds instead of refetching
+            self.watermark = self._store.newest_created_at()
+            if self.watermark:
+                self._newest_us = epoch_us(self.watermark)
+                log.info("♻️ No watermark file — resuming from the newest stored lead")
+        if self.watermark:
+            # Leads stored at the watermark's second (the store keeps whole seconds)
+            second = self.watermark.replace(microsecond=0)
+            self._boundary_ids = set(self._store.iter_ids(second, second + timedelta(seconds=1)))
+        return self
+
+    @property
+    def count(self):
+        """int: Leads written so far by this export."""
+        return self._writer.count if self._writer is not None else 0
+
+    def add(self, leads):
+        """
+        Writes one page of leads to the file and (batched) to the database.
+
+        Args:
+            leads (list[Lead]): Leads of one page.
+        """
+        if self._boundary_ids:
+            # The watermark is inclusive: skip the leads of its second that
+            # are already stored (a watermark read back from the database
+            # has whole-second precision)
+            second = epoch_us(self.watermark) // 1_000_000
+            leads = [l for l in leads
+                     if l.created_ts != second or l.id not in self._boundary_ids]
+        for lead in leads:
+            if self._newest_us is None or lead.created_us > self._newest_us:
+                self._newest_us = lead.created_us
+            self._new_ids.add(lead.id)
+
+        started = time.perf_counter()
+        self._writer.write_all(lead.to_dict() for lead in leads)
+        metrics.observe("fetch_stage_seconds", time.perf_counter() - started, stage="write")
+
+        self._batch.extend(leads)
+        if len(self._batch) >= STORE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        with metrics.span("fetch_store"):
+            self._store.upsert_many(self._batch)
+        self._batch.clear()
+
+    def __exit__(self, exc_type, exc, tb):
+        count = 0
         try:
-            dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-        except ValueError:
-            continue
-        if dt < cutoff:
-            continue
+            if exc_type is None:
+                self._flush()
+                count = self._writer.count
+                # Keep the leads already saved today by a previous incremental run
+                if count:
+                    self._writer.write_all(
+                        l.to_dict() for l in self._previous if l.id not in self._new_ids
+                    )
+        finally:
+            self._store.close()
+            self._writer.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+
+        if not count:
+            if self.watermark:
+                log.info("💤 No new leads since the watermark.")
+            else:
+                log.warning(f"⚠️ No recent leads (last {RECENT_DAYS} days).")
+            self.result = {"count": 0, "file": None}
+            return False
+
+        save_watermark(from_epoch_us(self._newest_us), self.watermark_file)
+        log.info(f"✅ {count} leads saved to {self.file_name}")
+        self.result = {"count": count, "file": self.file_name}
+        return False
 
-        leads.append({
-            "id": s.get("id"),
-            "criado_em": created,
-            "status": s.get("status"),
-            "ultima_mensagem": s.get("lastMessageText"),
-            "link_chat": s.get("previewUrl"),
-        })
 
-    if not leads:
-        print("⚠️ No recent leads (last 7 days).")
-        return {"count": 0, "file": None}
+def fetch_helena_sessions(
+    max_in_flight=None, incremental=True, watermark_file=None, output_format=None,
+    lead_db_file=None, account=None, output_dir=None,
+):
+    """
+    Fetch recent sessions from Helena CRM and store them as leads.
+
+    This function handles pagination, filters sessions from the last 7 days,
+    and writes the leads to the day's lead file (`leads_YYYYMMDD.json`, or
+    `.ndjson`), upserts them into the lead database (`leads.db`, which
+    `generate_report` reads from) and saves the newest `createdAt` to
+    `watermark.json`. Pagination stops early once a page reaches sessions
+    that are too old or already ingested, and leads are streamed to disk as
+    pages arrive.
 
-    # --- Save to timestamped JSON file ---
-    file_name = f"leads_{datetime.now():%Y%m%d}.json"
-    with open(file_name, "w", encoding="utf-8") as f:
-        json.dump(leads, f, ensure_ascii=False, indent=2)
+    Args:
+        max_in_flight (int | None): Pages fetched concurrently.
+            Defaults to `HELENA_MAX_IN_FLIGHT` (1 = serial).
+        incremental (bool): Only fetch sessions newer than the stored
+            watermark and merge them into the day's file.
+        watermark_file (str | None): Watermark path override.
+        output_format (str | None): `json` (pretty-printed array) or `ndjson`
+            (appended line by line). Defaults to `HELENA_OUTPUT_FORMAT`.
+        lead_db_file (str | None): Lead database path override
+            (see `lead_store.py`).
+        account (http_client.Account | None): Account to fetch from.
+        output_dir (str | None): Directory for the lead file.
 
-    print(f"✅ {len(leads)} leads saved to {file_name}")
-    return {"count": len(leads), "file": file_name}
+    Returns:
+        dict: Summary with total leads (`count`) and lead file name
+        (`file`, None when there were no new leads)
+
+    Raises:
+        requests.exceptions.RequestException: If a page cannot be fetched.
+            The lead file and the watermark are left unchanged (leads
+            already upserted stay in the database, which deduplicates by
+            id), so the next run retries the same window.
+    """
+    log.info("🔄 Fetching recent sessions from Helena CRM...")
+
+    export = LeadExport(incremental, watermark_file, output_format, lead_db_file, output_dir)
+    with export:
+        if export.watermark:
+            log.info(f"⏱️ Incremental run — watermark at {export.watermark.isoformat()}")
+        pages = iter_lead_pages(
+            export.cutoff, export.end, after=export.watermark,
+            max_in_flight=max_in_flight, account=account,
+        )
+        for leads in pages:
+            export.add(leads)
+    return export.result
+
+
+def main(argv=None):
+    """Command-line entry point: fetch sessions and print a summary."""
+    parser = argparse.ArgumentParser(description="Fetch recent Helena CRM sessions.")
+    parser.add_argument(
+        "--concurrency", type=int, default=MAX_IN_FLIGHT,
+        help="number of pages fetched concurrently (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="ignore the stored watermark and refetch the whole 7-day window",
+    )
+    parser.add_argument(
+        "--format", choices=("json", "ndjson"), default=OUTPUT_FORMAT,
+        help="output file format (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="write a cProfile dump of the run next to the metrics",
+    )
+    args = parser.parse_args(argv)
+
+    with metrics.run("fetch", profile=args.profile):
+        try:
+            result = fetch_helena_sessions(
+                max_in_flight=args.concurrency,
+                incremental=not args.full,
+                output_format=args.format,
+            )
+        except requests.exceptions.RequestException as e:
+            log.error(f"❌ Fetch failed, watermark not advanced: {e}")
+            raise SystemExit(1)
+        log.info(f"\n📊 Summary → {result['count']} leads exported to {result['file']}")
+    return result
 
 
 if __name__ == "__main__":
-    result = fetch_helena_sessions()
-    print(f"\n📊 Summary → {result['count']} leads exported to {result['file']}")
\ No newline at end of file
+    main()
\ No newline at end of file
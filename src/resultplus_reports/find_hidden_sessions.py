@@ -5,31 +5,19 @@ Utility script to probe possible hidden session endpoints
 from the Helena CRM API, in order to identify accessible
 routes under /chat/v1/session/*.
 
+Every route is tried with GET (filters as query parameters) and POST
+(filters as JSON body) through the probe engine (`probe.py`); results are
+saved under `probe_results/`.
+
 Author: [Seu Nome ou equipe]
 Created: 2025-11-05
 """
 
-import os
-import json
-import logging
-from datetime import datetime
-from dotenv import load_dotenv
-import requests
-
-load_dotenv()
+from . import http_client, probe
 
-BASE = os.getenv("HELENA_API_URL")
-TOKEN = os.getenv("HELENA_API_KEY")
+BASE = http_client.BASE_URL
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
-
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+HEADERS = http_client.auth_headers(content_type="application/json", accept=None)
 
 ROUTES = [
     "session",
@@ -52,45 +40,18 @@ BODY = {
     "size": 5
 }
 
+PROBES = probe.ProbeSet(
+    "hidden-sessions", BASE, [f"/chat/v1/{route}" for route in ROUTES],
+    methods=["GET", "POST"], params=[BODY],
+    headers=HEADERS, timeout=10,
+    description="Probe session routes under /chat/v1/ with GET and POST.",
+)
 
-def probe_sessions():
-    results = []
-    logging.info(f"Probing possible session endpoints under {BASE}/chat/v1/ ...")
-
-    for route in ROUTES:
-        for method in ["GET", "POST"]:
-            url = f"{BASE}/chat/v1/{route}"
-            try:
-                response = (
-                    requests.get(url, headers=HEADERS, params=BODY, timeout=10)
-                    if method == "GET"
-                    else requests.post(url, headers=HEADERS, json=BODY, timeout=10)
-                )
-
-                if response.status_code in [200, 400]:
-                    logging.info(f"✅ {method} {url} | Status {response.status_code}")
-                    results.append({
-                        "method": method,
-                        "url": url,
-                        "status": response.status_code,
-                        "response_snippet": response.text[:300]
-                    })
-                else:
-                    logging.warning(f"❌ {method} {url} | Status {response.status_code}")
-
-            except Exception as e:
-                logging.error(f"⚠️ Error at {url}: {e}")
 
-    return results
+def main(argv=None):
+    """Runs the preset (see `probe.main` for the options)."""
+    return probe.main(PROBES, argv)
 
 
 if __name__ == "__main__":
-    found = probe_sessions()
-
-    if found:
-        out_path = f"hidden_sessions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(found, f, indent=2, ensure_ascii=False)
-        logging.info(f"Results saved to {out_path}")
-    else:
-        logging.info("No valid session endpoints found.")
\ No newline at end of file
+    main()
@@ -3,27 +3,20 @@ find_new_endpoint.py
 ---------------------
 Attempts to discover active or undocumented API endpoints in the Helena CRM.
 
-This script systematically tests a list of potential endpoint paths to detect
-which ones respond successfully or return data indicating valid chat sessions.
+This preset probes a list of potential endpoint paths (see `probe.py`) to
+detect which ones respond successfully or return data indicating valid chat
+sessions (verdict `match`).
 
 Environment variables required:
 - HELENA_API_URL: Base URL of the Helena API
 - HELENA_API_KEY: Bearer token for authentication
 """
 
-import os
-import requests
-from dotenv import load_dotenv
+from . import http_client, probe
 
-load_dotenv()
+BASE_URL = http_client.BASE_URL
 
-BASE_URL = os.getenv("HELENA_API_URL", "https://api.chat.resultplus.com.br")
-TOKEN = os.getenv("HELENA_API_KEY")
-
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+HEADERS = http_client.auth_headers(content_type="application/json", accept=None)
 
 PARAMS = {
     "startDate": "2025-10-01T00:00:00Z",
@@ -50,32 +43,20 @@ ENDPOINTS = [
     "/session/search",
 ]
 
-print(f"🔍 Scanning potential endpoints under: {BASE_URL}\n")
+# Dates that indicate the endpoint serves recent sessions
+RECENT_MARKERS = ["2025-10", "2025-09", "2025-11"]
 
-for path in ENDPOINTS:
-    url = f"{BASE_URL}{path}"
-    try:
-        print(f"➡️ Testing: {url}")
-        response = requests.get(url, headers=HEADERS, params=PARAMS, timeout=15)
-        status = response.status_code
-        content_preview = response.text.strip()[:300]
+PROBES = probe.ProbeSet(
+    "new-endpoint", BASE_URL, ENDPOINTS, params=[PARAMS], headers=HEADERS,
+    markers=RECENT_MARKERS, timeout=15,
+    description="Look for alternative endpoints serving recent sessions.",
+)
 
-        print(f"   → Status: {status}")
-        print(f"   → Response snippet: {content_preview}")
 
-        if any(m in content_preview for m in ["2025-10", "2025-09", "2025-11"]):
-            print("✅ Possible valid endpoint (contains recent data!)")
-        elif "InternalPort" in content_preview or "Incorrect URL" in content_preview:
-            print("⚠️ Internal routing error (likely incorrect path)")
-        elif "Not Found" in content_preview or status == 404:
-            print("❌ Not found")
-        elif status == 500:
-            print("⚠️ Internal server error")
-        else:
-            print("ℹ️ Responded but no recent data")
+def main(argv=None):
+    """Runs the preset (see `probe.main` for the options)."""
+    return probe.main(PROBES, argv)
 
-        print("-" * 80)
 
-    except Exception as e:
-        print(f"❌ Error testing {url}: {e}")
-        print("-" * 80)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -4,41 +4,70 @@ find_real_swagger_json.py
 Attempts to locate the real Swagger JSON file for the Helena CRM API.
 
 This script scans the public Swagger UI page to detect embedded JSON references,
-and falls back to checking `/swagger-resources` if not directly visible.
+and falls back to checking `/swagger-resources` if not directly visible. The
+first reference serving a spec is downloaded and cached for offline use (see
+`openapi_index.py`); while a spec is cached the search is skipped.
 
 Usage:
-    python find_real_swagger_json.py
+    python -m resultplus_reports.find_real_swagger_json [--refresh]
 """
 
-import re
+import argparse
+
 import requests
 
+from . import http_client, openapi_index
+
 BASE_URL = "https://chat.resultplus.com.br/swagger/"
 
-print(f"🔍 Searching for Swagger JSON definitions at {BASE_URL}\n")
 
-try:
-    html = requests.get(BASE_URL, timeout=10).text
-    matches = re.findall(r'swaggerUrl\s*:\s*"([^"]+)"', html)
+def main(argv=None):
+    """Prints the Swagger JSON references found in the Swagger UI page and caches the spec."""
+    parser = argparse.ArgumentParser(description="Locate and cache the real Swagger JSON.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="search again even if a spec is cached")
+    args = parser.parse_args(argv)
 
-    if not matches:
-        matches = re.findall(r'url\s*:\s*"([^"]+)"', html)
+    index = openapi_index.load_index()
+    if index is not None and not args.refresh:
+        print(f"📘 Spec already cached from {index.source} ({index.title}, {len(index)} routes).")
+        print("   Use --refresh to search again.")
+        return index
 
-    if matches:
-        print("✅ Swagger JSON reference(s) found:")
-        for m in matches:
-            print(f"   → {m}")
-    else:
-        print("⚠️ No swaggerUrl/url found in HTML.")
-        print("   The Swagger UI might load content dynamically via remote script.")
+    print(f"🔍 Searching for Swagger JSON definitions at {BASE_URL}\n")
 
-        alt_url = "https://chat.resultplus.com.br/swagger-resources"
-        r2 = requests.get(alt_url, timeout=10)
-        if r2.status_code == 200:
-            print(f"\n📡 /swagger-resources returned {len(r2.text)} characters:\n")
-            print(r2.text[:500])
+    try:
+        matches = openapi_index.swagger_ui_references(BASE_URL)
+
+        if matches:
+            print("✅ Swagger JSON reference(s) found:")
+            for m in matches:
+                print(f"   → {m}")
         else:
-            print(f"❌ /swagger-resources returned HTTP {r2.status_code}")
+            print("⚠️ No swaggerUrl/url found in HTML.")
+            print("   The Swagger UI might load content dynamically via remote script.")
+
+            alt_url = "https://chat.resultplus.com.br/swagger-resources"
+            r2 = http_client.get(alt_url, timeout=10)
+            if r2.status_code == 200:
+                print(f"\n📡 /swagger-resources returned {len(r2.text)} characters:\n")
+                print(r2.text[:500])
+                matches = [alt_url]
+            else:
+                print(f"❌ /swagger-resources returned HTTP {r2.status_code}")
+
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error fetching Swagger info: {e}")
+        return None
+
+    for url in matches:
+        index = openapi_index.fetch_spec(url)
+        if index is not None:
+            print(f"\n📘 Cached {index.title} {index.version} ({len(index)} routes) "
+                  f"in {openapi_index.SPEC_FILE}")
+            return index
+    return None
+
 
-except Exception as e:
-    print(f"❌ Error fetching Swagger info: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -3,70 +3,115 @@ generate_report.py
 ==================
 
 Generates and updates daily lead reports in **Google Docs** and **Google Sheets**
-using a Google Cloud service account for authentication.
+using a Google Cloud service account for authentication. API clients and
+access tokens are cached by `google_clients`.
 
 Main workflow:
-1. Load new leads from `leads.json`, avoiding duplicates with `sent.json`.
-2. Group leads by creation hour.
+1. Load the last 7 days of leads from the local lead database (`leads.db`,
+   filled by `fetch_result`) — or from `LEADS_FILE` (`.json`/`.ndjson`) when
+   set — avoiding duplicates with the sent-ID store (`sent.db`).
+2. Group leads by creation day and hour (see `rollup.py`), one report per day.
 3. Write a formatted summary to Google Docs.
 4. Append detailed data to Google Sheets.
+5. Mark the reported leads as sent, only after both writes succeed.
 
 Requirements:
 - Service account key file: `gcp-key.json`
-- Environment variables in `.env`:
+- Environment variables (or `.env`, loaded once by `config.py`):
     - `SPREADSHEET_ID`: Google Sheets spreadsheet ID
     - `DOC_ID`: Google Docs document ID
 
 Outputs:
 - Updates the daily report in Google Docs.
 - Appends a new set of rows to Google Sheets (one per hour + daily total).
+
+Every Google API call is timed into the run metrics (see `metrics.py`),
+together with the rows and characters written.
+
+Backfill mode (`--backfill START END`) regenerates one report per day of a
+date range from the lead database and pushes all of them at once: a single
+Sheets `values.batchUpdate` with one value range per day and a single Docs
+`batchUpdate` with every insert, chunked to stay under request size limits.
+With `--archive`, the range is read from the columnar lead archive
+(`archive.py`) instead of the lead database.
+
+The writers and `report_new_leads()` take optional document, spreadsheet
+and store overrides, so `tenants.py` can report each account to its own
+targets from its own databases.
 """
 
+import argparse
+import logging
 import os
-import json
-from datetime import datetime
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from dotenv import load_dotenv
+from datetime import date, datetime, timedelta, timezone
+
+from . import google_clients, metrics
+from .lead import iter_leads_from_records
+from .lead_store import LeadStore
+from .lead_writer import iter_lead_file
+from .rollup import rollup
+from .sent_store import SentStore
 
-# Load environment variables
-load_dotenv()
+log = logging.getLogger("resultplus_reports.generate_report")
 
-# Paths and identifiers
-SERVICE_ACCOUNT_FILE = "gcp-key.json"
+# Identifiers (the service account key is loaded by `google_clients`)
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 DOC_ID = os.getenv("DOC_ID")
+LEADS_FILE = os.getenv("LEADS_FILE")
+
+# Window of leads considered for a report when reading the lead database
+REPORT_WINDOW_DAYS = 7
+
+# Per-request limits for batched backfill writes
+SHEETS_MAX_ROWS_PER_BATCH = 10000
+DOCS_MAX_CHARS_PER_BATCH = 200000
+
+
+def _iter_recent_leads(lead_db_file=None):
+    start = datetime.now(timezone.utc) - timedelta(days=REPORT_WINDOW_DAYS)
+    with LeadStore(lead_db_file) as lead_store:
+        yield from lead_store.iter_range(start=start)
 
 
-def load_new_leads():
+def load_new_leads(leads_file=None, store=None, mark_sent=True, lead_db_file=None):
     """
-    Loads leads from `leads.json` and returns only new entries
-    that have not been sent yet. Updates `sent.json` accordingly.
+    Loads recent leads and returns only new entries that have not been
+    sent yet. Updates the sent-ID store accordingly.
+
+    Leads are read from the lead database (last `REPORT_WINDOW_DAYS` days,
+    via the `created_ts` index) unless a lead file is given.
+
+    Args:
+        leads_file (str | None): Lead file (`.json` or `.ndjson`).
+            Defaults to `LEADS_FILE`; None reads the lead database.
+        store (SentStore | None): Open store to use. A locked store is
+            opened (and closed) for this call when omitted.
+        mark_sent (bool): Record the returned IDs as sent immediately.
+            Pass False to mark them only after the report is written.
+        lead_db_file (str | None): Lead database to read. When given,
+            `LEADS_FILE` is ignored.
 
     Returns:
-        list[dict]: List of new leads to be processed.
+        list[Lead]: List of new leads to be processed.
     """
-    if not os.path.exists("leads.json"):
-        print("⚠️ No leads.json file found.")
+    if lead_db_file is None:
+        leads_file = leads_file or LEADS_FILE
+    if leads_file and not os.path.exists(leads_file):
+        log.warning(f"⚠️ No {leads_file} file found.")
         return []
 
-    with open("leads.json", "r", encoding="utf-8") as f:
-        leads = json.load(f)
-
-    sent_ids = set()
-    if os.path.exists("sent.json"):
-        with open("sent.json", "r", encoding="utf-8") as f:
-            try:
-                sent_ids = set(json.load(f))
-            except json.JSONDecodeError:
-                sent_ids = set()
+    if store is None:
+        with SentStore() as own_store:
+            return load_new_leads(leads_file, own_store, mark_sent, lead_db_file)
 
-    new_leads = [l for l in leads if l["id"] not in sent_ids]
+    if leads_file:
+        leads = iter_leads_from_records(iter_lead_file(leads_file))
+    else:
+        leads = _iter_recent_leads(lead_db_file)
+    new_leads = store.filter_new(leads)
 
-    # Update sent.json with processed IDs
-    sent_ids.update([l["id"] for l in new_leads])
-    with open("sent.json", "w", encoding="utf-8") as f:
-        json.dump(list(sent_ids), f, ensure_ascii=False, indent=2)
+    if mark_sent:
+        store.mark_sent(l.id for l in new_leads)
 
     return new_leads
 
@@ -76,39 +121,108 @@ def group_by_hour(leads):
     Groups leads by creation hour (local timezone).
 
     Args:
-        leads (list[dict]): List of lead dictionaries with "criado_em" field.
+        leads (list[Lead]): Lead records (bucketed by `created_ts`).
 
     Returns:
         dict[str, int]: Mapping of hour → lead count.
     """
+    return {hour: count for (hour,), count in rollup(leads, by=("hour",)).items()}
+
+
+def group_by_day_and_hour(leads):
+    """
+    Groups leads by creation day and hour (local timezone).
+
+    Args:
+        leads (list[Lead]): Lead records (bucketed by `created_ts`).
+
+    Returns:
+        dict[date, dict[str, int]]: Mapping of day → (hour → lead count),
+        oldest day first.
+    """
     grouped = {}
-    for lead in leads:
-        try:
-            dt = datetime.fromisoformat(lead["criado_em"].replace("Z", "+00:00"))
-            hour = dt.astimezone().strftime("%H:00")
-            grouped[hour] = grouped.get(hour, 0) + 1
-        except Exception:
-            continue
+    for (day, hour), count in rollup(leads, by=("day", "hour")).items():
+        grouped.setdefault(date.fromisoformat(day), {})[hour] = count
     return grouped
 
 
-def write_to_google_docs(report_text):
+def format_report(date_str, grouped, total):
+    """
+    Formats the human-readable daily report.
+
+    Args:
+        date_str (str): Report date in dd/mm/yyyy format.
+        grouped (dict): Mapping of hour → lead count.
+        total (int): Total number of leads for the day.
+
+    Returns:
+        str: Report text.
+    """
+    report_lines = [f"📅 {date_str}"]
+    for hour, count in sorted(grouped.items()):
+        report_lines.append(f"🕓 {hour} → {count} leads")
+    report_lines.append(f"\n👥 Total leads of the day: {total}\n")
+    return "\n".join(report_lines)
+
+
+def sheet_rows(date_str, grouped, total):
+    """
+    Builds the Google Sheets rows for one day: one per hour plus the total.
+
+    Returns:
+        list[list]: Rows of `[date, hour, count]`.
+    """
+    values = [[date_str, hour, count] for hour, count in sorted(grouped.items())]
+    values.append(["", "Daily total", total])
+    return values
+
+
+def _doc_insert_request(report_text):
+    return {"insertText": {"location": {"index": 1}, "text": report_text + "\n\n"}}
+
+
+def _doc_insert_size(request):
+    return len(request["insertText"]["text"])
+
+
+def _chunked(items, limit, size):
+    """Splits `items` into consecutive chunks whose total `size()` stays under `limit`."""
+    chunk, used = [], 0
+    for item in items:
+        item_size = size(item)
+        if chunk and used + item_size > limit:
+            yield chunk
+            chunk, used = [], 0
+        chunk.append(item)
+        used += item_size
+    if chunk:
+        yield chunk
+
+
+def _execute(api, call, request):
+    """Executes a Google API request, timing it into the run metrics."""
+    with metrics.span("google_request", api=api, call=call):
+        return request.execute()
+
+
+def write_to_google_docs(report_text, doc_id=None):
     """
     Inserts the given report text at the top of a Google Docs document.
 
     Args:
         report_text (str): Formatted report text.
+        doc_id (str | None): Document to write. Defaults to `DOC_ID`.
     """
-    credentials = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=["https://www.googleapis.com/auth/documents"]
-    )
-    docs_service = build("docs", "v1", credentials=credentials)
+    docs_service = google_clients.docs_service()
 
-    requests = [{"insertText": {"location": {"index": 1}, "text": report_text + "\n\n"}}]
-    docs_service.documents().batchUpdate(documentId=DOC_ID, body={"requests": requests}).execute()
+    requests = [_doc_insert_request(report_text)]
+    _execute("docs", "batchUpdate", docs_service.documents().batchUpdate(
+        documentId=doc_id or DOC_ID, body={"requests": requests}
+    ))
+    metrics.inc("google_chars_written_total", len(report_text))
 
 
-def write_to_google_sheets(date_str, grouped, total):
+def write_to_google_sheets(date_str, grouped, total, spreadsheet_id=None):
     """
     Appends lead data to a Google Sheets spreadsheet,
     including per-hour counts and daily total.
@@ -117,43 +231,283 @@ def write_to_google_sheets(date_str, grouped, total):
         date_str (str): Report date in dd/mm/yyyy format.
         grouped (dict): Mapping of hour → lead count.
         total (int): Total number of leads for the day.
+        spreadsheet_id (str | None): Spreadsheet to write.
+            Defaults to `SPREADSHEET_ID`.
     """
-    credentials = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
-    sheets_service = build("sheets", "v4", credentials=credentials)
-
-    values = [[date_str, hour, count] for hour, count in sorted(grouped.items())]
-    values.append(["", "Daily total", total])
+    sheets_service = google_clients.sheets_service()
 
-    body = {"values": values}
+    body = {"values": sheet_rows(date_str, grouped, total)}
 
-    sheets_service.spreadsheets().values().append(
-        spreadsheetId=SPREADSHEET_ID,
+    _execute("sheets", "append", sheets_service.spreadsheets().values().append(
+        spreadsheetId=spreadsheet_id or SPREADSHEET_ID,
         range="A1",
         valueInputOption="USER_ENTERED",
         body=body
-    ).execute()
+    ))
+    metrics.inc("google_rows_written_total", len(body["values"]))
 
 
-if __name__ == "__main__":
-    leads = load_new_leads()
-    if not leads:
-        print("⚠️ No new leads to include in the report.")
-    else:
-        grouped = group_by_hour(leads)
+def write_backfill_to_google_sheets(reports, spreadsheet_id=None):
+    """
+    Writes many daily reports to Google Sheets with batched value ranges.
+
+    The first free row is read once, then each day becomes one value range
+    of a `values.batchUpdate`, split into chunks of at most
+    `SHEETS_MAX_ROWS_PER_BATCH` rows.
+
+    Args:
+        reports (list[dict]): Reports from `build_backfill_reports()`.
+        spreadsheet_id (str | None): Spreadsheet to write.
+            Defaults to `SPREADSHEET_ID`.
+
+    Returns:
+        int: Number of API requests sent.
+    """
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    sheets_service = google_clients.sheets_service()
+    values_api = sheets_service.spreadsheets().values()
+
+    # Column C is filled on every row this report writes (counts and totals)
+    used = _execute("sheets", "get", values_api.get(spreadsheetId=spreadsheet_id, range="C:C"))
+    next_row = len(used.get("values", [])) + 1
+
+    data = []
+    for report in reports:
+        rows = sheet_rows(report["date_str"], report["grouped"], report["total"])
+        data.append({"range": f"A{next_row}:C{next_row + len(rows) - 1}", "values": rows})
+        next_row += len(rows)
+
+    calls = 1
+    for chunk in _chunked(data, SHEETS_MAX_ROWS_PER_BATCH, lambda d: len(d["values"])):
+        _execute("sheets", "batchUpdate", values_api.batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"valueInputOption": "USER_ENTERED", "data": chunk},
+        ))
+        metrics.inc("google_rows_written_total", sum(len(d["values"]) for d in chunk))
+        calls += 1
+    return calls
+
+
+def write_backfill_to_google_docs(reports, doc_id=None):
+    """
+    Inserts many daily reports into Google Docs with batched requests.
+
+    Reports are inserted oldest first at the top of the document, so the
+    newest ends up first, exactly as with daily runs. Requests are split
+    into chunks of at most `DOCS_MAX_CHARS_PER_BATCH` characters.
+
+    Args:
+        reports (list[dict]): Reports from `build_backfill_reports()`.
+        doc_id (str | None): Document to write. Defaults to `DOC_ID`.
+
+    Returns:
+        int: Number of API requests sent.
+    """
+    docs_service = google_clients.docs_service()
+
+    requests = [_doc_insert_request(report["text"]) for report in reports]
+
+    calls = 0
+    for chunk in _chunked(requests, DOCS_MAX_CHARS_PER_BATCH, _doc_insert_size):
+        _execute("docs", "batchUpdate", docs_service.documents().batchUpdate(
+            documentId=doc_id or DOC_ID, body={"requests": chunk}
+        ))
+        metrics.inc("google_chars_written_total", sum(_doc_insert_size(r) for r in chunk))
+        calls += 1
+    return calls
+
+
+def build_daily_reports(leads):
+    """
+    Computes one report per local calendar day present in `leads`.
+
+    Args:
+        leads (list[Lead]): Lead records.
+
+    Returns:
+        list[dict]: Reports (oldest first) with `date_str`, `grouped`,
+        `total` and `text`.
+    """
+    return _reports_by_day(group_by_day_and_hour(leads))
+
+
+def _reports_by_day(grouped_by_day):
+    reports = []
+    for day, grouped in grouped_by_day.items():
         total = sum(grouped.values())
+        date_str = day.strftime("%d/%m/%Y")
+        reports.append({
+            "date_str": date_str,
+            "grouped": grouped,
+            "total": total,
+            "text": format_report(date_str, grouped, total),
+        })
+    return reports
+
+
+def build_backfill_reports(start_day, end_day, store=None, source=None):
+    """
+    Computes one report per local calendar day in `[start_day, end_day]`.
+
+    Without `store`, counts come straight from the hourly rollup table
+    (O(hours) rows). With it, the range is read from the lead database in
+    one indexed query, filtered against the sent store and partitioned by
+    day in a single rollup pass. Days without leads (or whose leads were all
+    sent already) are skipped.
+
+    Args:
+        start_day (date): First day (inclusive).
+        end_day (date): Last day (inclusive).
+        store (SentStore | None): When given, leads already sent are excluded.
+        source (LeadStore | LeadArchive | None): Where leads are read from
+            (both provide `summarize`, `iter_ids` and `iter_range`).
+            Defaults to the lead database.
+
+    Returns:
+        tuple[list[dict], list[str]]: Reports (oldest first, see
+        `build_daily_reports`) and the IDs of the leads they cover.
+    """
+    start = datetime(start_day.year, start_day.month, start_day.day).astimezone()
+    end = (datetime(end_day.year, end_day.month, end_day.day) + timedelta(days=1)).astimezone()
+    if source is None:
+        with LeadStore() as lead_store:
+            return build_backfill_reports(start_day, end_day, store, lead_store)
+
+    if store is None:
+        grouped = {}
+        for (day, hour), count in source.summarize(start, end, by=("day", "hour")).items():
+            grouped.setdefault(date.fromisoformat(day), {})[hour] = count
+        return _reports_by_day(grouped), list(source.iter_ids(start, end))
+    leads = store.filter_new(source.iter_range(start, end))
+    return build_daily_reports(leads), [l.id for l in leads]
+
+
+def backfill_reports(start_day, end_day, include_sent=False, source=None):
+    """
+    Regenerates and pushes the reports for a range of days in bulk.
+
+    Args:
+        start_day (date): First day (inclusive).
+        end_day (date): Last day (inclusive).
+        include_sent (bool): Also report leads already marked as sent.
+        source (LeadStore | LeadArchive | None): Lead source
+            (default: the lead database).
+
+    Returns:
+        dict: Summary with days written and API requests used.
+    """
+    with SentStore() as store:
+        reports, ids = build_backfill_reports(
+            start_day, end_day, store=None if include_sent else store, source=source
+        )
+        if not reports:
+            log.warning("⚠️ No leads to backfill in this date range.")
+            return {"days": 0, "requests": 0}
 
-        date_str = datetime.now().strftime("%d/%m/%Y")
-        report_lines = [f"📅 {date_str}"]
-        for hour, count in sorted(grouped.items()):
-            report_lines.append(f"🕓 {hour} → {count} leads")
-        report_lines.append(f"\n👥 Total leads of the day: {total}\n")
+        for report in reports:
+            log.info(report["text"])
 
-        report_text = "\n".join(report_lines)
-        print(report_text)
+        calls = write_backfill_to_google_docs(reports)
+        calls += write_backfill_to_google_sheets(reports)
+        store.mark_sent(ids)
+
+    log.info(f"✅ Backfilled {len(reports)} days with {calls} API requests.")
+    return {"days": len(reports), "requests": calls}
+
+
+def _write_report(leads, doc_id=None, spreadsheet_id=None):
+    """
+    Formats the report for `leads` and writes it to Docs and Sheets.
+
+    Leads spanning several days produce one report per day, written with
+    the batched backfill writers.
+    """
+    reports = build_daily_reports(leads)
+    for report in reports:
+        log.info(report["text"])
+
+    if len(reports) == 1:
+        report = reports[0]
+        write_to_google_docs(report["text"], doc_id)
+        write_to_google_sheets(
+            report["date_str"], report["grouped"], report["total"], spreadsheet_id
+        )
+    elif reports:
+        write_backfill_to_google_docs(reports, doc_id)
+        write_backfill_to_google_sheets(reports, spreadsheet_id)
+
+
+def report_new_leads(lead_db_file=None, sent_db_file=None, doc_id=None, spreadsheet_id=None):
+    """
+    Reports the leads not sent yet and marks them as sent.
 
-        write_to_google_docs(report_text)
-        write_to_google_sheets(date_str, grouped, total)
+    The sent store is locked for the whole call so overlapping runs cannot
+    report the same leads twice, and leads are marked only after both
+    writes succeed.
 
-        print("✅ Report successfully updated in Google Docs and Google Sheets (no duplicates).")
\ No newline at end of file
+    Args:
+        lead_db_file (str | None): Lead database to read (None: `LEADS_FILE`
+            or the default database).
+        sent_db_file (str | None): Sent-ID store path override.
+        doc_id (str | None): Document to write. Defaults to `DOC_ID`.
+        spreadsheet_id (str | None): Spreadsheet to write.
+            Defaults to `SPREADSHEET_ID`.
+
+    Returns:
+        int: Number of leads reported.
+    """
+    with SentStore(sent_db_file) as store:
+        with metrics.span("report_load"):
+            leads = load_new_leads(store=store, mark_sent=False, lead_db_file=lead_db_file)
+        metrics.inc("report_leads_total", len(leads))
+        if not leads:
+            log.warning("⚠️ No new leads to include in the report.")
+            return 0
+
+        _write_report(leads, doc_id, spreadsheet_id)
+        store.mark_sent(l.id for l in leads)
+    return len(leads)
+
+
+def main(argv=None):
+    """Command-line entry point: build today's report and push it to Google."""
+    parser = argparse.ArgumentParser(description="Generate lead reports in Google Docs/Sheets.")
+    parser.add_argument(
+        "--backfill", nargs=2, metavar=("START", "END"), type=date.fromisoformat,
+        help="regenerate one report per day from START to END (YYYY-MM-DD, inclusive)",
+    )
+    parser.add_argument(
+        "--include-sent", action="store_true",
+        help="with --backfill, also report leads already marked as sent",
+    )
+    parser.add_argument(
+        "--archive", nargs="?", const="", metavar="DIR",
+        help="with --backfill, read leads from the columnar archive (default dir: LEAD_ARCHIVE_DIR)",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="write a cProfile dump of the run next to the metrics",
+    )
+    args = parser.parse_args(argv)
+
+    if args.backfill:
+        with metrics.run("report_backfill", profile=args.profile):
+            if args.archive is None:
+                backfill_reports(*args.backfill, include_sent=args.include_sent)
+                return
+            from .archive import LeadArchive
+
+            with LeadArchive(args.archive or None) as archive:
+                backfill_reports(
+                    *args.backfill, include_sent=args.include_sent, source=archive
+                )
+        return
+
+    with metrics.run("report", profile=args.profile):
+        if not report_new_leads():
+            return
+        log.info("✅ Report successfully updated in Google Docs and Google Sheets (no duplicates).")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
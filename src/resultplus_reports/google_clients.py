@@ -0,0 +1,156 @@
+"""
+google_clients.py
+-----------------
+Cached factory for the Google Docs and Sheets API clients.
+
+Every report write used to reload `gcp-key.json`, rebuild the service from
+its discovery document and exchange a fresh OAuth token, once per API. This
+module instead:
+
+- loads the service-account key once per process, with a single credential
+  covering both the Docs and Sheets scopes (one token exchange, not two);
+- builds each service once per process from the discovery documents bundled
+  with `google-api-python-client` (`static_discovery=True`, no network);
+- caches the access token on disk until shortly before it expires, so
+  repeated runs skip the OAuth round trip entirely.
+
+Environment variables (optional):
+- GCP_KEY_FILE: Service account key file (default: gcp-key.json)
+- GOOGLE_TOKEN_CACHE: Access-token cache file (default: .google_token.json)
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+SERVICE_ACCOUNT_FILE = os.getenv("GCP_KEY_FILE", "gcp-key.json")
+TOKEN_CACHE_FILE = os.getenv("GOOGLE_TOKEN_CACHE", ".google_token.json")
+
+SCOPES = [
+    "https://www.googleapis.com/auth/documents",
+    "https://www.googleapis.com/auth/spreadsheets",
+]
+
+# Cached tokens are discarded this long before their real expiry
+EXPIRY_MARGIN = timedelta(minutes=5)
+
+_lock = threading.Lock()
+_credentials = None
+_services = {}
+
+
+def _cache_key(credentials):
+    return f"{credentials.service_account_email}|{' '.join(sorted(credentials.scopes or []))}"
+
+
+def _load_cached_token(credentials):
+    if not os.path.exists(TOKEN_CACHE_FILE):
+        return
+    with open(TOKEN_CACHE_FILE, "r", encoding="utf-8") as f:
+        try:
+            entry = json.load(f).get(_cache_key(credentials))
+        except json.JSONDecodeError:
+            return
+    if not entry:
+        return
+    # google-auth compares expiry as a naive UTC datetime
+    expiry = datetime.fromisoformat(entry["expiry"])
+    if expiry - EXPIRY_MARGIN > datetime.now(timezone.utc).replace(tzinfo=None):
+        credentials.token = entry["token"]
+        credentials.expiry = expiry
+
+
+def _save_cached_token(credentials):
+    cache = {}
+    if os.path.exists(TOKEN_CACHE_FILE):
+        with open(TOKEN_CACHE_FILE, "r", encoding="utf-8") as f:
+            try:
+                cache = json.load(f)
+            except json.JSONDecodeError:
+                cache = {}
+    cache[_cache_key(credentials)] = {
+        "token": credentials.token,
+        "expiry": credentials.expiry.isoformat(),
+    }
+    tmp_path = f"{TOKEN_CACHE_FILE}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, TOKEN_CACHE_FILE)
+
+
+class _CachingCredentials(service_account.Credentials):
+    """Service-account credentials that persist each refreshed token."""
+
+    def refresh(self, request):
+        super().refresh(request)
+        _save_cached_token(self)
+
+
+def get_credentials():
+    """
+    Returns the process-wide service-account credentials.
+
+    A valid token from the on-disk cache is reused; otherwise google-auth
+    refreshes it on first use and the new token is written back to the cache.
+
+    Returns:
+        google.oauth2.service_account.Credentials: Shared credentials.
+    """
+    global _credentials
+    with _lock:
+        if _credentials is None:
+            credentials = _CachingCredentials.from_service_account_file(
+                SERVICE_ACCOUNT_FILE, scopes=SCOPES
+            )
+            _load_cached_token(credentials)
+            _credentials = credentials
+        return _credentials
+
+
+def get_service(name, version):
+    """
+    Returns a cached Google API client, building it on first use.
+
+    Args:
+        name (str): API name (e.g. "docs", "sheets").
+        version (str): API version (e.g. "v1", "v4").
+
+    Returns:
+        googleapiclient.discovery.Resource: The service client.
+    """
+    key = (name, version)
+    service = _services.get(key)
+    if service is None:
+        credentials = get_credentials()
+        with _lock:
+            service = _services.get(key)
+            if service is None:
+                service = build(
+                    name, version, credentials=credentials,
+                    static_discovery=True, cache_discovery=False,
+                )
+                _services[key] = service
+    return service
+
+
+def docs_service():
+    """Returns the cached Google Docs v1 client."""
+    return get_service("docs", "v1")
+
+
+def sheets_service():
+    """Returns the cached Google Sheets v4 client."""
+    return get_service("sheets", "v4")
+
+
+def reset():
+    """Drops cached credentials and clients (e.g. after rotating the key)."""
+    global _credentials
+    with _lock:
+        _credentials = None
+        _services.clear()
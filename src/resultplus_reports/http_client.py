@@ -0,0 +1,311 @@
+"""
+http_client.py
+--------------
+Shared HTTP transport for every Helena CRM and Swagger request.
+
+All scripts in this package go through the helpers below instead of calling
+`requests.get/post` directly, so they share a single pooled keep-alive
+session (one TCP+TLS handshake per host instead of one per request),
+negotiate gzip/deflate compression, and apply a consistent default timeout.
+
+When `HELENA_HTTP2=1` and `httpx[http2]` is installed, requests are sent
+through an HTTP/2 `httpx.Client` instead. Transport errors are re-raised as
+`requests.exceptions.RequestException` so callers handle both backends alike.
+
+Requests are paced per host by the adaptive rate controller in
+`rate_limit.py` (per account too, for requests made with a `rate_scope`,
+see `Account`), and 429/transient 5xx responses are retried with backoff
+(transport errors too, for idempotent methods). Once retries run out the
+last response is returned; callers that need a 200 raise `APIError`.
+
+GET responses go through the on-disk response cache (`response_cache.py`):
+immutable historical pages are served from disk and other cached pages
+are revalidated with `If-None-Match`/`If-Modified-Since`.
+
+Every attempt is recorded in `metrics.py` (latency, status, bytes, retries,
+rate-limiter waits and cache hits).
+
+Environment variables (optional):
+- HELENA_API_URL: Base URL of the Helena API
+- HELENA_API_KEY: Bearer token for authentication
+- HELENA_TIMEOUT: Default request timeout in seconds (default: 20)
+- HELENA_POOL_SIZE: Max pooled connections per host (default: 10)
+- HELENA_HTTP2: Set to 1 to use HTTP/2 via httpx when available
+- HELENA_RATE, HELENA_MAX_RETRIES, ...: Pacing and retries (see `rate_limit.py`)
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from . import metrics, rate_limit, response_cache
+
+BASE_URL = os.getenv("HELENA_API_URL", "https://api.chat.resultplus.com.br")
+TOKEN = os.getenv("HELENA_API_KEY")
+
+DEFAULT_TIMEOUT = float(os.getenv("HELENA_TIMEOUT", "20"))
+POOL_SIZE = int(os.getenv("HELENA_POOL_SIZE", "10"))
+USE_HTTP2 = os.getenv("HELENA_HTTP2", "").lower() in ("1", "true", "yes")
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "User-Agent": "resultplus-reports/1.0",
+}
+
+# Methods safe to resend after a transport error
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_lock = threading.Lock()
+_session = None
+
+
+class APIError(requests.exceptions.HTTPError):
+    """Raised when the API answers with an unexpected status code."""
+
+    def __init__(self, status_code, text="", url=None):
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+        message = f"HTTP {status_code}"
+        if url:
+            message += f" from {url}"
+        if text:
+            message += f": {text}"
+        super().__init__(message)
+
+
+class Account:
+    """
+    One Helena account: API base URL, bearer token and rate-limit scope.
+
+    The fetch functions take an optional account; without one they use
+    `DEFAULT_ACCOUNT` (`HELENA_API_URL`/`HELENA_API_KEY`).
+
+    Args:
+        base_url (str | None): API root. Defaults to `HELENA_API_URL`.
+        token (str | None): Bearer token. Defaults to `HELENA_API_KEY`.
+        rate_scope (str | None): Rate controller scope (see
+            `rate_limit.configure()`); None shares the host's controller.
+    """
+
+    __slots__ = ("base_url", "token", "rate_scope")
+
+    def __init__(self, base_url=None, token=None, rate_scope=None):
+        self.base_url = (base_url or BASE_URL).rstrip("/")
+        self.token = token or TOKEN
+        self.rate_scope = rate_scope
+
+    def url(self, path):
+        """Returns the absolute URL of an API path."""
+        return self.base_url + "/" + path.lstrip("/")
+
+    def headers(self, **kwargs):
+        """Returns `auth_headers()` for this account's token."""
+        return auth_headers(self.token, **kwargs)
+
+    def __repr__(self):
+        return f"Account({self.base_url!r}, rate_scope={self.rate_scope!r})"
+
+
+def auth_headers(token=None, content_type=None, accept="application/json"):
+    """
+    Builds the standard Helena request headers.
+
+    Args:
+        token (str | None): Bearer token. Defaults to `HELENA_API_KEY`.
+        content_type (str | None): Optional `Content-Type` header value.
+        accept (str | None): `Accept` header value.
+
+    Returns:
+        dict: Headers ready to be passed to `get()`/`post()`.
+    """
+    headers = {"Authorization": f"Bearer {token or TOKEN}"}
+    if accept:
+        headers["Accept"] = accept
+    if content_type:
+        headers["Content-Type"] = content_type
+    return headers
+
+
+# Account used when a fetch function is called without one
+DEFAULT_ACCOUNT = Account()
+
+
+def _build_httpx_client():
+    try:
+        import httpx
+    except ImportError:
+        return None
+    try:
+        return httpx.Client(
+            http2=True,
+            headers=DEFAULT_HEADERS,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=POOL_SIZE,
+                max_keepalive_connections=POOL_SIZE,
+            ),
+        )
+    except ImportError:
+        # httpx is installed without the optional `h2` package.
+        return None
+
+
+def _build_requests_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_session():
+    """
+    Returns the process-wide pooled session, creating it on first use.
+
+    Returns:
+        requests.Session | httpx.Client: The shared transport.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                client = _build_httpx_client() if USE_HTTP2 else None
+                _session = client or _build_requests_session()
+    return _session
+
+
+def _send(session, method, url, timeout, kwargs):
+    if isinstance(session, requests.Session):
+        return session.request(method, url, timeout=timeout, **kwargs)
+
+    import httpx
+
+    if "allow_redirects" in kwargs:
+        kwargs["follow_redirects"] = kwargs.pop("allow_redirects")
+    try:
+        return session.request(method, url, timeout=timeout, **kwargs)
+    except httpx.HTTPError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+
+
+def request(method, url, timeout=None, retries=None, cache=None, rate_scope=None, **kwargs):
+    """
+    Sends a request through the shared session.
+
+    Each attempt waits for the host's rate controller first. Responses with
+    a status in `rate_limit.RETRY_STATUSES` are retried after a backoff (or
+    the server's `Retry-After`); so are transport errors on idempotent
+    methods.
+
+    Args:
+        method (str): HTTP method (GET, POST, ...).
+        url (str): Absolute request URL.
+        timeout (float | None): Overrides `DEFAULT_TIMEOUT`.
+        retries (int | None): Overrides `HELENA_MAX_RETRIES` (0 disables).
+        cache (bool | None): Set to False to bypass the response cache
+            (only GET requests are ever cached).
+        rate_scope (str | None): Rate controller scope (see `Account`).
+        **kwargs: Passed through to the underlying client
+            (`headers`, `params`, `json`, `allow_redirects`, ...).
+
+    Returns:
+        requests.Response | httpx.Response: The last HTTP response.
+
+    Raises:
+        requests.exceptions.RequestException: On a transport error once
+            retries are exhausted (or immediately for non-idempotent methods).
+    """
+    store = response_cache.get_cache() if cache is not False and method.upper() == "GET" else None
+    if store is None:
+        return _request_with_retries(method, url, timeout, retries, kwargs, rate_scope)
+
+    key = response_cache.cache_key(method, url, kwargs.get("params"), kwargs.get("headers"))
+    entry = store.lookup(key)
+    if entry is not None:
+        if entry["immutable"]:
+            metrics.inc("http_cache_total", result="hit")
+            return response_cache.to_response(entry)
+        conditional = {}
+        if "ETag" in entry["headers"]:
+            conditional["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            conditional["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), **conditional}
+
+    response = _request_with_retries(method, url, timeout, retries, kwargs, rate_scope)
+    if response.status_code == 304 and entry is not None:
+        metrics.inc("http_cache_total", result="revalidated")
+        return response_cache.to_response(entry)
+    metrics.inc("http_cache_total", result="miss")
+    if response.status_code == 200:
+        store.store(
+            key, url, response.headers, response.content,
+            response_cache.is_immutable(kwargs.get("params"), response.content),
+        )
+    return response
+
+
+def _request_with_retries(method, url, timeout, retries, kwargs, rate_scope=None):
+    session = get_session()
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    retries = rate_limit.MAX_RETRIES if retries is None else retries
+    controller = rate_limit.get_controller(url, rate_scope)
+
+    method = method.upper()
+    attempt = 0
+    while True:
+        waited = time.perf_counter()
+        controller.acquire()
+        started = time.perf_counter()
+        metrics.observe("http_rate_wait_seconds", started - waited)
+        try:
+            response = _send(session, method, url, timeout, dict(kwargs))
+        except requests.exceptions.RequestException as e:
+            latency = time.perf_counter() - started
+            controller.record(None)
+            metrics.inc("http_errors_total", method=method, error=type(e).__name__)
+            metrics.event("http_request", started, latency, method=method, url=url, error=str(e))
+            if attempt >= retries or method not in IDEMPOTENT_METHODS:
+                raise
+            metrics.inc("http_retries_total", reason="transport")
+            time.sleep(rate_limit.backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        latency = time.perf_counter() - started
+        status = response.status_code
+        retry_after = rate_limit.parse_retry_after(response.headers.get("Retry-After"))
+        controller.record(status, latency, retry_after)
+        metrics.inc("http_requests_total", method=method, status=status)
+        metrics.inc("http_response_bytes_total", len(response.content), method=method)
+        metrics.observe("http_request_seconds", latency, method=method)
+        metrics.event("http_request", started, latency, method=method, url=url, status=status)
+        if status not in rate_limit.RETRY_STATUSES or attempt >= retries:
+            return response
+        metrics.inc("http_retries_total", reason=status)
+        time.sleep(rate_limit.backoff_delay(attempt, retry_after))
+        attempt += 1
+
+
+def get(url, **kwargs):
+    """Shortcut for `request("GET", url, ...)`."""
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """Shortcut for `request("POST", url, ...)`."""
+    return request("POST", url, **kwargs)
+
+
+def close():
+    """Closes the shared session and its pooled connections."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,152 @@
+"""
+jsonlib.py
+----------
+Pluggable JSON backend and field-projecting page decoder.
+
+Every page response and lead file goes through this module instead of the
+stdlib `json` module directly:
+
+- `loads()`/`dumps()`/`dumps_pretty()` use the fastest installed backend:
+  msgspec or orjson for decoding, orjson for encoding, and the stdlib as
+  fallback. Output is the same as `json.dumps(..., ensure_ascii=False)`
+  (with `indent=2` for `dumps_pretty()`) except that compact output has no
+  spaces after separators.
+- `decode_page()` returns a page's `items`. With msgspec it decodes only the
+  needed fields: unused ones (nested contacts, tags, ...) are skipped by
+  the decoder and never become Python objects, which roughly halves decode
+  time and peak memory for large pages. orjson and the stdlib decode the
+  page in full; projecting their dicts afterwards would cost more than it
+  saves, so their items are returned as decoded.
+
+Install `resultplus-reports[fastjson]` to get msgspec and orjson.
+
+Environment variables (optional):
+- HELENA_JSON_BACKEND: `auto` (default), `msgspec`, `orjson` or `json`
+"""
+
+import json
+import os
+from typing import Any, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+BACKEND = os.getenv("HELENA_JSON_BACKEND", "auto").lower()
+
+# Session fields used downstream (see `lead.Lead.from_session`)
+SESSION_FIELDS = ("id", "createdAt", "status", "lastMessageText", "previewUrl")
+
+
+def _use(name, module):
+    return module is not None and BACKEND in ("auto", name)
+
+
+def decoder_name():
+    """Returns the backend used for decoding (`msgspec`, `orjson` or `json`)."""
+    if _use("msgspec", msgspec):
+        return "msgspec"
+    if _use("orjson", orjson):
+        return "orjson"
+    return "json"
+
+
+def encoder_name():
+    """Returns the backend used for encoding (`orjson` or `json`)."""
+    return "orjson" if _use("orjson", orjson) else "json"
+
+
+# --- Generic encode/decode -------------------------------------------------------
+
+def loads(data):
+    """
+    Decodes a JSON document.
+
+    Args:
+        data (bytes | str): JSON text.
+
+    Raises:
+        ValueError: On invalid JSON (every backend's error subclasses it).
+    """
+    if _use("msgspec", msgspec):
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    if _use("orjson", orjson):
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Encodes `obj` as compact JSON text (non-ASCII kept as is)."""
+    if _use("orjson", orjson):
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_pretty(obj):
+    """Encodes `obj` exactly like `json.dumps(obj, ensure_ascii=False, indent=2)`."""
+    if _use("orjson", orjson):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+# --- Page decoding ---------------------------------------------------------------
+
+_msgspec_decoders = {}
+
+
+def _msgspec_decoder(fields):
+    decoder = _msgspec_decoders.get(fields)
+    if decoder is None:
+        Session = msgspec.defstruct("Session", [(f, Any, None) for f in fields])
+        Page = msgspec.defstruct("Page", [("items", Optional[List[Session]], None)])
+        decoder = _msgspec_decoders[fields] = msgspec.json.Decoder(Page)
+    return decoder
+
+
+def _decode_msgspec(content, fields):
+    try:
+        page = _msgspec_decoder(fields).decode(content)
+    except msgspec.ValidationError:
+        # Unexpected shape (e.g. `items` is not a list of objects)
+        return _items(loads(content))
+    except msgspec.DecodeError as e:
+        raise ValueError(str(e)) from e
+    return [
+        {f: getattr(s, f) for f in fields}
+        for s in page.items or ()
+    ]
+
+
+def _items(document):
+    items = document.get("items") if isinstance(document, dict) else None
+    return [item for item in items or () if isinstance(item, dict)]
+
+
+def decode_page(content, fields=SESSION_FIELDS):
+    """
+    Decodes the `items` of a page response.
+
+    Args:
+        content (bytes | str): Response body of the form `{"items": [...]}`.
+        fields (tuple[str]): Item fields needed by the caller.
+
+    Returns:
+        list[dict]: Items in page order. With msgspec they hold exactly
+        `fields` (None when missing); otherwise every decoded field. Read
+        them with `.get()`.
+
+    Raises:
+        ValueError: On invalid JSON.
+    """
+    if _use("msgspec", msgspec):
+        return _decode_msgspec(content, tuple(fields))
+    return _items(loads(content))
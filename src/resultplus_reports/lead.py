@@ -0,0 +1,138 @@
+"""
+lead.py
+-------
+Compact lead record shared by the fetch, dedup and report steps.
+
+Sessions arrive from the API as dicts; as soon as a page is decoded each one
+is projected onto a `Lead`: a `__slots__` object holding the five exported
+fields plus `created_us`, the creation time as integer epoch microseconds.
+The ISO timestamp is parsed exactly once, here; the 7-day cutoff, the
+watermark comparison, backfill shard bounds and the hourly report grouping
+all compare or bucket that integer instead of re-parsing `criado_em`.
+
+A `Lead` needs over a third less memory than the equivalent lead dict,
+parsed `created_us` included (the strings themselves are shared; about 120
+vs 190 bytes per lead on CPython 3.11, measured with tracemalloc in
+`tests/test_lead_memory.py`), and none of the raw session's nested fields
+survive the projection. `to_dict()` returns the exported record (`id`,
+`criado_em`, `status`, `ultima_mensagem`, `link_chat`), so lead files are
+unchanged.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from .watermark import parse_timestamp
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def epoch_us(dt):
+    """Converts a timezone-aware datetime to integer epoch microseconds (exact)."""
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def from_epoch_us(value):
+    """Converts epoch microseconds back to a UTC datetime."""
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class Lead:
+    """
+    One lead, with its creation time pre-parsed.
+
+    Attributes:
+        id (str | None): Session ID.
+        created_us (int): Creation time as epoch microseconds (UTC).
+        criado_em (str): Creation time as sent by the API (kept verbatim
+            for the exported files).
+        status (str | None): Session status.
+        ultima_mensagem (str | None): Last message text.
+        link_chat (str | None): Chat preview URL.
+    """
+
+    __slots__ = ("id", "created_us", "criado_em", "status", "ultima_mensagem", "link_chat")
+
+    def __init__(self, id, created_us, criado_em, status=None, ultima_mensagem=None,
+                 link_chat=None):
+        self.id = id
+        self.created_us = created_us
+        self.criado_em = criado_em
+        self.status = status
+        self.ultima_mensagem = ultima_mensagem
+        self.link_chat = link_chat
+
+    @classmethod
+    def from_session(cls, session):
+        """
+        Projects a raw Helena session onto a lead.
+
+        Args:
+            session (dict): Session as returned by the API.
+
+        Returns:
+            Lead | None: The lead, or None if `createdAt` is missing or invalid.
+        """
+        created_at = session.get("createdAt")
+        dt = parse_timestamp(created_at)
+        if dt is None:
+            return None
+        return cls(
+            session.get("id"), epoch_us(dt), created_at, session.get("status"),
+            session.get("lastMessageText"), session.get("previewUrl"),
+        )
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        Builds a lead from an exported record (see `to_dict`).
+
+        Returns:
+            Lead | None: The lead, or None if `criado_em` is missing or invalid.
+        """
+        created_at = record.get("criado_em")
+        dt = parse_timestamp(created_at)
+        if dt is None:
+            return None
+        return cls(
+            record.get("id"), epoch_us(dt), created_at, record.get("status"),
+            record.get("ultima_mensagem"), record.get("link_chat"),
+        )
+
+    @property
+    def created_ts(self):
+        """Creation time as integer epoch seconds."""
+        return self.created_us // 1_000_000
+
+    @property
+    def created_at(self):
+        """Creation time as a UTC datetime."""
+        return from_epoch_us(self.created_us)
+
+    def to_dict(self):
+        """Returns the exported lead record."""
+        return {
+            "id": self.id,
+            "criado_em": self.criado_em,
+            "status": self.status,
+            "ultima_mensagem": self.ultima_mensagem,
+            "link_chat": self.link_chat,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Lead):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Lead(id={self.id!r}, criado_em={self.criado_em!r}, status={self.status!r})"
+
+
+def iter_leads_from_records(records):
+    """Converts exported records to leads, skipping ones without a valid `criado_em`."""
+    for record in records:
+        lead = Lead.from_record(record)
+        if lead is not None:
+            yield lead
@@ -0,0 +1,377 @@
+"""
+lead_store.py
+-------------
+Local indexed lead database shared by the fetch and report steps.
+
+`fetch_result` upserts every lead it ingests into a SQLite database, and
+`generate_report` (or any ad-hoc query) reads time ranges through the
+`created_ts` index instead of re-parsing daily JSON files. Leads are keyed
+by `id`, so refetching the same session simply updates it.
+
+Columns mirror the exported lead records (`id`, `criado_em`, `status`,
+`ultima_mensagem`, `link_chat`) plus `created_ts`, the creation time as epoch
+seconds, which backs all range queries. Leads go in and come out as `Lead`
+records (see `lead.py`), so no timestamp is parsed on either side.
+
+A `lead_rollup` table holds pre-aggregated counts per UTC hour × status.
+SQLite triggers keep it in step with every insert, update and delete on
+`leads` within the same transaction, so report summaries read O(hours) rows
+instead of O(leads) records. Hourly buckets are mapped to local days/hours
+at read time (zones with non-whole-hour offsets are approximated to the
+hour). `rebuild_rollups()` recomputes the table from raw leads and
+`check_rollups()` reports any drift.
+
+Usage:
+    python -m resultplus_reports.lead_store --since 2025-09-01 --status OPEN
+    python -m resultplus_reports.lead_store --summary week
+    python -m resultplus_reports.lead_store --check-rollups
+
+Environment variables (optional):
+- LEAD_DB_FILE: Path of the SQLite database (default: leads.db)
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from .lead import Lead
+
+LEAD_DB_FILE = os.getenv("LEAD_DB_FILE", "leads.db")
+
+_COLUMNS = ("id", "created_ts", "criado_em", "status", "ultima_mensagem", "link_chat")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id TEXT PRIMARY KEY,
+    criado_em TEXT NOT NULL,
+    created_ts INTEGER NOT NULL,
+    status TEXT,
+    ultima_mensagem TEXT,
+    link_chat TEXT,
+    ingested_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leads_created_ts ON leads (created_ts);
+CREATE INDEX IF NOT EXISTS idx_leads_status_created_ts ON leads (status, created_ts);
+
+CREATE TABLE IF NOT EXISTS lead_rollup (
+    bucket_ts INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (bucket_ts, status)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_leads_rollup_insert AFTER INSERT ON leads
+BEGIN
+    INSERT INTO lead_rollup (bucket_ts, status, count)
+    VALUES (NEW.created_ts / 3600 * 3600, COALESCE(NEW.status, ''), 1)
+    ON CONFLICT (bucket_ts, status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_leads_rollup_update AFTER UPDATE OF created_ts, status ON leads
+WHEN OLD.created_ts / 3600 != NEW.created_ts / 3600 OR OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE lead_rollup SET count = count - 1
+    WHERE bucket_ts = OLD.created_ts / 3600 * 3600 AND status = COALESCE(OLD.status, '');
+    INSERT INTO lead_rollup (bucket_ts, status, count)
+    VALUES (NEW.created_ts / 3600 * 3600, COALESCE(NEW.status, ''), 1)
+    ON CONFLICT (bucket_ts, status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_leads_rollup_delete AFTER DELETE ON leads
+BEGIN
+    UPDATE lead_rollup SET count = count - 1
+    WHERE bucket_ts = OLD.created_ts / 3600 * 3600 AND status = COALESCE(OLD.status, '');
+END;
+"""
+
+# Raw-data aggregate that `lead_rollup` must always match
+_ROLLUP_FROM_LEADS = (
+    "SELECT created_ts / 3600 * 3600 AS bucket_ts, COALESCE(status, '') AS status,"
+    " COUNT(*) AS count FROM leads GROUP BY 1, 2"
+)
+
+
+def _epoch(value):
+    """Converts a datetime (or None) to epoch seconds (or None)."""
+    return None if value is None else int(value.timestamp())
+
+
+class LeadStore:
+    """
+    SQLite-backed lead table with indexes on `created_ts`, `status` and `id`.
+
+    Example:
+        with LeadStore() as store:
+            store.upsert_many(leads)
+            print(store.count_range(start, end))
+    """
+
+    def __init__(self, path=None):
+        self.path = path or LEAD_DB_FILE
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+        # Databases created before the rollup table existed
+        if self._rollups_missing():
+            self.rebuild_rollups()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Closes the database connection."""
+        self.conn.close()
+
+    # --- Writes --------------------------------------------------------------
+
+    def upsert_many(self, leads):
+        """
+        Inserts or updates leads in a single transaction.
+
+        Leads without an `id` are skipped, as are exported records (dicts)
+        with an invalid `criado_em`.
+
+        Args:
+            leads (Iterable[Lead | dict]): Lead records.
+
+        Returns:
+            int: Number of rows written.
+        """
+        now = int(time.time())
+        rows = []
+        for lead in leads:
+            if not isinstance(lead, Lead):
+                lead = Lead.from_record(lead)
+            if lead is None or not lead.id:
+                continue
+            rows.append((
+                lead.id, lead.criado_em, lead.created_ts, lead.status,
+                lead.ultima_mensagem, lead.link_chat, now,
+            ))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO leads (id, criado_em, created_ts, status,"
+                " ultima_mensagem, link_chat, ingested_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET"
+                " criado_em = excluded.criado_em,"
+                " created_ts = excluded.created_ts,"
+                " status = excluded.status,"
+                " ultima_mensagem = excluded.ultima_mensagem,"
+                " link_chat = excluded.link_chat,"
+                " ingested_at = excluded.ingested_at",
+                rows,
+            )
+        return len(rows)
+
+    # --- Reads ---------------------------------------------------------------
+
+    @staticmethod
+    def _range_clause(start, end, status):
+        clauses, args = [], []
+        if start is not None:
+            clauses.append("created_ts >= ?")
+            args.append(_epoch(start))
+        if end is not None:
+            clauses.append("created_ts < ?")
+            args.append(_epoch(end))
+        if status is not None:
+            clauses.append("status = ?")
+            args.append(status)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, args
+
+    def iter_range(self, start=None, end=None, status=None):
+        """
+        Streams leads created in `[start, end)`, newest first.
+
+        Args:
+            start (datetime | None): Inclusive lower bound.
+            end (datetime | None): Exclusive upper bound.
+            status (str | None): Only leads with this status.
+
+        Yields:
+            Lead: Lead records (`created_us` at whole-second precision).
+        """
+        where, args = self._range_clause(start, end, status)
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM leads{where} ORDER BY created_ts DESC", args
+        )
+        for lead_id, created_ts, *fields in cursor:
+            yield Lead(lead_id, created_ts * 1_000_000, *fields)
+
+    def count_range(self, start=None, end=None, status=None):
+        """Counts leads created in `[start, end)` (index-only scan)."""
+        where, args = self._range_clause(start, end, status)
+        return self.conn.execute(f"SELECT COUNT(*) FROM leads{where}", args).fetchone()[0]
+
+    def count_by_status(self, start=None, end=None):
+        """
+        Counts leads per status in `[start, end)`.
+
+        Returns:
+            dict[str, int]: Mapping of status → lead count.
+        """
+        where, args = self._range_clause(start, end, None)
+        rows = self.conn.execute(
+            f"SELECT status, COUNT(*) FROM leads{where} GROUP BY status", args
+        )
+        return dict(rows.fetchall())
+
+    # --- Rollups -------------------------------------------------------------
+
+    def _rollups_missing(self):
+        has_leads = self.conn.execute("SELECT 1 FROM leads LIMIT 1").fetchone()
+        has_rollups = self.conn.execute("SELECT 1 FROM lead_rollup LIMIT 1").fetchone()
+        return bool(has_leads) and not has_rollups
+
+    def rebuild_rollups(self):
+        """
+        Recomputes `lead_rollup` from the raw leads (repair).
+
+        Returns:
+            int: Number of rollup rows written.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM lead_rollup")
+            cursor = self.conn.execute(
+                f"INSERT INTO lead_rollup (bucket_ts, status, count) {_ROLLUP_FROM_LEADS}"
+            )
+        return cursor.rowcount
+
+    def check_rollups(self):
+        """
+        Compares `lead_rollup` against an aggregate of the raw leads.
+
+        Returns:
+            list[tuple]: Mismatching `(bucket_ts, status, rollup_count,
+            raw_count)` rows; empty when consistent.
+        """
+        rows = self.conn.execute(
+            "SELECT bucket_ts, status, SUM(rolled), SUM(raw) FROM ("
+            " SELECT bucket_ts, status, count AS rolled, 0 AS raw FROM lead_rollup"
+            " UNION ALL"
+            f" SELECT bucket_ts, status, 0, count FROM ({_ROLLUP_FROM_LEADS})"
+            ") GROUP BY bucket_ts, status HAVING SUM(rolled) != SUM(raw)"
+        )
+        return rows.fetchall()
+
+    def iter_rollup_buckets(self, start=None, end=None):
+        """
+        Streams hourly rollup rows overlapping `[start, end)`.
+
+        Yields:
+            tuple[int, str | None, int]: `(bucket_epoch, status, count)`.
+        """
+        clauses, args = ["count != 0"], []
+        if start is not None:
+            clauses.append("bucket_ts >= ?")
+            args.append(_epoch(start) // 3600 * 3600)
+        if end is not None:
+            clauses.append("bucket_ts < ?")
+            args.append(_epoch(end))
+        cursor = self.conn.execute(
+            f"SELECT bucket_ts, status, count FROM lead_rollup"
+            f" WHERE {' AND '.join(clauses)} ORDER BY bucket_ts",
+            args,
+        )
+        for bucket_ts, status, count in cursor:
+            yield bucket_ts, status or None, count
+
+    def summarize(self, start=None, end=None, by=("day", "hour", "status"), tz=None):
+        """
+        Counts leads by day/hour/status/week/month from the rollup table.
+
+        Reads one row per hour and status, never the raw leads.
+
+        Args:
+            start (datetime | None): Inclusive lower bound (hour-aligned).
+            end (datetime | None): Exclusive upper bound.
+            by (Sequence[str]): Dimensions (see `rollup.DIMENSIONS`).
+            tz (tzinfo | None): Timezone for partitioning (default: local).
+
+        Returns:
+            dict[tuple, int]: Mapping of dimension values → lead count.
+        """
+        # Imported here so plain fetches never load NumPy
+        from .rollup import rollup_buckets
+
+        return rollup_buckets(self.iter_rollup_buckets(start, end), by=by, tz=tz)
+
+    def iter_ids(self, start=None, end=None):
+        """Streams the IDs of leads created in `[start, end)` (index scan)."""
+        where, args = self._range_clause(start, end, None)
+        for (lead_id,) in self.conn.execute(f"SELECT id FROM leads{where}", args):
+            yield lead_id
+
+    def newest_created_at(self):
+        """Returns the newest stored `created_ts` as a datetime (or None)."""
+        value = self.conn.execute("SELECT MAX(created_ts) FROM leads").fetchone()[0]
+        return None if value is None else datetime.fromtimestamp(value, timezone.utc)
+
+
+def _parse_date(value):
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def main(argv=None):
+    """Command-line entry point: ad-hoc range counts over the lead store."""
+    parser = argparse.ArgumentParser(description="Query the local lead database.")
+    parser.add_argument("--since", type=_parse_date, help="inclusive ISO date/time")
+    parser.add_argument("--until", type=_parse_date, help="exclusive ISO date/time")
+    parser.add_argument("--status", help="only count leads with this status")
+    parser.add_argument(
+        "--summary", choices=("day", "week", "month"),
+        help="print per-period totals from the rollup table",
+    )
+    parser.add_argument(
+        "--rebuild-rollups", action="store_true", help="recompute rollups from raw leads"
+    )
+    parser.add_argument(
+        "--check-rollups", action="store_true", help="compare rollups against raw leads"
+    )
+    args = parser.parse_args(argv)
+
+    with LeadStore() as store:
+        if args.rebuild_rollups:
+            print(f"🔧 Rebuilt {store.rebuild_rollups()} rollup rows.")
+            return
+        if args.check_rollups:
+            mismatches = store.check_rollups()
+            if not mismatches:
+                print("✅ Rollups are consistent with raw leads.")
+            for bucket_ts, status, rolled, raw in mismatches:
+                hour = datetime.fromtimestamp(bucket_ts, timezone.utc).isoformat()
+                print(f"❌ {hour} {status or '-'}: rollup {rolled} ≠ raw {raw}")
+            return
+        if args.summary:
+            started = time.perf_counter()
+            summary = store.summarize(args.since, args.until, by=(args.summary,))
+            elapsed = (time.perf_counter() - started) * 1000
+            for (period,), count in summary.items():
+                print(f"📅 {period} → {count} leads")
+            print(f"({len(summary)} periods in {elapsed:.1f} ms)")
+            return
+
+        started = time.perf_counter()
+        total = store.count_range(args.since, args.until, args.status)
+        by_status = store.count_by_status(args.since, args.until)
+        elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"👥 {total} leads in range ({elapsed:.1f} ms)")
+    for status, count in sorted(by_status.items(), key=lambda kv: str(kv[0])):
+        print(f"   {status}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+lead_writer.py
+--------------
+Streaming writers and readers for exported lead files.
+
+`JSONArrayWriter` writes records one at a time while producing exactly the
+same bytes as `json.dump(records, f, ensure_ascii=False, indent=2)`, so the
+fetch pipeline can consume a lead generator without holding the whole list
+in memory. The file is written to a temporary path and atomically renamed
+into place on success; an aborted run, or one that wrote no records, leaves
+the previous file untouched.
+
+Encoding and decoding go through `jsonlib` (orjson/msgspec when installed).
+
+`NDJSONWriter` writes newline-delimited JSON (one compact record per line)
+and opens the file in append mode, so same-day reruns only add new records
+and data is flushed to disk while the fetch is still running. If the run
+fails, the file is cut back to its size before the run, so a retry from the
+same watermark does not append the same records twice.
+`iter_lead_file()` streams records back from either format; NDJSON files are
+read line by line, so parse time stays proportional to the data read.
+"""
+
+import os
+
+from . import jsonlib
+
+
+class JSONArrayWriter:
+    """
+    Incrementally writes a pretty-printed JSON array.
+
+    Example:
+        with JSONArrayWriter("leads_20250101.json") as writer:
+            for lead in iter_leads(start, end):
+                writer.write(lead)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._tmp_path = f"{path}.tmp"
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def write(self, record):
+        """Appends one record to the array."""
+        if self._file is None:
+            self._file = open(self._tmp_path, "w", encoding="utf-8")
+            self._file.write("[")
+        text = jsonlib.dumps_pretty(record)
+        self._file.write(",\n  " if self.count else "\n  ")
+        self._file.write(text.replace("\n", "\n  "))
+        self.count += 1
+
+    def write_all(self, records):
+        """Appends every record from an iterable."""
+        for record in records:
+            self.write(record)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is None:
+            return False
+        self._file.write("\n]")
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.remove(self._tmp_path)
+        return False
+
+
+class NDJSONWriter:
+    """
+    Appends records to a newline-delimited JSON file.
+
+    When the `with` block raises, the lines it appended are removed again
+    (the file is truncated to its previous size, or deleted if it did not
+    exist). Without `append`, records go to a temporary file that replaces
+    `path` only on success, as with `JSONArrayWriter`.
+
+    Args:
+        path (str): Output file.
+        append (bool): Append to an existing file instead of truncating it.
+        flush_every (int): Flush to disk after this many records.
+    """
+
+    def __init__(self, path, append=True, flush_every=50):
+        self.path = path
+        self.count = 0
+        self.append = append
+        self.flush_every = flush_every
+        self._tmp_path = f"{path}.tmp"
+        self._file = None
+        self._start_size = None
+
+    def __enter__(self):
+        return self
+
+    def write(self, record):
+        """Appends one record as a single JSON line."""
+        if self._file is None:
+            if self.append:
+                if os.path.exists(self.path):
+                    self._start_size = os.path.getsize(self.path)
+                self._file = open(self.path, "a", encoding="utf-8")
+            else:
+                self._file = open(self._tmp_path, "w", encoding="utf-8")
+        self._file.write(jsonlib.dumps(record))
+        self._file.write("\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def write_all(self, records):
+        """Appends every record from an iterable."""
+        for record in records:
+            self.write(record)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is None:
+            return False
+        self._file.close()
+        if not self.append:
+            if exc_type is None:
+                os.replace(self._tmp_path, self.path)
+            else:
+                os.remove(self._tmp_path)
+        elif exc_type is not None:
+            if self._start_size is None:
+                os.remove(self.path)
+            else:
+                os.truncate(self.path, self._start_size)
+        return False
+
+
+def iter_lead_file(path):
+    """
+    Streams records from a lead file.
+
+    `.ndjson` files are read line by line; a truncated trailing line left by
+    an interrupted run is skipped. Any other file is parsed as a JSON array.
+
+    Args:
+        path (str): Lead file path.
+
+    Yields:
+        dict: Lead records.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if not path.endswith(".ndjson"):
+            try:
+                records = jsonlib.loads(f.read())
+            except ValueError:
+                return
+            yield from records
+            return
+
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield jsonlib.loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,336 @@
+"""
+metrics.py
+----------
+Run instrumentation: counters, timings, a trace, and queued logging.
+
+The HTTP layer, the fetch pipeline and the Google writers record into a
+process-wide registry:
+
+- `inc(name, value, **labels)` for counters (requests, bytes, retries, records);
+- `observe(name, seconds, **labels)` for timings (count/sum/max per label set);
+- `span(name, **labels)` to time a block; it is also recorded as a trace event.
+
+At the end of each run (`with run("fetch"): ...`) the registry is exported to
+`METRICS_DIR` as:
+
+- `<job>_trace.json`: Chrome trace-event format (open in Perfetto or
+  chrome://tracing), with the aggregated metrics under `"metrics"`;
+- `<job>.prom`: Prometheus text format, for the node_exporter textfile
+  collector.
+
+With `profile=True` (the `--profile` CLI switch) the run is also profiled with
+cProfile into `<job>.prof` (view with snakeviz, or convert to a flame graph
+with flameprof/gprof2dot).
+
+Progress messages go through `logging` with a `QueueHandler`: the calling
+thread only enqueues records and a background listener writes them out, so
+a slow terminal or pipe never stalls the fetch threads.
+
+Environment variables (optional):
+- METRICS_DIR: Output directory for traces and textfiles (default: metrics)
+- HELENA_METRICS: Set to 0 to skip writing the metric files (default: 1)
+- HELENA_LOG_LEVEL: Logging level (default: INFO)
+"""
+
+import atexit
+import cProfile
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+METRICS_ENABLED = os.getenv("HELENA_METRICS", "1").lower() not in ("0", "false", "no")
+LOG_LEVEL = os.getenv("HELENA_LOG_LEVEL", "INFO").upper()
+
+PREFIX = "resultplus_"
+
+# Trace events kept per run; aggregates are always complete
+MAX_TRACE_EVENTS = 50000
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    """Thread-safe store of counters, timing summaries and trace events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears everything and restarts the trace clock."""
+        with self._lock:
+            self.counters = {}
+            self.timings = {}
+            self.events = []
+            self.dropped_events = 0
+            self.started = time.perf_counter()
+
+    def reset_events(self):
+        """Clears the trace only (counters and timings keep accumulating)."""
+        with self._lock:
+            self.events = []
+            self.dropped_events = 0
+            self.started = time.perf_counter()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            summary = self.timings.get(key)
+            if summary is None:
+                summary = self.timings[key] = [0, 0.0, 0.0]
+            summary[0] += 1
+            summary[1] += seconds
+            summary[2] = max(summary[2], seconds)
+
+    def event(self, name, started, seconds, **labels):
+        """Records a completed trace event (`started` from `perf_counter`)."""
+        with self._lock:
+            if len(self.events) >= MAX_TRACE_EVENTS:
+                self.dropped_events += 1
+                return
+            self.events.append({
+                "name": name,
+                "ph": "X",
+                "ts": round((started - self.started) * 1e6, 1),
+                "dur": round(seconds * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": labels,
+            })
+
+    # --- Export --------------------------------------------------------------
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: `counters` and `timings` as lists of plain records.
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            timings = [
+                {"name": name, "labels": dict(labels), "count": s[0],
+                 "sum_seconds": round(s[1], 6), "max_seconds": round(s[2], 6)}
+                for (name, labels), s in sorted(self.timings.items())
+            ]
+        return {"counters": counters, "timings": timings}
+
+    def trace(self):
+        """
+        Returns:
+            dict: Chrome trace-event document with the aggregates attached.
+        """
+        with self._lock:
+            events = list(self.events)
+            dropped = self.dropped_events
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "droppedEvents": dropped,
+            "metrics": self.snapshot(),
+        }
+
+    def prometheus(self, **job_labels):
+        """
+        Renders the aggregates in the Prometheus text exposition format.
+
+        Args:
+            **job_labels: Labels added to every sample (e.g. `job="fetch"`).
+
+        Returns:
+            str: Textfile contents.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def sample(name, labels, value):
+            labels = {**job_labels, **labels}
+            rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+            lines.append(f"{PREFIX}{name}{{{rendered}}} {value}")
+
+        for c in snapshot["counters"]:
+            if c["name"] not in typed:
+                typed.add(c["name"])
+                lines.append(f"# TYPE {PREFIX}{c['name']} counter")
+            sample(c["name"], c["labels"], c["value"])
+        for t in snapshot["timings"]:
+            if t["name"] not in typed:
+                typed.add(t["name"])
+                lines.append(f"# TYPE {PREFIX}{t['name']} summary")
+            sample(f"{t['name']}_count", t["labels"], t["count"])
+            sample(f"{t['name']}_sum", t["labels"], t["sum_seconds"])
+        for t in snapshot["timings"]:
+            name = f"{t['name']}_max"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+            sample(name, t["labels"], t["max_seconds"])
+        lines.append(f"# TYPE {PREFIX}last_run_timestamp_seconds gauge")
+        sample("last_run_timestamp_seconds", {}, int(time.time()))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def inc(name, value=1, **labels):
+    """Adds `value` to the counter `name` with the given labels."""
+    REGISTRY.inc(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    """Records a duration in the timing summary `name`."""
+    REGISTRY.observe(name, seconds, **labels)
+
+
+def event(name, started, seconds, **labels):
+    """Records a trace event for a block timed by the caller."""
+    REGISTRY.event(name, started, seconds, **labels)
+
+
+@contextmanager
+def span(name, **labels):
+    """
+    Times the enclosed block into `<name>_seconds` and the trace.
+
+    Args:
+        name (str): Metric/event name.
+        **labels: Labels for the metric and arguments of the trace event.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        REGISTRY.observe(f"{name}_seconds", seconds, **labels)
+        REGISTRY.event(name, started, seconds, **labels)
+
+
+# --- Logging -------------------------------------------------------------------
+
+_listener = None
+_logging_lock = threading.Lock()
+
+
+def setup_logging(level=None):
+    """
+    Routes package logs through a queue to a background stdout writer.
+
+    Only the `resultplus_reports` logger tree is configured, so modules log
+    under a fixed `resultplus_reports.<module>` name rather than `__name__`,
+    which is `__main__` under `python -m resultplus_reports.<module>`.
+
+    Safe to call more than once; only the first call configures handlers.
+    """
+    global _listener
+    with _logging_lock:
+        if _listener is not None:
+            return
+        records = queue.SimpleQueue()
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(logging.Formatter("%(message)s"))
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        logger = logging.getLogger(__package__)
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        logger.setLevel(level or LOG_LEVEL)
+        logger.propagate = False
+
+
+def flush_logging():
+    """Waits until every queued log record has been written."""
+    global _listener
+    with _logging_lock:
+        if _listener is not None:
+            # stop() drains the queue; restart so later records still flow
+            _listener.stop()
+            _listener.start()
+
+
+# --- Runs ----------------------------------------------------------------------
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def export(job, directory=None):
+    """
+    Writes `<job>_trace.json` and `<job>.prom` for the current registry.
+
+    Returns:
+        tuple[str, str]: Paths of the trace and the Prometheus textfile.
+    """
+    directory = directory or METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    trace_path = os.path.join(directory, f"{job}_trace.json")
+    prom_path = os.path.join(directory, f"{job}.prom")
+    _write_atomic(trace_path, json.dumps(REGISTRY.trace()))
+    _write_atomic(prom_path, REGISTRY.prometheus(job=job))
+    return trace_path, prom_path
+
+
+@contextmanager
+def run(job, profile=False, directory=None):
+    """
+    Instruments a whole command-line run.
+
+    Sets up queued logging, resets the registry, optionally profiles the
+    block, and exports the metric files when it ends (also on failure).
+
+    Args:
+        job (str): Run name used in file names and the `job` label.
+        profile (bool): Also write a cProfile dump to `<job>.prof`.
+        directory (str | None): Overrides `METRICS_DIR`.
+    """
+    setup_logging()
+    log = logging.getLogger(__package__)
+    REGISTRY.reset()
+    profiler = cProfile.Profile() if profile else None
+    status = "failed"
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with span("run", job=job):
+            yield
+        status = "succeeded"
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        inc("runs_total", job=job, status=status)
+        directory = directory or METRICS_DIR
+        if METRICS_ENABLED or profiler is not None:
+            os.makedirs(directory, exist_ok=True)
+        if METRICS_ENABLED:
+            trace_path, prom_path = export(job, directory)
+            log.info(f"📈 Metrics written to {trace_path} and {prom_path}")
+        if profiler is not None:
+            prof_path = os.path.join(directory, f"{job}.prof")
+            profiler.dump_stats(prof_path)
+            log.info(f"🔬 Profile written to {prof_path}")
+        flush_logging()
@@ -0,0 +1,352 @@
+"""
+mock_server.py
+--------------
+Local stand-in for the Helena session API, for benchmarks and debugging.
+
+Serves `GET /chat/v1/session` and `POST /chat/v1/session/search` with the
+same `items` + page-number pagination shape as the live API (`startDate`,
+`endDate`, `page`, `size`, `sort=createdAt,desc|asc`), backed by a synthetic
+dataset. Sessions are generated on demand from their index, evenly spread
+over the configured span, so datasets of 10M sessions cost no memory.
+
+Faults can be injected to exercise retries and rate control:
+- `latency`/`jitter`: added delay per request, in seconds;
+- `error_rate`: fraction of requests answered with `error_status` (a 503
+  by default);
+- `throttle_rate`: fraction of requests answered with a 429 + `Retry-After`;
+- `rps_limit`: server-side requests-per-second cap (429 when exceeded).
+
+Pages carry an `ETag` and a `Last-Modified` (the newest `createdAt` on the
+page); conditional requests with a matching `If-None-Match` or a recent
+enough `If-Modified-Since` are answered with a bodiless 304.
+
+Point the package at it with `HELENA_API_URL=http://127.0.0.1:<port>`; any
+bearer token is accepted, but one is required.
+
+Environment variables (optional):
+- MOCK_SEED: Seed for fault injection and synthetic statuses (default: 0)
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import jsonlib
+from .watermark import parse_timestamp
+
+SEED = int(os.getenv("MOCK_SEED", "0"))
+
+SESSION_PATH = "/chat/v1/session"
+SEARCH_PATH = "/chat/v1/session/search"
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+STATUSES = ("OPEN", "IN_PROGRESS", "CLOSED", "WAITING")
+
+
+class SyntheticDataset:
+    """
+    `count` sessions spread evenly over `span_days`, newest at `newest`.
+
+    Session `i` (0 = newest) is created at `newest - i * step`.
+    """
+
+    def __init__(self, count, span_days=30, newest=None, seed=SEED):
+        self.count = count
+        self.newest = newest or datetime.now(timezone.utc)
+        self.step = timedelta(days=span_days) / max(count, 1)
+        self.seed = seed
+
+    def created_at(self, index):
+        return self.newest - index * self.step
+
+    def index_range(self, start=None, end=None):
+        """
+        Returns the `[first, last)` indices created within `[start, end]`.
+        """
+        first, last = 0, self.count
+        if end is not None and end < self.newest:
+            first = -(-(self.newest - end) // self.step)  # ceil
+        if start is not None:
+            last = min(last, int((self.newest - start) // self.step) + 1)
+        return min(first, self.count), max(min(first, self.count), last)
+
+    def session(self, index):
+        created = self.created_at(index).isoformat(timespec="milliseconds")
+        created = created.replace("+00:00", "Z")
+        h = zlib.crc32(f"{self.seed}:{index}".encode())
+        return {
+            "id": f"sess-{index:08d}",
+            "createdAt": created,
+            "updatedAt": created,
+            "status": STATUSES[h % len(STATUSES)],
+            "channel": "WHATSAPP",
+            "contact": {"id": f"contact-{h % 100000:05d}", "name": f"Contato {h % 997}"},
+            "lastMessageText": f"Mensagem sintética {index}",
+            "previewUrl": f"https://chat.example.invalid/preview/sess-{index:08d}",
+            "tags": ["lead"] if h % 3 else ["lead", "retorno"],
+        }
+
+    def page(self, start=None, end=None, page=0, size=DEFAULT_PAGE_SIZE, ascending=False):
+        """
+        Returns one page of sessions in the requested order.
+
+        Returns:
+            dict: `items`, `page`, `size`, `totalItems`, `hasMorePages`.
+        """
+        first, last = self.index_range(start, end)
+        total = last - first
+        offset = page * size
+        if ascending:
+            indices = range(last - 1 - offset, max(last - 1 - offset - size, first - 1), -1)
+        else:
+            indices = range(first + offset, min(first + offset + size, last))
+        return {
+            "items": [self.session(i) for i in indices],
+            "page": page,
+            "size": size,
+            "totalItems": total,
+            "hasMorePages": offset + size < total,
+        }
+
+
+class Faults:
+    """Fault-injection settings and the server-side rate limiter."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 rps_limit=None, retry_after=1, seed=SEED, error_status=503):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.rps_limit = rps_limit
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = 0
+        self._window_count = 0
+
+    def decide(self):
+        """Returns the fault status for the next request (None = serve it)."""
+        with self._lock:
+            roll = self._random.random()
+            if self.rps_limit:
+                window = int(time.monotonic())
+                if window != self._window:
+                    self._window, self._window_count = window, 0
+                self._window_count += 1
+                if self._window_count > self.rps_limit:
+                    return 429
+            if roll < self.throttle_rate:
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                return self.error_status
+        return None
+
+    def delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+            time.sleep(self.latency + extra)
+
+
+class MockHelenaServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the dataset, faults and request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, dataset, faults=None):
+        super().__init__(address, _Handler)
+        self.dataset = dataset
+        self.faults = faults or Faults()
+        self.stats = {
+            "requests": 0, "pages": 0, "items": 0, "bytes": 0, "304": 0, "429": 0, "5xx": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        self._send_body(status, jsonlib.dumps(payload).encode("utf-8"), headers)
+
+    def _send_body(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(bytes=len(body))
+
+    def _serve_page(self, query):
+        server = self.server
+        server.count(requests=1)
+        server.faults.delay()
+
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self._send_json(401, {"message": "Unauthorized"})
+
+        fault = server.faults.decide()
+        if fault == 429:
+            server.count(**{"429": 1})
+            return self._send_json(
+                429, {"message": "Too Many Requests"},
+                {"Retry-After": str(server.faults.retry_after)},
+            )
+        if fault:
+            server.count(**{"5xx": 1})
+            return self._send_json(fault, {"message": HTTPStatus(fault).phrase})
+
+        try:
+            page = int(query.get("page", 0))
+            size = min(int(query.get("size", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except (TypeError, ValueError):
+            return self._send_json(400, {"message": "Invalid page or size"})
+        sort = query.get("sort") or "createdAt,desc"
+        result = server.dataset.page(
+            start=parse_timestamp(query.get("startDate")),
+            end=parse_timestamp(query.get("endDate")),
+            page=page,
+            size=size,
+            ascending=sort.lower().endswith("asc"),
+        )
+        body = jsonlib.dumps(result).encode("utf-8")
+        validators = {"ETag": f'"{zlib.crc32(body):08x}"'}
+        stamps = [parse_timestamp(item["createdAt"]) for item in result["items"]]
+        newest = max(stamps).replace(microsecond=0) if stamps else None
+        if newest is not None:
+            validators["Last-Modified"] = format_datetime(newest, usegmt=True)
+        if self._not_modified(validators["ETag"], newest):
+            server.count(**{"304": 1})
+            self.send_response(304)
+            for name, value in validators.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        server.count(pages=1, items=len(result["items"]), bytes=len(body))
+        self._send_body(200, body, validators)
+
+    def _not_modified(self, etag, newest):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None or newest is None:
+            return False
+        try:
+            return newest <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path.rstrip("/") != SESSION_PATH:
+            return self._send_json(404, {"message": "Not Found"})
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self._serve_page(query)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if urlsplit(self.path).path.rstrip("/") != SEARCH_PATH:
+            return self._send_json(404, {"message": "Not Found"})
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            return self._send_json(400, {"message": "Invalid JSON"})
+        sort = body.get("sort")
+        if isinstance(sort, list) and sort:
+            body["sort"] = f"{sort[0].get('property')},{sort[0].get('direction', 'DESC')}"
+        self._serve_page(body)
+
+
+def serve(count=10000, span_days=30, host="127.0.0.1", port=0, faults=None, newest=None):
+    """
+    Starts a mock server on a background thread.
+
+    Args:
+        count (int): Number of synthetic sessions.
+        span_days (float): Days covered by the dataset, ending now.
+        host (str): Bind address.
+        port (int): Port (0 picks a free one; see `server.url`).
+        faults (Faults | None): Fault injection settings.
+        newest (datetime | None): `createdAt` of the newest session.
+
+    Returns:
+        MockHelenaServer: The running server; call `shutdown()` to stop it.
+    """
+    server = MockHelenaServer(
+        (host, port), SyntheticDataset(count, span_days, newest=newest), faults
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    """Command-line entry point: run the mock API in the foreground."""
+    parser = argparse.ArgumentParser(description="Run a local Helena API stand-in.")
+    parser.add_argument("--sessions", type=int, default=10000, help="synthetic sessions (default: %(default)s)")
+    parser.add_argument("--days", type=float, default=30, help="days covered, ending now (default: %(default)s)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="added delay per request, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of error responses")
+    parser.add_argument("--error-status", type=int, default=503, help="status of error responses (default: %(default)s)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--rps-limit", type=int, default=None, help="requests per second before 429s")
+    args = parser.parse_args(argv)
+
+    faults = Faults(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        error_status=args.error_status, throttle_rate=args.throttle_rate,
+        rps_limit=args.rps_limit,
+    )
+    server = MockHelenaServer(
+        (args.host, args.port), SyntheticDataset(args.sessions, args.days), faults
+    )
+    print(f"🧪 Mock Helena API with {args.sessions} sessions at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+"""
+openapi_index.py
+----------------
+Offline index of the Helena OpenAPI/Swagger spec.
+
+`find_real_swagger_json` scraped the Swagger UI page and `scan_swagger` /
+`scan_api_swagger` guessed documentation paths over the network on every
+run. Now the spec is located once (the same scraping and candidate paths,
+stopping at the first document that is a spec), downloaded and cached in
+`OPENAPI_SPEC_FILE`. Loading the cache never touches the network.
+
+The spec (Swagger 2.0 or OpenAPI 3.x) is compiled into a `SpecIndex`:
+literal routes in a dict, templated ones (`/session/{id}`) as regexes
+tried most specific first, each with its methods and the names of its
+query, path and header parameters and JSON body fields (`$ref`/`allOf`
+resolved). `SpecIndex.check()` then tells instantly whether a request is
+documented.
+
+`probe.run()` consults the index before the network (see `probe.py`):
+probes of routes the spec documents are answered or filtered offline, and
+only routes it doesn't cover are still guessed over the network.
+
+Usage:
+
+    python -m resultplus_reports.openapi_index fetch            # locate, download, cache
+    python -m resultplus_reports.openapi_index fetch https://.../swagger.json --host api.chat.resultplus.com.br
+    python -m resultplus_reports.openapi_index info
+    python -m resultplus_reports.openapi_index routes --filter session
+    python -m resultplus_reports.openapi_index check GET /chat/v1/session startDate=... size=50
+
+Environment variables (optional):
+- OPENAPI_SPEC_FILE: Cached spec path (default: openapi_spec.json)
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urljoin, urlsplit
+
+import requests
+
+from . import http_client
+
+SPEC_FILE = os.getenv("OPENAPI_SPEC_FILE", "openapi_spec.json")
+
+METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+_TEMPLATE = re.compile(r"\{[^/{}]+\}")
+
+
+def _resolve(spec, node, depth=0):
+    """Follows local `$ref`s (`#/...`) up to a small depth."""
+    while isinstance(node, dict) and "$ref" in node and depth < 16:
+        ref = node["$ref"]
+        if not ref.startswith("#/"):
+            return {}
+        target = spec
+        for part in ref[2:].split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            target = target.get(part) if isinstance(target, dict) else None
+            if target is None:
+                return {}
+        node, depth = target, depth + 1
+    return node if isinstance(node, dict) else {}
+
+
+def _schema_fields(spec, schema, depth=0):
+    """
+    Returns the property names of an object schema.
+
+    Returns:
+        frozenset[str] | None: Field names, or None for a free-form schema
+        (no declared properties: any field is accepted).
+    """
+    schema = _resolve(spec, schema)
+    if depth > 8 or not schema:
+        return None
+    fields = set(schema.get("properties") or ())
+    free_form = not fields
+    for part in schema.get("allOf") or ():
+        sub = _schema_fields(spec, part, depth + 1)
+        if sub is None:
+            continue
+        fields |= sub
+        free_form = False
+    return None if free_form else frozenset(fields)
+
+
+class Operation:
+    """
+    One documented method of a route.
+
+    Attributes:
+        method (str): Upper-case HTTP method.
+        path (str): Route template as in the spec (without base path).
+        operation_id (str | None): `operationId`.
+        params (dict[str, str]): Location (`query`, `path`, `header`, ...)
+            per parameter name.
+        required (frozenset[str]): Required parameter names.
+        body_fields (frozenset[str] | None): JSON body fields; None when the
+            body is free-form or not described.
+        summary (str): `summary` of the operation.
+    """
+
+    __slots__ = ("method", "path", "operation_id", "params", "required", "body_fields", "summary")
+
+    def __init__(self, method, path, operation_id=None, params=None, required=(),
+                 body_fields=None, summary=""):
+        self.method = method
+        self.path = path
+        self.operation_id = operation_id
+        self.params = params or {}
+        self.required = frozenset(required)
+        self.body_fields = body_fields
+        self.summary = summary
+
+    def names(self, location):
+        """Returns the parameter names documented in `location`."""
+        return {name for name, where in self.params.items() if where == location}
+
+    def __repr__(self):
+        return f"Operation({self.method} {self.path})"
+
+
+def _compile_operation(spec, path, method, path_item, operation):
+    params, required, body_fields = {}, set(), None
+    for raw in list(path_item.get("parameters") or ()) + list(operation.get("parameters") or ()):
+        param = _resolve(spec, raw)
+        name, location = param.get("name"), param.get("in")
+        if not name or not location:
+            continue
+        if location == "body":  # Swagger 2 body parameter
+            body_fields = _schema_fields(spec, param.get("schema"))
+            continue
+        params[name] = location
+        if param.get("required"):
+            required.add(name)
+    body = _resolve(spec, operation.get("requestBody"))
+    content = body.get("content") or {}
+    media = content.get("application/json") or next(iter(content.values()), None)
+    if isinstance(media, dict):
+        body_fields = _schema_fields(spec, media.get("schema"))
+    return Operation(
+        method.upper(), path, operation.get("operationId"), params, required,
+        body_fields, operation.get("summary") or "",
+    )
+
+
+class SpecIndex:
+    """
+    Compiled, in-memory index of an OpenAPI/Swagger spec.
+
+    Args:
+        spec (dict): Decoded spec document.
+        source (str | None): URL the spec was downloaded from.
+        hosts (Iterable[str]): Extra hosts the spec describes (besides the
+            ones it declares).
+    """
+
+    def __init__(self, spec, source=None, hosts=()):
+        self.source = source
+        info = spec.get("info") or {}
+        self.title = info.get("title") or "API"
+        self.version = str(info.get("version") or "")
+        self.spec_version = str(spec.get("openapi") or spec.get("swagger") or "")
+
+        declared, base_paths = set(), set()
+        if spec.get("swagger"):
+            if spec.get("host"):
+                declared.add(spec["host"].lower())
+            base_paths.add(spec.get("basePath") or "")
+        for server in spec.get("servers") or ():
+            url = urlsplit(str(server.get("url") or "").replace("{", "").replace("}", ""))
+            if url.netloc:
+                declared.add(url.netloc.lower())
+            base_paths.add(url.path)
+        if not declared and source:
+            declared.add(urlsplit(source).netloc.lower())
+        self.hosts = declared | {h.lower() for h in hosts}
+        # Longest first, so /api/v1 wins over /api
+        self.base_paths = sorted({p.rstrip("/") for p in base_paths} or {""}, key=len, reverse=True)
+
+        self._literal = {}
+        self._templated = []
+        for path, path_item in (spec.get("paths") or {}).items():
+            path_item = _resolve(spec, path_item)
+            operations = {
+                method.upper(): _compile_operation(spec, path, method, path_item, op)
+                for method, op in path_item.items()
+                if method in METHODS and isinstance(op, dict)
+            }
+            key = path.rstrip("/") or "/"
+            if _TEMPLATE.search(path):
+                pattern = "^" + "[^/]+".join(re.escape(p) for p in _TEMPLATE.split(key)) + "/?$"
+                literal_segments = sum(1 for s in key.split("/") if s and not _TEMPLATE.search(s))
+                self._templated.append((literal_segments, re.compile(pattern), operations))
+            else:
+                self._literal[key] = operations
+        self._templated.sort(key=lambda t: -t[0])
+
+    def __len__(self):
+        return len(self._literal) + len(self._templated)
+
+    def operations(self):
+        """Yields every documented operation, literal routes first."""
+        for operations in self._literal.values():
+            yield from operations.values()
+        for _, _, operations in self._templated:
+            yield from operations.values()
+
+    def covers(self, url):
+        """Tells whether `url` is on a host the spec describes (relative URLs are)."""
+        netloc = urlsplit(url).netloc.lower()
+        return not netloc or netloc in self.hosts
+
+    def route(self, url):
+        """
+        Finds the documented route of a URL or path.
+
+        Literal routes win over templated ones.
+
+        Returns:
+            tuple[dict[str, Operation], bool] | None: Operations per method
+            and whether the route is templated, or None when the route is
+            not in the spec.
+        """
+        path = urlsplit(url).path or "/"
+        for base in self.base_paths:
+            if base and not (path == base or path.startswith(base + "/")):
+                continue
+            relative = path[len(base):].rstrip("/") or "/"
+            operations = self._literal.get(relative)
+            if operations is not None:
+                return operations, False
+            for _, pattern, operations in self._templated:
+                if pattern.match(relative):
+                    return operations, True
+        return None
+
+    def check(self, method, url, params=None, json=None):
+        """
+        Checks a request against the spec, without any network call.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Request URL or path (an inline query string counts
+                as parameters).
+            params (dict | None): Query parameters.
+            json (dict | None): JSON body.
+
+        Returns:
+            dict: `status` (`not_covered` for hosts the spec doesn't
+            describe, `undocumented_route`, `undocumented_method` or
+            `documented`), `operation` (Operation | None), `templated`
+            (the path only matched a route template, e.g. `/session/list`
+            as `/session/{id}`) and `unknown` (sorted parameter/body field
+            names the operation doesn't document).
+        """
+        result = {"status": "not_covered", "operation": None, "templated": False, "unknown": []}
+        if not self.covers(url):
+            return result
+        route = self.route(url)
+        if route is None:
+            result["status"] = "undocumented_route"
+            return result
+        operations, result["templated"] = route
+        operation = operations.get(method.upper())
+        if operation is None:
+            result["status"] = "undocumented_method"
+            return result
+
+        names = {k for k, _ in parse_qsl(urlsplit(url).query, keep_blank_values=True)}
+        names |= {str(k) for k in (params or {})}
+        unknown = names - operation.names("query")
+        if isinstance(json, dict) and operation.body_fields is not None:
+            unknown |= set(json) - operation.body_fields
+        result.update(status="documented", operation=operation, unknown=sorted(unknown))
+        return result
+
+
+# --- Cache file --------------------------------------------------------------------
+
+def is_spec(document):
+    """Tells whether a decoded JSON document looks like an OpenAPI/Swagger spec."""
+    return (
+        isinstance(document, dict)
+        and isinstance(document.get("paths"), dict)
+        and bool(document.get("openapi") or document.get("swagger"))
+    )
+
+
+def save_spec(spec, source, path=None, hosts=()):
+    """
+    Caches a spec on disk (atomically) with its source URL.
+
+    Returns:
+        str: Path of the cache file.
+    """
+    path = path or SPEC_FILE
+    document = {
+        "source": source,
+        "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "hosts": sorted(set(hosts)),
+        "spec": spec,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    _indexes.pop(os.path.abspath(path), None)
+    return path
+
+
+_indexes = {}
+
+
+def load_index(path=None):
+    """
+    Loads and compiles the cached spec (no network call).
+
+    Compiled indexes are kept per path for the life of the process.
+
+    Returns:
+        SpecIndex | None: The index, or None when no spec is cached.
+    """
+    path = os.path.abspath(path or SPEC_FILE)
+    index = _indexes.get(path)
+    if index is None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not is_spec(document.get("spec")):
+            return None
+        index = _indexes[path] = SpecIndex(
+            document["spec"], document.get("source"), document.get("hosts") or ()
+        )
+    return index
+
+
+# --- Locating the spec (network, once) ---------------------------------------------
+
+def swagger_ui_references(ui_url):
+    """
+    Returns the spec URLs referenced by a Swagger UI page (absolute).
+
+    Looks for `swaggerUrl: "..."`, then `url: "..."`, in the page HTML.
+    """
+    try:
+        html = http_client.get(ui_url, timeout=10).text
+    except requests.exceptions.RequestException:
+        return []
+    matches = re.findall(r'swaggerUrl\s*:\s*"([^"]+)"', html)
+    if not matches:
+        matches = re.findall(r'url\s*:\s*"([^"]+)"', html)
+    return [urljoin(ui_url, m) for m in matches]
+
+
+def candidate_urls():
+    """
+    Yields the URLs tried to locate the spec, most likely first.
+
+    Swagger UI references come first, then the documentation paths of the
+    `scan_swagger` and `scan_api_swagger` presets.
+    """
+    from . import find_real_swagger_json, scan_api_swagger, scan_swagger
+
+    seen = set()
+    candidates = swagger_ui_references(find_real_swagger_json.BASE_URL)
+    candidates += [scan_swagger.PROBES.url(p) for p in scan_swagger.PATHS]
+    candidates += [scan_api_swagger.PROBES.url(p) for p in scan_api_swagger.PATHS]
+    for url in candidates:
+        if url not in seen:
+            seen.add(url)
+            yield url
+
+
+def download_spec(url):
+    """
+    Downloads `url` and returns the spec it serves, or None.
+
+    Swagger `swagger-resources` listings are followed to their first spec.
+    """
+    try:
+        response = http_client.get(url, timeout=15, cache=False)
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    try:
+        document = response.json()
+    except ValueError:
+        return None
+    if is_spec(document):
+        return document
+    if isinstance(document, list):  # /swagger-resources: [{"location": "/v2/api-docs"}, ...]
+        for resource in document:
+            location = isinstance(resource, dict) and (resource.get("location") or resource.get("url"))
+            if location:
+                spec = download_spec(urljoin(url, location))
+                if spec is not None:
+                    return spec
+    return None
+
+
+def fetch_spec(url=None, path=None, hosts=(), on_try=None):
+    """
+    Locates (unless `url` is given), downloads and caches the spec.
+
+    Args:
+        url (str | None): Spec URL; by default `candidate_urls()` are tried.
+        path (str | None): Cache file (default: `OPENAPI_SPEC_FILE`).
+        hosts (Iterable[str]): API hosts the spec describes, if it doesn't
+            declare them.
+        on_try (Callable[[str], None] | None): Called with each URL tried.
+
+    Returns:
+        SpecIndex | None: The compiled index, or None if no spec was found.
+    """
+    for candidate in [url] if url else candidate_urls():
+        if on_try is not None:
+            on_try(candidate)
+        spec = download_spec(candidate)
+        if spec is not None:
+            save_spec(spec, candidate, path, hosts)
+            return load_index(path)
+    return None
+
+
+def main(argv=None):
+    """Command-line entry point: fetch, inspect or query the spec index."""
+    parser = argparse.ArgumentParser(description="Offline index of the Helena OpenAPI spec.")
+    parser.add_argument("--file", help=f"cached spec path (default: {SPEC_FILE})")
+    sub = parser.add_subparsers(dest="command")
+    fetch = sub.add_parser("fetch", help="locate (or use URL), download and cache the spec")
+    fetch.add_argument("url", nargs="?", help="spec URL (default: search the known locations)")
+    fetch.add_argument("--host", action="append", default=[],
+                       help="API host the spec describes, if it doesn't declare one (repeatable)")
+    sub.add_parser("info", help="show the cached spec")
+    routes = sub.add_parser("routes", help="list documented operations")
+    routes.add_argument("--filter", default="", help="only paths containing this text")
+    check = sub.add_parser("check", help="check a request against the spec")
+    check.add_argument("method")
+    check.add_argument("url", help="URL or path")
+    check.add_argument("params", nargs="*", help="query parameters as name=value")
+    args = parser.parse_args(argv)
+
+    if args.command == "fetch":
+        print("🔍 Looking for the OpenAPI/Swagger spec:")
+        index = fetch_spec(args.url, args.file, args.host, on_try=lambda u: print(f"   → {u}"))
+        if index is None:
+            print("❌ No spec found.")
+            return None
+        print(f"✅ Cached {index.title} {index.version} from {index.source} "
+              f"({len(index)} routes) in {args.file or SPEC_FILE}")
+        return index
+
+    index = load_index(args.file)
+    if index is None:
+        print(f"⚠️ No spec cached in {args.file or SPEC_FILE}; run `fetch` first.")
+        return None
+
+    if args.command == "routes":
+        for op in index.operations():
+            if args.filter in op.path:
+                query = ", ".join(sorted(op.names("query")))
+                print(f"{op.method:<7} {op.path}" + (f"  ?{query}" if query else ""))
+        return index
+    if args.command == "check":
+        params = dict(p.split("=", 1) for p in args.params if "=" in p)
+        result = index.check(args.method, args.url, params)
+        detail = f" — unknown: {', '.join(result['unknown'])}" if result["unknown"] else ""
+        print(f"{result['status']}: {args.method.upper()} {args.url}{detail}")
+        op = result["operation"]
+        if op is not None:
+            print(f"   query: {', '.join(sorted(op.names('query'))) or '-'}")
+            if op.body_fields:
+                print(f"   body: {', '.join(sorted(op.body_fields))}")
+        return result
+
+    operations = sum(1 for _ in index.operations())
+    print(f"📘 {index.title} {index.version} (spec {index.spec_version}) from {index.source}")
+    print(f"   {len(index)} routes, {operations} operations; hosts: {', '.join(sorted(index.hosts)) or '-'}; "
+          f"base paths: {', '.join(p or '/' for p in index.base_paths)}")
+    return index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,668 @@
+"""
+probe.py
+--------
+Concurrent, deduplicated probe engine behind the API diagnostic scripts.
+
+The diagnostics (`find_new_endpoint`, `test_endpoints`, `find_hidden_sessions`,
+`scan_swagger`, `scan_api_swagger`, `test_query_params`) used to loop over
+hard-coded lists one request at a time. Each is now a `ProbeSet`: a
+declarative product of paths × methods × parameter sets, which this engine
+
+- expands and deduplicates: requests that are equivalent (same method,
+  normalised URL, query parameters in any order, same JSON body) are sent
+  once;
+- sends through the shared HTTP transport with at most `concurrency`
+  requests in flight, paced per host by a fixed polite rate on top of the
+  adaptive controller (which still backs off on 429s, see `rate_limit.py`);
+- fingerprints every response and classifies each distinct response once
+  into a verdict (`match`, `ok`, `not_found`, `routing_error`, `restricted`,
+  `server_error`, ...), honouring labels set in the probe cache; it can stop
+  as soon as one probe reaches a given verdict;
+- checks probes against the cached OpenAPI spec first (`openapi_index.py`),
+  with no network call: routes the spec documents are answered from it, or
+  only filtered when the preset looks for markers in response bodies;
+- reuses results still fresh in the probe cache (`probe_cache.py`), so a
+  rerun only sends what expired or changed (`--refresh` re-probes all);
+- writes the structured results, and the distinct responses they reduce
+  to, to `PROBE_DIR/<name>_<timestamp>.json`.
+
+Run a preset through its script or the CLI, e.g. against the local API
+stand-in (`mock_server.py`):
+
+    python -m resultplus_reports probe query-params --concurrency 8
+    python -m resultplus_reports probe new-endpoint --base-url http://127.0.0.1:8080
+
+Environment variables (optional):
+- PROBE_CONCURRENCY: Probes in flight (default: 4)
+- PROBE_RATE: Requests per second per host (default: 5)
+- PROBE_DIR: Output directory for results (default: probe_results)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+import requests
+
+from requests.structures import CaseInsensitiveDict
+
+from . import http_client, openapi_index, probe_cache, rate_limit
+
+CONCURRENCY = int(os.getenv("PROBE_CONCURRENCY", "4"))
+RATE = float(os.getenv("PROBE_RATE", "5"))
+PROBE_DIR = os.getenv("PROBE_DIR", "probe_results")
+
+# Response text kept in the results
+SNIPPET_CHARS = 300
+
+# Markers of the Helena gateway's "no such route" answers
+ROUTING_ERROR_MARKERS = ("InternalPort", "Incorrect URL")
+
+VERDICT_ICONS = {
+    "match": "✅",
+    "ok": "ℹ️",
+    "not_found": "❌",
+    "routing_error": "⚠️",
+    "restricted": "🔒",
+    "method_not_allowed": "⛔",
+    "client_error": "⚠️",
+    "server_error": "💥",
+    "error": "❌",
+    "documented": "📘",
+    "undocumented_param": "🚫",
+}
+
+
+class Probe:
+    """One request to send: method, URL, query parameters and JSON body."""
+
+    __slots__ = ("method", "url", "params", "json", "headers", "timeout")
+
+    def __init__(self, method, url, params=None, json=None, headers=None, timeout=None):
+        self.method = method.upper()
+        self.url = url
+        self.params = params or None
+        self.json = json
+        self.headers = headers
+        self.timeout = timeout
+
+    def key(self):
+        """
+        Returns the canonical form used to detect equivalent probes.
+
+        Scheme and host are case-insensitive, an empty path equals `/`, and
+        query parameters (inline or in `params`) are compared as a sorted
+        list of strings. Headers are not part of the key.
+        """
+        parts = urlsplit(self.url)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        query += [(str(k), str(v)) for k, v in (self.params or {}).items()]
+        url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", "", ""))
+        body = None if self.json is None else json.dumps(self.json, sort_keys=True)
+        return (self.method, url, tuple(sorted(query)), body)
+
+    def cache_key(self):
+        """
+        Returns the probe cache key: `key()` plus a hash of the
+        `Authorization` header, so different credentials never share results.
+        """
+        auth = CaseInsensitiveDict(self.headers or {}).get("Authorization") or ""
+        scope = hashlib.sha256(auth.encode("utf-8")).hexdigest()[:16] if auth else ""
+        raw = json.dumps([*self.key(), scope])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def describe(self):
+        text = f"{self.method} {self.url}"
+        if self.params:
+            text += f" params={self.params}"
+        if self.json is not None:
+            text += f" json={self.json}"
+        return text
+
+
+class ProbeSet:
+    """
+    Declarative set of probes: every path × method × parameter set.
+
+    Args:
+        name (str): Preset name (used for the results file).
+        base_url (str): Root URL the paths are relative to.
+        paths (Sequence[str]): Paths (or absolute URLs) to probe.
+        methods (Sequence[str]): HTTP methods.
+        params (Sequence[dict | None]): Parameter sets; each probe sends one.
+        headers (dict | None): Request headers.
+        post_params_as (str): How parameters go with non-GET methods:
+            `json` (request body) or `query`.
+        markers (Sequence[str]): Substrings marking an interesting response
+            (verdict `match`).
+        stop_on (Sequence[str]): Verdicts that end the run early.
+        quiet (Sequence[str]): Verdicts only printed with `--verbose`
+            (all results are saved regardless).
+        timeout (float | None): Request timeout.
+        description (str): One-line summary shown before the run.
+        finds_spec (bool): The set looks for the OpenAPI spec itself: it is
+            skipped while a spec is cached, and specs it finds are cached.
+    """
+
+    def __init__(self, name, base_url, paths, methods=("GET",), params=(None,), headers=None,
+                 post_params_as="json", markers=(), stop_on=(), quiet=("not_found", "routing_error"),
+                 timeout=None, description="", finds_spec=False):
+        self.name = name
+        self.base_url = base_url
+        self.paths = list(paths)
+        self.methods = list(methods)
+        self.params = list(params)
+        self.headers = headers
+        self.post_params_as = post_params_as
+        self.markers = tuple(markers)
+        self.stop_on = tuple(stop_on)
+        self.quiet = tuple(quiet)
+        self.timeout = timeout
+        self.description = description
+        self.finds_spec = finds_spec
+
+    def url(self, path, base_url=None):
+        if "://" in path:
+            return path
+        return (base_url or self.base_url).rstrip("/") + "/" + path.lstrip("/")
+
+    def expand(self, base_url=None):
+        """
+        Returns the unique probes of the set, in declaration order.
+
+        Args:
+            base_url (str | None): Overrides `base_url` (e.g. a local stand-in).
+        """
+        probes = []
+        for path in self.paths:
+            url = self.url(path, base_url)
+            for method in self.methods:
+                for params in self.params:
+                    as_body = method.upper() != "GET" and self.post_params_as == "json"
+                    probes.append(Probe(
+                        method, url,
+                        params=None if as_body else params,
+                        json=params if as_body else None,
+                        headers=self.headers, timeout=self.timeout,
+                    ))
+        return dedup(probes)
+
+
+def dedup(probes):
+    """Drops probes equivalent to an earlier one (see `Probe.key`)."""
+    seen = set()
+    unique = []
+    for probe in probes:
+        key = probe.key()
+        if key not in seen:
+            seen.add(key)
+            unique.append(probe)
+    return unique
+
+
+def classify(status, text, markers=()):
+    """
+    Maps a response to a verdict.
+
+    Args:
+        status (int | None): HTTP status; None for a transport error.
+        text (str): Response body.
+        markers (Sequence[str]): Substrings that make a response a `match`.
+
+    Returns:
+        str: One of `VERDICT_ICONS`.
+    """
+    if status is None:
+        return "error"
+    if markers and any(marker in text for marker in markers):
+        return "match"
+    if any(marker in text for marker in ROUTING_ERROR_MARKERS):
+        return "routing_error"
+    if status == 404 or "Not Found" in text:
+        return "not_found"
+    if status in (401, 403):
+        return "restricted"
+    if status == 405:
+        return "method_not_allowed"
+    if status >= 500:
+        return "server_error"
+    if status >= 400:
+        return "client_error"
+    return "ok"
+
+
+class Verdicts:
+    """
+    Classification shared by the probes of a run.
+
+    Markers are looked for in every response body: fingerprints mask dates,
+    which is what markers usually look for. Without a marker hit, each
+    distinct response (fingerprint) is classified once, and a label set on
+    the fingerprint in the probe cache replaces `classify()`'s heuristics.
+
+    Args:
+        markers (Sequence[str]): See `classify()`.
+        labels (dict[str, str] | None): Verdict per fingerprint.
+    """
+
+    def __init__(self, markers=(), labels=None):
+        self.markers = tuple(markers)
+        self.labels = labels or {}
+        self._known = {}
+
+    def found(self, text):
+        """Returns the markers present in a response body."""
+        return [marker for marker in self.markers if marker in text]
+
+    def base(self, fp, status, text):
+        """
+        Returns the marker-independent verdict of a fingerprint.
+
+        Args:
+            text (str | Callable[[], str]): Body, or a loader called only if
+                the fingerprint was not classified yet.
+        """
+        verdict = self._known.get(fp)
+        if verdict is None:
+            verdict = self.labels.get(fp)
+            if verdict is None:
+                verdict = classify(status, text() if callable(text) else text)
+            self._known[fp] = verdict
+        return verdict
+
+
+class _HostLimiter:
+    """Fixed-rate token bucket per host, shared by the probe threads."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def acquire(self, url):
+        if not self.rate:
+            return
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = rate_limit.RateController(
+                    rate=self.rate, min_rate=self.rate, max_rate=self.rate, burst=1
+                )
+        bucket.acquire()
+
+
+def execute(probe, markers=(), verdicts=None, cache=None):
+    """
+    Sends one probe, fingerprints and classifies the response.
+
+    Transport errors are captured in the result instead of raised.
+
+    Args:
+        probe (Probe): Probe to send.
+        markers (Sequence[str]): See `classify()` (ignored with `verdicts`).
+        verdicts (Verdicts | None): Shared per-fingerprint classification.
+        cache (probe_cache.ProbeCache | None): Store the result here.
+
+    Returns:
+        dict: `method`, `url`, `params`, `json`, `status`, `verdict`,
+        `markers` (the ones found), `fingerprint`, `content_type`, `bytes`,
+        `elapsed_ms`, `snippet`, `error` and `source` (`network`).
+    """
+    kwargs = {"headers": probe.headers, "timeout": probe.timeout, "cache": False}
+    if probe.params:
+        kwargs["params"] = probe.params
+    if probe.json is not None:
+        kwargs["json"] = probe.json
+
+    result = {
+        "method": probe.method, "url": probe.url, "params": probe.params, "json": probe.json,
+        "status": None, "verdict": "error", "markers": [], "fingerprint": None,
+        "content_type": None,
+        "bytes": 0, "elapsed_ms": None, "snippet": "", "error": None, "source": "network",
+    }
+    started = time.perf_counter()
+    try:
+        response = http_client.request(probe.method, probe.url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        result["error"] = str(e)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    text = response.text
+    status = response.status_code
+    fp = probe_cache.fingerprint(status, text, probe.url)
+    verdicts = verdicts or Verdicts(markers)
+    found = verdicts.found(text)
+    # Server time of the last attempt, without rate-limiter waits
+    elapsed = getattr(response, "elapsed", None)
+    result.update(
+        status=status,
+        verdict="match" if found else verdicts.base(fp, status, text),
+        markers=found,
+        fingerprint=fp,
+        content_type=response.headers.get("Content-Type"),
+        bytes=len(response.content),
+        elapsed_ms=round(elapsed.total_seconds() * 1000, 1) if elapsed is not None else None,
+        snippet=text.strip()[:SNIPPET_CHARS],
+    )
+    if cache is not None:
+        cache.store(probe.cache_key(), result, text, checked=verdicts.markers)
+    return result
+
+
+def _cached_result(entry, verdicts, cache):
+    fp = entry["fingerprint"]
+    found = [marker for marker in verdicts.markers if marker in entry["markers"]]
+    verdict = "match" if found else verdicts.base(fp, entry["status"], lambda: cache.sample(fp))
+    return {
+        "method": entry["method"], "url": entry["url"], "params": entry["params"],
+        "json": entry["json"], "status": entry["status"], "verdict": verdict,
+        "markers": found, "fingerprint": fp, "content_type": entry["content_type"], "bytes": entry["bytes"],
+        "elapsed_ms": entry["elapsed_ms"], "snippet": entry["snippet"], "error": None,
+        "source": "cache",
+    }
+
+
+def from_spec(probe, index, markers=()):
+    """
+    Answers or filters a probe with the OpenAPI index, without network.
+
+    Without markers a probe only asks whether its route exists, so a route
+    the spec documents is answered from it (`documented`, or
+    `method_not_allowed` for an undocumented method). With markers the
+    response body matters: documented operations are still sent, unless
+    the probe uses parameters or body fields the operation doesn't document
+    (`undocumented_param`) or an undocumented method. Routes the spec
+    doesn't cover always go to the network, and so do existence probes of a
+    path that only fills a route template's parameter (`/session/list`
+    against `/session/{id}`).
+
+    Args:
+        probe (Probe): Probe to check.
+        index (openapi_index.SpecIndex): Compiled spec.
+        markers (Sequence[str]): Markers of the run.
+
+    Returns:
+        dict | None: A result (`source` `spec`), or None to send the probe.
+    """
+    check = index.check(probe.method, probe.url, probe.params, probe.json)
+    status, operation, unknown = check["status"], check["operation"], check["unknown"]
+    if status in ("not_covered", "undocumented_route"):
+        return None
+    if check["templated"] and not markers:
+        return None
+    if status == "undocumented_method":
+        verdict, snippet = "method_not_allowed", f"{probe.method} not documented for this route"
+    else:
+        if markers and not unknown:
+            return None
+        verdict = "undocumented_param" if markers else "documented"
+        snippet = f"{operation.method} {operation.path}"
+        if operation.summary:
+            snippet += f" — {operation.summary}"
+        if unknown:
+            snippet += f" (undocumented: {', '.join(unknown)})"
+    return {
+        "method": probe.method, "url": probe.url, "params": probe.params, "json": probe.json,
+        "status": None, "verdict": verdict, "markers": [], "fingerprint": None,
+        "content_type": None, "bytes": 0, "elapsed_ms": None, "snippet": snippet,
+        "error": None, "source": "spec",
+    }
+
+
+def run(probes, markers=(), concurrency=None, rate=None, stop_on=(), on_result=None,
+        cache=None, refresh=False, index=None):
+    """
+    Sends probes concurrently and returns their results.
+
+    Args:
+        probes (Sequence[Probe]): Probes to send (deduplicated again here).
+        markers (Sequence[str]): See `classify()`.
+        concurrency (int | None): Probes in flight. Defaults to `PROBE_CONCURRENCY`.
+        rate (float | None): Requests per second per host (0 = only the
+            adaptive controller). Defaults to `PROBE_RATE`.
+        stop_on (Sequence[str]): Stop once a result has one of these verdicts;
+            probes not started yet are skipped.
+        on_result (Callable[[dict], None] | None): Called with each result
+            as it completes.
+        cache (probe_cache.ProbeCache | None): Reuse fresh results from it
+            (`source` `cache`) and record new ones.
+        refresh (bool): Send every probe even if a fresh result is cached.
+        index (openapi_index.SpecIndex | None): Answer or filter probes of
+            documented routes first (see `from_spec()`).
+
+    Returns:
+        list[dict]: Results of the probes that ran, were reused or were
+        answered by the spec, in probe order.
+    """
+    probes = dedup(probes)
+    concurrency = max(1, concurrency or CONCURRENCY)
+    limiter = _HostLimiter(RATE if rate is None else rate)
+    verdicts = Verdicts(markers, cache.labels() if cache is not None else None)
+    results = [None] * len(probes)
+
+    pending = []
+    for i, probe in enumerate(probes):
+        result = None
+        if index is not None:
+            result = from_spec(probe, index, markers)
+        if result is None and cache is not None and not refresh:
+            entry = cache.lookup(probe.cache_key(), markers)
+            if entry is not None:
+                result = _cached_result(entry, verdicts, cache)
+        if result is None:
+            pending.append(i)
+            continue
+        results[i] = result
+        if on_result is not None:
+            on_result(result)
+        if result["verdict"] in stop_on:
+            return [r for r in results if r is not None]
+
+    def send(probe):
+        limiter.acquire(probe.url)
+        return execute(probe, verdicts=verdicts, cache=cache)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(send, probes[i]): i for i in pending}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if on_result is not None:
+                on_result(result)
+            if result["verdict"] in stop_on:
+                for other in futures:
+                    other.cancel()
+                break
+    return [r for r in results if r is not None]
+
+
+def summarize(results):
+    """Counts results per verdict, most common first."""
+    counts = {}
+    for result in results:
+        counts[result["verdict"]] = counts.get(result["verdict"], 0) + 1
+    return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
+
+
+def group(results):
+    """
+    Reduces results to their distinct responses.
+
+    Results with the same fingerprint form one group; so do spec answers
+    with the same verdict, and transport errors with the same message.
+
+    Returns:
+        list[dict]: `fingerprint`, `status`, `verdict`, `count`, `examples`
+        (up to 3 probe descriptions) and `snippet`, largest group first.
+    """
+    groups = {}
+    for result in results:
+        if result["fingerprint"]:
+            key = result["fingerprint"]
+        elif result["source"] == "spec":
+            key = f"spec: {result['verdict']}"
+        else:
+            key = f"error: {result['error']}"
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = {
+                "fingerprint": result["fingerprint"], "status": result["status"],
+                "verdict": result["verdict"], "count": 0, "examples": [],
+                "snippet": (result["snippet"] or result["error"] or "")[:120],
+            }
+        g["count"] += 1
+        if len(g["examples"]) < 3:
+            g["examples"].append(f"{result['method']} {result['url']}")
+    return sorted(groups.values(), key=lambda g: -g["count"])
+
+
+def write_results(name, results, directory=None):
+    """
+    Writes a run's results as JSON.
+
+    Returns:
+        str: Path of the results file.
+    """
+    directory = directory or PROBE_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    document = {
+        "preset": name, "summary": summarize(results), "groups": group(results),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def print_result(result, verbose=False, quiet=("not_found", "routing_error")):
+    """Prints one result line (`quiet` verdicts only when `verbose`)."""
+    if not verbose and result["verdict"] in quiet:
+        return
+    icon = VERDICT_ICONS.get(result["verdict"], "•")
+    target = f"{result['method']} {result['url']}"
+    if result["params"]:
+        target += f" params={result['params']}"
+    if result["json"] is not None:
+        target += f" json={result['json']}"
+    if result["error"]:
+        print(f"{icon} {target} → {result['error']}")
+        return
+    content_type = f" [{result['content_type']}]" if result["content_type"] else ""
+    timing = f"{result['elapsed_ms']} ms" if result["source"] == "network" else result["source"]
+    print(f"{icon} {target} → {result['status'] or '---'} {result['verdict']}{content_type}"
+          f" ({timing})")
+    if result["verdict"] == "match" or verbose:
+        print(f"   {result['snippet'][:SNIPPET_CHARS]}")
+
+
+def main(probe_set, argv=None):
+    """
+    Command-line entry point shared by the preset scripts.
+
+    Args:
+        probe_set (ProbeSet): Preset to run.
+        argv (list[str] | None): Arguments (default: `sys.argv[1:]`).
+
+    Returns:
+        list[dict]: Results.
+    """
+    parser = argparse.ArgumentParser(
+        prog=f"resultplus-reports probe {probe_set.name}",
+        description=probe_set.description or f"Run the {probe_set.name} probe set.",
+    )
+    parser.add_argument("--base-url", help=f"target API root (default: {probe_set.base_url})")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="probes in flight (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=RATE,
+                        help="requests per second per host, 0 = adaptive only (default: %(default)s)")
+    parser.add_argument("--all", action="store_true",
+                        help="do not stop at the first match")
+    parser.add_argument("--verbose", action="store_true", help="print every result")
+    parser.add_argument("--dry-run", action="store_true", help="list the probes without sending")
+    parser.add_argument("--output", help=f"results directory (default: {PROBE_DIR})")
+    parser.add_argument("--refresh", action="store_true",
+                        help="re-probe everything, ignoring fresh cached results")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or record the probe cache")
+    parser.add_argument("--ttl", type=float,
+                        help=f"hours a cached result stays fresh (default: {probe_cache.TTL_HOURS:g})")
+    parser.add_argument("--no-spec", action="store_true",
+                        help=f"ignore the cached OpenAPI spec ({openapi_index.SPEC_FILE})")
+    args = parser.parse_args(argv)
+
+    index = None if args.no_spec else openapi_index.load_index()
+    if index is not None and probe_set.finds_spec:
+        print(f"📘 Spec already cached from {index.source} ({index.title}, {len(index)} routes);"
+              f" nothing to look for (--no-spec scans anyway).")
+        return []
+
+    probes = probe_set.expand(args.base_url)
+    if args.dry_run:
+        for probe in probes:
+            spec = ""
+            if index is not None:
+                check = index.check(probe.method, probe.url, probe.params, probe.json)
+                spec = f"  [{check['status']}" + (f": {', '.join(check['unknown'])}]" if check["unknown"] else "]")
+            print(probe.describe() + spec)
+        print(f"({len(probes)} unique probes)")
+        return []
+
+    print(f"🔍 {probe_set.name}: {len(probes)} unique probes against "
+          f"{args.base_url or probe_set.base_url} ({args.concurrency} in flight, "
+          f"{args.rate or 'adaptive'} req/s)")
+    if index is not None:
+        print(f"📘 Checking against the cached spec: {index.title} {index.version} ({len(index)} routes)")
+    print()
+    cache = None
+    if probe_cache.CACHE_ENABLED and not args.no_cache:
+        cache = probe_cache.ProbeCache(ttl_hours=args.ttl)
+    started = time.perf_counter()
+    try:
+        results = run(
+            probes, markers=probe_set.markers, concurrency=args.concurrency, rate=args.rate,
+            stop_on=() if args.all else probe_set.stop_on,
+            on_result=lambda r: print_result(r, args.verbose, probe_set.quiet),
+            cache=cache, refresh=args.refresh, index=index,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - started
+
+    path = write_results(probe_set.name, results, args.output)
+    summary = ", ".join(f"{verdict}: {count}" for verdict, count in summarize(results).items())
+    sources = {"network": 0, "cache": 0, "spec": 0}
+    for r in results:
+        sources[r["source"]] += 1
+    print(f"\n🧭 {len(results)} probes in {elapsed:.1f}s ({sources['network']} sent,"
+          f" {sources['cache']} cached, {sources['spec']} from spec) — {summary}")
+    groups = group(results)
+    print(f"🧬 {len(groups)} distinct responses:")
+    for g in groups:
+        fp = g["fingerprint"] or "-"
+        print(f"   {g['count']:>5} × {g['status'] or '---'} {g['verdict']:<14} {fp}"
+              f"  {g['snippet'][:60]!r}")
+    print(f"📄 Results saved to {path}")
+    if probe_set.finds_spec and not args.no_spec:
+        _cache_found_spec(results)
+    return results
+
+
+def _cache_found_spec(results):
+    for result in results:
+        if result["verdict"] != "ok" or "json" not in (result["content_type"] or ""):
+            continue
+        spec = openapi_index.download_spec(result["url"])
+        if spec is not None:
+            path = openapi_index.save_spec(spec, result["url"])
+            print(f"📘 Spec found at {result['url']}; cached in {path}")
+            return
@@ -0,0 +1,400 @@
+"""
+probe_cache.py
+--------------
+Persistent store of probe results, grouped by response fingerprint.
+
+Diagnostic reruns used to repeat every request, and the gateway answers most
+of them with the same few bodies ("Not Found", "Incorrect URL ...
+InternalPort"). `probe.run()` now records each result here:
+
+- results are keyed by the probe's canonical form (method, normalised URL,
+  sorted query parameters, JSON body, and a hash of the `Authorization`
+  header; see `probe.Probe.cache_key`). A result younger than the TTL is
+  reused on the next run instead of sent again; expired ones, and probes
+  whose definition changed (new parameters, another token), are re-probed;
+- every response gets a *fingerprint*: a hash of its status and its body
+  with volatile parts (timestamps, UUIDs, long hex IDs, the echoed request
+  path) masked out. Equivalent responses share a fingerprint, so thousands
+  of results reduce to a handful of distinct behaviours;
+- one sample body is kept per fingerprint, compressed. A fingerprint is
+  classified once, and a label set with `label` (e.g. `routing_error` for
+  the gateway's "Incorrect URL" body) replaces the substring heuristics for
+  every response that shares it.
+
+Preset markers (see `probe.classify`) are matched against the full body
+when a response arrives; each result records which markers were checked and
+which were found. A cached result only answers a run whose markers were all
+checked, so a preset looking for other markers re-probes.
+
+Transport errors and transient statuses (429, 502-504) are never stored.
+
+Usage:
+
+    python -m resultplus_reports.probe_cache groups
+    python -m resultplus_reports.probe_cache label 3fa2c1 routing_error
+    python -m resultplus_reports.probe_cache purge
+
+Environment variables (optional):
+- PROBE_CACHE: Set to 0 to disable the probe cache (default: 1)
+- PROBE_CACHE_FILE: SQLite store path (default: probe_cache.db)
+- PROBE_CACHE_TTL_HOURS: Age after which a result is re-probed (default: 24)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+CACHE_ENABLED = os.getenv("PROBE_CACHE", "1").lower() not in ("0", "false", "no")
+CACHE_FILE = os.getenv("PROBE_CACHE_FILE", "probe_cache.db")
+TTL_HOURS = float(os.getenv("PROBE_CACHE_TTL_HOURS", "24"))
+
+# Statuses that say nothing about the endpoint itself
+TRANSIENT_STATUSES = (429, 502, 503, 504)
+
+# Sample bodies above this size are truncated before compression
+SAMPLE_MAX_BYTES = 1024 * 1024
+
+# Volatile parts of a body, masked before hashing
+_VOLATILE = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"), "<uuid>"),
+    (re.compile(r"\b[0-9a-fA-F]{16,}\b"), "<hex>"),
+]
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(status, text, url=None):
+    """
+    Returns the fingerprint of a response.
+
+    Args:
+        status (int): HTTP status.
+        text (str): Response body.
+        url (str | None): Request URL; its path is masked where the body
+            echoes it (as error pages often do).
+
+    Returns:
+        str: 16 hex characters.
+    """
+    if url:
+        path = urlsplit(url).path
+        if len(path) > 1:
+            text = text.replace(path, "<path>")
+    for pattern, placeholder in _VOLATILE:
+        text = pattern.sub(placeholder, text)
+    text = _SPACE.sub(" ", text).strip()
+    raw = f"{status}\n{text}".encode("utf-8", "replace")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+class ProbeCache:
+    """
+    SQLite store of probe results and response fingerprints.
+
+    Safe to share between threads.
+
+    Args:
+        path (str | None): Database path (default: `PROBE_CACHE_FILE`).
+        ttl_hours (float | None): Freshness window (default: `PROBE_CACHE_TTL_HOURS`).
+    """
+
+    def __init__(self, path=None, ttl_hours=None):
+        self.path = path or CACHE_FILE
+        self.ttl = (TTL_HOURS if ttl_hours is None else ttl_hours) * 3600
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " method TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " params TEXT,"
+            " body TEXT,"
+            " status INTEGER NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " content_type TEXT,"
+            " bytes INTEGER NOT NULL,"
+            " elapsed_ms REAL,"
+            " snippet TEXT,"
+            " checked TEXT NOT NULL,"
+            " found TEXT NOT NULL,"
+            " probed_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_results_fingerprint ON results (fingerprint)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " fingerprint TEXT PRIMARY KEY,"
+            " status INTEGER NOT NULL,"
+            " content_type TEXT,"
+            " sample BLOB NOT NULL,"
+            " label TEXT,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Closes the database."""
+        with self._lock:
+            self.conn.close()
+
+    # --- Lookups -------------------------------------------------------------
+
+    def lookup(self, key, markers=(), now=None):
+        """
+        Returns a stored result if it is still fresh.
+
+        Args:
+            key (str): See `probe.Probe.cache_key`.
+            markers (Sequence[str]): Markers the caller looks for; they must
+                all have been checked when the result was recorded.
+            now (float | None): Reference time (epoch seconds).
+
+        Returns:
+            dict | None: `method`, `url`, `params`, `json`, `status`,
+            `fingerprint`, `content_type`, `bytes`, `elapsed_ms`, `snippet`,
+            `markers` (found), and `probed_at`, or None if missing, expired
+            or recorded without one of `markers`.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT method, url, params, body, status, fingerprint, content_type, bytes,"
+                " elapsed_ms, snippet, probed_at, checked, found FROM results WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None or (now or time.time()) - row[10] >= self.ttl:
+            return None
+        if not set(markers) <= set(json.loads(row[11])):
+            return None
+        return {
+            "method": row[0], "url": row[1],
+            "params": json.loads(row[2]) if row[2] else None,
+            "json": json.loads(row[3]) if row[3] else None,
+            "status": row[4], "fingerprint": row[5], "content_type": row[6],
+            "bytes": row[7], "elapsed_ms": row[8], "snippet": row[9] or "",
+            "markers": json.loads(row[12]), "probed_at": row[10],
+        }
+
+    def sample(self, fp):
+        """Returns the sample body kept for a fingerprint ("" if unknown)."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT sample FROM fingerprints WHERE fingerprint = ?", (fp,)
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8", "replace") if row else ""
+
+    def labels(self):
+        """
+        Returns:
+            dict[str, str]: Verdict label per labelled fingerprint.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT fingerprint, label FROM fingerprints WHERE label IS NOT NULL"
+            ).fetchall()
+        return dict(rows)
+
+    def groups(self, fresh_only=False, now=None):
+        """
+        Aggregates stored results by fingerprint.
+
+        Args:
+            fresh_only (bool): Only count results younger than the TTL.
+            now (float | None): Reference time (epoch seconds).
+
+        Returns:
+            list[dict]: `fingerprint`, `status`, `content_type`, `label`,
+            `count`, `example` (one URL) and `snippet`, largest group first.
+        """
+        cutoff = (now or time.time()) - self.ttl if fresh_only else float("-inf")
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT f.fingerprint, f.status, f.content_type, f.label, f.sample,"
+                " COUNT(r.key), MIN(r.method || ' ' || r.url)"
+                " FROM fingerprints f JOIN results r ON r.fingerprint = f.fingerprint"
+                " WHERE r.probed_at > ?"
+                " GROUP BY f.fingerprint ORDER BY COUNT(r.key) DESC, f.fingerprint",
+                (cutoff,),
+            ).fetchall()
+        return [
+            {
+                "fingerprint": fp, "status": status, "content_type": content_type,
+                "label": label, "count": count, "example": example,
+                "snippet": zlib.decompress(sample).decode("utf-8", "replace").strip()[:120],
+            }
+            for fp, status, content_type, label, sample, count, example in rows
+        ]
+
+    def stats(self, now=None):
+        """
+        Returns:
+            dict: Result count, fresh result count and distinct fingerprints.
+        """
+        cutoff = (now or time.time()) - self.ttl
+        with self._lock:
+            results, fresh = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(probed_at > ?), 0) FROM results", (cutoff,)
+            ).fetchone()
+            fingerprints = self.conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        return {"results": results, "fresh": fresh, "fingerprints": fingerprints}
+
+    # --- Updates -------------------------------------------------------------
+
+    def store(self, key, result, text, checked=()):
+        """
+        Records a probe result and its response sample.
+
+        Results with a transport error or a transient status are skipped.
+
+        Args:
+            key (str): See `probe.Probe.cache_key`.
+            result (dict): Result from `probe.execute()`, with `fingerprint`
+                and `markers` (the markers found).
+            text (str): Full response body.
+            checked (Sequence[str]): Markers looked for in `text`.
+        """
+        status = result.get("status")
+        if result.get("error") or status is None or status in TRANSIENT_STATUSES:
+            return
+        now = time.time()
+        fp = result["fingerprint"]
+        params = json.dumps(result.get("params"), sort_keys=True) if result.get("params") else None
+        body = json.dumps(result["json"], sort_keys=True) if result.get("json") is not None else None
+        sample = text.encode("utf-8", "replace")[:SAMPLE_MAX_BYTES]
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results"
+                " (key, method, url, params, body, status, fingerprint, content_type, bytes,"
+                "  elapsed_ms, snippet, checked, found, probed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, result["method"], result["url"], params, body, status, fp,
+                 result.get("content_type"), result.get("bytes") or 0,
+                 result.get("elapsed_ms"), result.get("snippet"),
+                 json.dumps(sorted(set(checked))), json.dumps(result.get("markers") or []), now),
+            )
+            updated = self.conn.execute(
+                "UPDATE fingerprints SET last_seen = ? WHERE fingerprint = ?", (now, fp)
+            ).rowcount
+            if not updated:
+                self.conn.execute(
+                    "INSERT INTO fingerprints"
+                    " (fingerprint, status, content_type, sample, first_seen, last_seen)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (fp, status, result.get("content_type"),
+                     sqlite3.Binary(zlib.compress(sample)), now, now),
+                )
+
+    def label(self, prefix, verdict):
+        """
+        Labels a fingerprint with a verdict (None removes the label).
+
+        Args:
+            prefix (str): Fingerprint or an unambiguous prefix of one.
+            verdict (str | None): Verdict for every response sharing it.
+
+        Returns:
+            str: The full fingerprint.
+
+        Raises:
+            KeyError: If the prefix matches no fingerprint or several.
+        """
+        with self._lock, self.conn:
+            matches = [r[0] for r in self.conn.execute(
+                "SELECT fingerprint FROM fingerprints WHERE fingerprint LIKE ? LIMIT 2",
+                (prefix.lower() + "%",),
+            )]
+            if len(matches) != 1:
+                raise KeyError(f"{prefix!r} matches {len(matches) or 'no'} fingerprints")
+            self.conn.execute(
+                "UPDATE fingerprints SET label = ? WHERE fingerprint = ?", (verdict, matches[0])
+            )
+        return matches[0]
+
+    def purge(self, everything=False, now=None):
+        """
+        Deletes expired results and the unlabelled fingerprints left unused.
+
+        Args:
+            everything (bool): Delete every result, not only expired ones
+                (labels are kept).
+            now (float | None): Reference time (epoch seconds).
+
+        Returns:
+            int: Results deleted.
+        """
+        cutoff = float("inf") if everything else (now or time.time()) - self.ttl
+        with self._lock:
+            with self.conn:
+                deleted = self.conn.execute(
+                    "DELETE FROM results WHERE probed_at <= ?", (cutoff,)
+                ).rowcount
+                self.conn.execute(
+                    "DELETE FROM fingerprints WHERE label IS NULL AND fingerprint NOT IN"
+                    " (SELECT DISTINCT fingerprint FROM results)"
+                )
+            self.conn.execute("VACUUM")
+        return deleted
+
+
+def main(argv=None):
+    """Command-line entry point: inspect, label or purge the probe cache."""
+    parser = argparse.ArgumentParser(description="Inspect the probe result cache.")
+    parser.add_argument("--file", help=f"cache path (default: {CACHE_FILE})")
+    sub = parser.add_subparsers(dest="command")
+    groups = sub.add_parser("groups", help="list distinct responses, largest group first")
+    groups.add_argument("--fresh", action="store_true", help="only count unexpired results")
+    label = sub.add_parser("label", help="set the verdict of every response with a fingerprint")
+    label.add_argument("fingerprint", help="fingerprint or unambiguous prefix")
+    label.add_argument("verdict", help="verdict, e.g. routing_error ('-' removes the label)")
+    purge = sub.add_parser("purge", help="delete expired results")
+    purge.add_argument("--all", action="store_true", help="delete every result (labels are kept)")
+    args = parser.parse_args(argv)
+
+    with ProbeCache(args.file) as cache:
+        if args.command == "groups":
+            rows = cache.groups(fresh_only=args.fresh)
+            for g in rows:
+                tag = f" [{g['label']}]" if g["label"] else ""
+                print(f"{g['count']:>6} × {g['status']} {g['fingerprint']}{tag}  {g['example']}")
+                print(f"         {g['snippet']!r}")
+            print(f"🧬 {len(rows)} distinct responses")
+            return rows
+        if args.command == "label":
+            verdict = None if args.verdict == "-" else args.verdict
+            try:
+                fp = cache.label(args.fingerprint, verdict)
+            except KeyError as e:
+                parser.error(e.args[0])
+            print(f"🏷️ {fp} → {verdict or '(unlabelled)'}")
+            return fp
+        if args.command == "purge":
+            deleted = cache.purge(everything=args.all)
+            print(f"🧹 Deleted {deleted} results")
+        stats = cache.stats()
+    print(f"🗄️ {stats['results']} results ({stats['fresh']} fresh), "
+          f"{stats['fingerprints']} distinct responses")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
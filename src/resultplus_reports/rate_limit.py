@@ -0,0 +1,208 @@
+"""
+rate_limit.py
+-------------
+Adaptive request pacing and retry policy shared by every Helena request.
+
+Instead of fixed `time.sleep()` calls between requests, each API host gets
+a `RateController`: a token bucket whose refill rate is tuned at runtime
+with AIMD (additive increase, multiplicative decrease):
+
+- every fast, successful response raises the rate by a small step, so
+  throughput climbs towards what the API allows;
+- a 429, a transient 5xx, a transport error or a response slower than the
+  target latency cuts the rate by a constant factor;
+- a `Retry-After` header pauses the whole bucket (all threads) until the
+  time the server asked for.
+
+`http_client.request()` consults the controller before each request and
+retries 429s and transient 5xx responses a bounded number of times with
+exponential backoff and jitter.
+
+Accounts sharing a host (the white-label tenants in `tenants.py`) pass a
+`scope`: each scope gets its own controllers, with limits set by
+`configure()`, so one tenant's throttling never slows the others down.
+
+Environment variables (optional):
+- HELENA_RATE: Initial requests per second per host (default: 3)
+- HELENA_RATE_MIN: Lowest rate the controller backs off to (default: 0.2)
+- HELENA_RATE_MAX: Highest rate the controller climbs to (default: 20)
+- HELENA_RATE_BURST: Requests that may be sent back to back (default: 2)
+- HELENA_TARGET_LATENCY: Latency in seconds above which the rate is
+  reduced (default: 2)
+- HELENA_MAX_RETRIES: Retries for 429 and transient 5xx (default: 3)
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+INITIAL_RATE = float(os.getenv("HELENA_RATE", "3"))
+MIN_RATE = float(os.getenv("HELENA_RATE_MIN", "0.2"))
+MAX_RATE = float(os.getenv("HELENA_RATE_MAX", "20"))
+BURST = float(os.getenv("HELENA_RATE_BURST", "2"))
+TARGET_LATENCY = float(os.getenv("HELENA_TARGET_LATENCY", "2"))
+MAX_RETRIES = int(os.getenv("HELENA_MAX_RETRIES", "3"))
+
+# AIMD parameters: requests/s added per success, factor applied on pressure
+INCREASE_STEP = 0.1
+DECREASE_FACTOR = 0.5
+SLOW_DECREASE_FACTOR = 0.8
+
+# Exponential backoff between retries, in seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Statuses worth retrying: the request was not processed or may succeed later.
+# A plain 500 is usually deterministic (the diagnostics probe for it), so it
+# is not retried.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+def parse_retry_after(value, now=None):
+    """
+    Parses a `Retry-After` header (delta seconds or HTTP date).
+
+    Returns:
+        float | None: Seconds to wait, or None if absent/invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Returns the wait before retry number `attempt` (0-based).
+
+    A server-provided `Retry-After` wins; otherwise the delay doubles per
+    attempt (capped at `BACKOFF_MAX`) with full jitter.
+    """
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class RateController:
+    """
+    Thread-safe token bucket with an AIMD-adjusted refill rate.
+
+    Call `acquire()` before each request and `record()` with its outcome.
+    """
+
+    def __init__(
+        self, rate=INITIAL_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE,
+        burst=BURST, target_latency=TARGET_LATENCY,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = max(burst, 1.0)
+        self.target_latency = target_latency
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def record(self, status_code=None, latency=None, retry_after=None):
+        """
+        Adjusts the rate after a response (or a transport error).
+
+        Args:
+            status_code (int | None): HTTP status; None for a transport error.
+            latency (float | None): Request duration in seconds.
+            retry_after (float | None): Parsed `Retry-After`, in seconds.
+        """
+        with self._lock:
+            if status_code is None or status_code in RETRY_STATUSES:
+                self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            elif latency is not None and latency > self.target_latency:
+                self.rate = max(self.min_rate, self.rate * SLOW_DECREASE_FACTOR)
+            elif status_code < 500:
+                self.rate = min(self.max_rate, self.rate + INCREASE_STEP)
+
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                self._tokens = 0.0
+
+
+_lock = threading.Lock()
+_controllers = {}
+_scope_limits = {}
+
+
+def configure(scope, **limits):
+    """
+    Sets the limits of a scope's controllers.
+
+    Controllers already created for the scope are replaced.
+
+    Args:
+        scope (str): Scope name (e.g. a tenant).
+        **limits: `RateController` arguments (`rate`, `min_rate`,
+            `max_rate`, `burst`, `target_latency`); omitted ones keep the
+            `HELENA_RATE*` defaults.
+    """
+    with _lock:
+        _scope_limits[scope] = limits
+        for key in [k for k in _controllers if k[0] == scope]:
+            del _controllers[key]
+
+
+def get_controller(url, scope=None):
+    """
+    Returns the shared controller for the host of `url`.
+
+    Args:
+        url (str): Request URL.
+        scope (str | None): Separate bucket for one of several accounts on
+            the same host (see `configure()`).
+
+    Returns:
+        RateController: One instance per scope and `scheme://host:port`.
+    """
+    parts = urlsplit(url)
+    key = (scope, f"{parts.scheme}://{parts.netloc}")
+    with _lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = _controllers[key] = RateController(**_scope_limits.get(scope, {}))
+        return controller
+
+
+def reset():
+    """Forgets every controller (their learned rates start over)."""
+    with _lock:
+        _controllers.clear()
@@ -0,0 +1,314 @@
+"""
+response_cache.py
+-----------------
+Persistent cache of Helena GET responses.
+
+Reruns of the fetch, backfills and diagnostic scripts used to download the
+same historical pages on every run. `http_client.get()` now consults this
+SQLite-backed cache first:
+
+- entries are keyed by method, URL, query parameters, `Accept` header and a
+  hash of the `Authorization` header (tokens themselves are never stored),
+  so different credentials never share entries;
+- a page is *immutable* when its query is bounded by an `endDate` and both
+  that date and the newest `createdAt` on the page are older than the
+  stable horizon. Nothing new can be added to such a window, so its pages
+  cannot shift and are served from disk without touching the network;
+- other successful responses that carry an `ETag` or `Last-Modified` are
+  revalidated with `If-None-Match`/`If-Modified-Since`; a 304 is answered
+  from the cache;
+- the cache is bounded in size: least recently used entries are evicted.
+
+Only 200 responses are stored.
+
+Environment variables (optional):
+- HELENA_CACHE: Set to 0 to disable the response cache (default: 1)
+- HELENA_CACHE_FILE: SQLite cache path (default: http_cache.db)
+- HELENA_CACHE_MAX_MB: Size bound before LRU eviction (default: 256)
+- HELENA_CACHE_STABLE_DAYS: Stable horizon in days (default: 3)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from . import jsonlib
+from .watermark import parse_timestamp
+
+CACHE_ENABLED = os.getenv("HELENA_CACHE", "1").lower() not in ("0", "false", "no")
+CACHE_FILE = os.getenv("HELENA_CACHE_FILE", "http_cache.db")
+MAX_BYTES = int(float(os.getenv("HELENA_CACHE_MAX_MB", "256")) * 1024 * 1024)
+STABLE_DAYS = float(os.getenv("HELENA_CACHE_STABLE_DAYS", "3"))
+
+# Eviction frees space down to this fraction of the bound
+_EVICT_TARGET = 0.9
+
+# Response headers kept with each entry
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+def _normalize_params(params):
+    if not params:
+        return []
+    items = params.items() if isinstance(params, dict) else params
+    return sorted([str(k), str(v)] for k, v in items)
+
+
+def cache_key(method, url, params=None, headers=None):
+    """
+    Returns the cache key of a request.
+
+    Args:
+        method (str): HTTP method.
+        url (str): Request URL (including any inline query string).
+        params (dict | list | None): Query parameters.
+        headers (dict | None): Request headers; only `Accept` and a hash of
+            `Authorization` are part of the key.
+
+    Returns:
+        str: Hex digest.
+    """
+    headers = CaseInsensitiveDict(headers or {})
+    auth = headers.get("Authorization") or ""
+    scope = hashlib.sha256(auth.encode("utf-8")).hexdigest()[:16] if auth else ""
+    raw = json.dumps(
+        [method.upper(), url, _normalize_params(params), headers.get("Accept") or "", scope]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_immutable(params, body, stable_days=None, now=None):
+    """
+    Tells whether a page lies entirely beyond the stable horizon.
+
+    Args:
+        params (dict | list | None): Query parameters of the request.
+        body (bytes): JSON response body.
+        stable_days (float | None): Horizon override.
+        now (datetime | None): Reference time (timezone-aware).
+
+    Returns:
+        bool: True if the page can be served from disk indefinitely.
+    """
+    stable_days = STABLE_DAYS if stable_days is None else stable_days
+    horizon = (now or datetime.now(timezone.utc)) - timedelta(days=stable_days)
+
+    end = parse_timestamp(dict(_normalize_params(params)).get("endDate"))
+    if end is None or end >= horizon:
+        return False
+    try:
+        items = jsonlib.decode_page(body, ("createdAt",))
+    except ValueError:
+        return False
+    if not items:
+        return False
+    stamps = [parse_timestamp(i.get("createdAt")) for i in items]
+    if not stamps or any(s is None for s in stamps):
+        return False
+    return max(stamps) < horizon
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU store of HTTP responses in SQLite.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, path=None, max_bytes=MAX_BYTES):
+        self.path = path or CACHE_FILE
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " immutable INTEGER NOT NULL,"
+            " stored_at INTEGER NOT NULL,"
+            " accessed_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)"
+        )
+        self.conn.commit()
+        self._size = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Closes the database."""
+        with self._lock:
+            self.conn.close()
+
+    # --- Lookups -------------------------------------------------------------
+
+    def lookup(self, key):
+        """
+        Returns a cached entry and marks it as recently used.
+
+        Returns:
+            dict | None: `url`, `headers`, `body` and `immutable`, or None.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT url, headers, body, immutable FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+        return {
+            "url": row[0],
+            "headers": json.loads(row[1]),
+            "body": row[2],
+            "immutable": bool(row[3]),
+        }
+
+    def stats(self):
+        """
+        Returns:
+            dict: Entry count, immutable entry count and total body bytes.
+        """
+        with self._lock:
+            entries, immutable = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(immutable), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "immutable": immutable, "bytes": self._size}
+
+    # --- Updates -------------------------------------------------------------
+
+    def store(self, key, url, headers, body, immutable):
+        """
+        Inserts or replaces an entry, evicting old entries if needed.
+
+        Args:
+            key (str): See `cache_key()`.
+            url (str): Request URL (informational).
+            headers (Mapping): Response headers; only `_KEPT_HEADERS` are kept.
+            body (bytes): Decoded response body.
+            immutable (bool): Serve without revalidation.
+        """
+        kept = {h: headers[h] for h in _KEPT_HEADERS if h in headers}
+        if not immutable and "ETag" not in kept and "Last-Modified" not in kept:
+            return  # Could never be reused
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self.conn:
+            old = self.conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, url, headers, body, size, immutable, stored_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(kept), sqlite3.Binary(body), size,
+                 int(bool(immutable)), int(now), now),
+            )
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * _EVICT_TARGET))
+
+    def _evict(self, target):
+        rows = self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        )
+        doomed = []
+        size = self._size
+        for key, entry_size in rows:
+            if size <= target:
+                break
+            doomed.append((key,))
+            size -= entry_size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._size = size
+
+    def clear(self):
+        """Deletes every entry and reclaims the disk space."""
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM responses")
+            self.conn.execute("VACUUM")
+            self._size = 0
+
+
+def to_response(entry, status_code=200):
+    """
+    Rebuilds a `requests.Response` from a cache entry.
+
+    The response has `from_cache = True` so callers can tell it apart.
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = entry["body"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.url = entry["url"]
+    response.encoding = "utf-8"
+    response.from_cache = True
+    return response
+
+
+_lock = threading.Lock()
+_cache = None
+
+
+def get_cache():
+    """
+    Returns the process-wide cache, or None when `HELENA_CACHE=0`.
+
+    Returns:
+        ResponseCache | None: The shared cache.
+    """
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def main(argv=None):
+    """Command-line entry point: inspect or clear the response cache."""
+    parser = argparse.ArgumentParser(description="Inspect the Helena response cache.")
+    parser.add_argument("--clear", action="store_true", help="delete every cached response")
+    args = parser.parse_args(argv)
+
+    with ResponseCache() as cache:
+        if args.clear:
+            cache.clear()
+            print(f"🧹 Cleared {cache.path}")
+        stats = cache.stats()
+    print(f"🗄️ {stats['entries']} responses ({stats['immutable']} immutable), "
+          f"{stats['bytes'] / 1024 / 1024:.1f} MB")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,19 @@ Script to scan a target API for public Swagger/OpenAPI endpoints.
 This tool attempts to locate common Swagger and OpenAPI JSON definition
 files within a given API base URL. It helps developers identify
 documentation endpoints for testing, integration, or security analysis.
+It is a `probe.py` preset. A spec found this way is cached (see
+`openapi_index.py`), and later runs are skipped while it is (`--no-spec`
+scans anyway).
 
 Example:
-    $ python scan_api_swagger.py
+    $ python -m resultplus_reports.scan_api_swagger
+    $ python -m resultplus_reports.scan_api_swagger --base-url https://other.example
 
 Environment:
-    The BASE constant should be set to the target API root URL.
+    The BASE constant (or `--base-url`) sets the target API root URL.
 """
 
-import requests
-from urllib.parse import urljoin
+from . import probe
 
 
 # Base API endpoint to scan
@@ -48,60 +51,28 @@ PATHS = [
     "/.well-known/openapi.json",
 ]
 
+PROBES = probe.ProbeSet(
+    "scan-api-swagger", BASE, PATHS, headers=HEADERS, timeout=10,
+    description="Scan the API host for Swagger/OpenAPI JSON definitions.",
+    finds_spec=True,
+)
 
-def scan_swagger_endpoints(base_url: str = BASE) -> None:
+
+def scan_swagger_endpoints(argv=None):
     """
     Scans the target API for Swagger/OpenAPI endpoints.
 
     Args:
-        base_url (str): The root URL of the target API.
+        argv (list[str] | None): Options for `probe.main` (e.g. `--base-url`).
 
-    Behavior:
-        Prints the result of each attempted request, including status codes,
-        content type, and the first portion of the response body when relevant.
+    Returns:
+        list[dict]: Probe results (see `probe.execute`).
     """
-    print(f"🔍 Scanning {base_url} for Swagger/OpenAPI JSON endpoints...\n")
-
-    for path in PATHS:
-        url = urljoin(base_url, path)
-        try:
-            response = requests.get(
-                url, headers=HEADERS, timeout=10, allow_redirects=True
-            )
-
-            code = response.status_code
-            content_type = response.headers.get("Content-Type", "")
-
-            print(f"➡️ {url}  → {code}  ({content_type})")
-
-            if code == 200 and "json" in content_type:
-                snippet = response.text[:1000]
-                print("✅ JSON found! Preview:\n")
-                print(snippet)
-                print("\n---\n")
-
-            elif code == 200 and "html" in content_type:
-                snippet = response.text[:800]
-                print("ℹ️ HTML returned (possible Swagger UI). Preview:\n")
-                print(snippet)
-                print("\n---\n")
-
-            elif code in (401, 403):
-                print("🔒 Restricted access (401/403). Authentication may be required.\n---\n")
-
-            elif code in (404, 405):
-                print("⛔ Not found or method not allowed.\n---\n")
-
-            else:
-                print("ℹ️ Unexpected response. Preview:\n")
-                print(response.text[:400])
-                print("\n---\n")
+    return probe.main(PROBES, argv)
 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Request error while accessing {url}: {e}\n---\n")
 
-    print("🧭 Scan completed.")
+main = scan_swagger_endpoints
 
 
 if __name__ == "__main__":
-    scan_swagger_endpoints()
\ No newline at end of file
+    scan_swagger_endpoints()
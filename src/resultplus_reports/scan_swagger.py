@@ -9,10 +9,13 @@ or Swagger UI interfaces.
 
 This utility assists in identifying whether an API exposes its schema
 or documentation in a predictable location, often useful for diagnostics
-and integration validation tasks.
+and integration validation tasks. It is a `probe.py` preset: missing paths
+(404) are only listed with `--verbose`, and every result is saved. A spec
+found this way is cached (see `openapi_index.py`), and later runs are
+skipped while it is (`--no-spec` scans anyway).
 """
 
-import requests
+from . import probe
 
 
 BASE_URL = "https://chat.resultplus.com.br"
@@ -44,42 +47,26 @@ PATHS = [
     "/swagger-resources/configuration/security",
 ]
 
+PROBES = probe.ProbeSet(
+    "scan-swagger", BASE_URL, PATHS, timeout=5,
+    description="List Swagger/OpenAPI documentation endpoints of the web domain.",
+    finds_spec=True,
+)
 
-def scan_swagger_endpoints():
+
+def scan_swagger_endpoints(argv=None):
     """
     Scans the predefined paths under the base domain and reports the HTTP
-    response status, content type, and any indications of Swagger/OpenAPI
-    documentation or UI pages.
+    response status, content type, and verdict of each documentation path.
 
-    This function prints formatted diagnostic messages to the console.
+    Returns:
+        list[dict]: Probe results (see `probe.execute`).
     """
-    print(f"🔍 Scanning Swagger/OpenAPI endpoints for domain: {BASE_URL}\n")
-
-    for path in PATHS:
-        url = BASE_URL + path
-        try:
-            response = requests.get(url, timeout=5)
-            code = response.status_code
-            content_type = response.headers.get("Content-Type", "")
+    return probe.main(PROBES, argv)
 
-            if code == 200 and ("json" in content_type or "html" in content_type):
-                print(f"✅ {url} → {code} ({content_type})")
-                if "json" in content_type:
-                    print("📄 Snippet:", response.text[:300], "\n")
-                else:
-                    print("🌐 HTML page detected (possibly Swagger UI)\n")
-            elif code in (401, 403):
-                print(f"🔒 {url} → {code} (restricted access)")
-            elif code == 404:
-                # Common case — endpoint does not exist
-                continue
-            else:
-                print(f"⚠️ {url} → {code}")
-        except requests.exceptions.RequestException as error:
-            print(f"❌ Error accessing {url}: {error}")
 
-    print("\n🧭 Scan completed!")
+main = scan_swagger_endpoints
 
 
 if __name__ == "__main__":
-    scan_swagger_endpoints()
\ No newline at end of file
+    scan_swagger_endpoints()
@@ -0,0 +1,193 @@
+"""
+sent_store.py
+-------------
+Indexed store of lead IDs already included in a report.
+
+Replaces the old `sent.json` list, which was loaded in full and rewritten on
+every run. IDs live in a SQLite table keyed by ID with the time they were
+sent, so:
+
+- membership checks are batched index lookups instead of a full load;
+- updates happen in a single transaction, so a crash mid-run never leaves a
+  half-written store behind;
+- entries older than the retention window are expired, keeping the store
+  bounded (only recent leads can ever reappear in a fetch);
+- an exclusive file lock serialises overlapping cron runs.
+
+An existing `sent.json` is imported on first use and renamed to
+`sent.json.migrated`.
+
+Environment variables (optional):
+- SENT_DB_FILE: Path of the SQLite store (default: sent.db)
+- SENT_RETENTION_DAYS: Days an ID is remembered (default: 14)
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: locking is skipped
+    fcntl = None
+
+SENT_DB_FILE = os.getenv("SENT_DB_FILE", "sent.db")
+LEGACY_SENT_FILE = "sent.json"
+
+# Twice the 7-day fetch window, so a stale leads file cannot resend old IDs
+RETENTION_DAYS = int(os.getenv("SENT_RETENTION_DAYS", "14"))
+
+# SQLite's default limit on bound parameters per statement is 999
+_BATCH_SIZE = 500
+
+
+class SentStore:
+    """
+    SQLite-backed set of sent lead IDs.
+
+    Use as a context manager to hold the run lock:
+
+        with SentStore() as store:
+            new_ids = store.filter_new(ids)
+            ...
+            store.mark_sent(new_ids)
+    """
+
+    def __init__(self, path=None, retention_days=RETENTION_DAYS):
+        self.path = path or SENT_DB_FILE
+        self.retention_days = retention_days
+        self._lock_file = None
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sent ("
+            " id TEXT PRIMARY KEY,"
+            " sent_at INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sent_at ON sent (sent_at)")
+        self.conn.commit()
+
+    # --- Locking -------------------------------------------------------------
+
+    def __enter__(self):
+        self._lock_file = open(f"{self.path}.lock", "w")
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self.migrate_legacy()
+        self.expire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Closes the database and releases the run lock."""
+        self.conn.close()
+        if self._lock_file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    # --- Queries -------------------------------------------------------------
+
+    def contains_many(self, ids):
+        """
+        Returns the subset of `ids` already marked as sent.
+
+        Args:
+            ids (Iterable[str]): Lead IDs to check.
+
+        Returns:
+            set[str]: IDs present in the store.
+        """
+        ids = list(ids)
+        found = set()
+        for i in range(0, len(ids), _BATCH_SIZE):
+            chunk = ids[i:i + _BATCH_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT id FROM sent WHERE id IN ({placeholders})", chunk
+            )
+            found.update(row[0] for row in rows)
+        return found
+
+    def filter_new(self, leads):
+        """
+        Keeps only leads whose `id` has not been sent yet.
+
+        Args:
+            leads (Iterable[Lead]): Lead records (see `lead.py`).
+
+        Returns:
+            list[Lead]: Unsent leads, in input order, without duplicates.
+        """
+        leads = list(leads)
+        sent = self.contains_many(l.id for l in leads)
+        new_leads = []
+        for lead in leads:
+            if lead.id not in sent:
+                sent.add(lead.id)
+                new_leads.append(lead)
+        return new_leads
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM sent").fetchone()[0]
+
+    # --- Updates -------------------------------------------------------------
+
+    def mark_sent(self, ids, sent_at=None):
+        """
+        Atomically records `ids` as sent.
+
+        Args:
+            ids (Iterable[str]): Lead IDs.
+            sent_at (int | None): Epoch seconds. Defaults to now.
+        """
+        sent_at = int(sent_at if sent_at is not None else time.time())
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO sent (id, sent_at) VALUES (?, ?)",
+                ((i, sent_at) for i in ids),
+            )
+
+    def expire(self, retention_days=None):
+        """
+        Deletes IDs sent before the retention window.
+
+        Returns:
+            int: Number of expired IDs.
+        """
+        days = self.retention_days if retention_days is None else retention_days
+        cutoff = int(time.time()) - days * 86400
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM sent WHERE sent_at < ?", (cutoff,))
+        return cursor.rowcount
+
+    def compact(self):
+        """Expires old IDs and reclaims the freed disk space."""
+        removed = self.expire()
+        self.conn.execute("VACUUM")
+        return removed
+
+    def migrate_legacy(self, legacy_path=LEGACY_SENT_FILE):
+        """
+        Imports IDs from a legacy `sent.json` list, then renames the file.
+
+        Returns:
+            int: Number of imported IDs.
+        """
+        if not os.path.exists(legacy_path):
+            return 0
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            try:
+                ids = json.load(f)
+            except json.JSONDecodeError:
+                ids = []
+        self.mark_sent(ids)
+        os.replace(legacy_path, f"{legacy_path}.migrated")
+        return len(ids)
@@ -0,0 +1,447 @@
+"""
+tenants.py
+----------
+Fetches and reports many white-label Helena accounts (tenants) in one run.
+
+Tenants are listed in a JSON registry (`tenants.json`):
+
+    {
+      "defaults": {"base_url": "https://api.example.com", "rate": 2},
+      "tenants": [
+        {"name": "acme", "token_env": "ACME_HELENA_KEY",
+         "spreadsheet_id": "...", "doc_id": "..."},
+        {"name": "globex", "base_url": "https://api.globex.example",
+         "token": "...", "max_rate": 5, "enabled": false}
+      ]
+    }
+
+Keys missing from a tenant are taken from `defaults`. A tenant needs a
+`name` (lowercase letters, digits, `-` and `_`), a `base_url` (default:
+`HELENA_API_URL`) and a token, inline (`token`) or read from an environment
+variable (`token_env`). Optional keys: `rate`, `min_rate`, `max_rate`,
+`burst` (its own rate controller, see `rate_limit.configure()`),
+`concurrency` (pages prefetched per tenant), `directory`, `spreadsheet_id`,
+`doc_id` and `enabled`.
+
+Every tenant keeps its own state in `TENANTS_DIR/<name>/`: watermark, lead
+database, sent-ID store and the day's lead file, so tenants never share a
+watermark or report each other's leads.
+
+The fetch scheduler runs all tenants on one worker pool with page-level
+round robin: a worker takes the tenant at the head of the queue, fetches
+its next `quantum` pages and puts it back at the tail. A tenant is never
+advanced by two workers at once, so a huge tenant holds at most one worker
+at a time and small tenants finish after a few turns instead of waiting
+behind it. Pages are written to each tenant's export (see
+`fetch_result.LeadExport`) on the scheduling thread. A failed tenant is
+reported and skipped; its watermark is not advanced and the others carry on.
+
+Usage:
+    python -m resultplus_reports tenants list
+    python -m resultplus_reports tenants fetch [--only NAME ...] [--workers N]
+    python -m resultplus_reports tenants report [--only NAME ...]
+
+Environment variables (optional):
+- TENANTS_FILE: Tenant registry (default: tenants.json)
+- TENANTS_DIR: Root of the per-tenant state directories (default: tenants)
+- TENANT_WORKERS: Tenants fetched concurrently (default: 8)
+- TENANT_QUANTUM: Pages fetched per scheduling turn (default: 1)
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+
+from . import metrics, rate_limit
+from .fetch_result import LeadExport, iter_lead_pages
+from .http_client import Account
+
+log = logging.getLogger("resultplus_reports.tenants")
+
+TENANTS_FILE = os.getenv("TENANTS_FILE", "tenants.json")
+TENANTS_DIR = os.getenv("TENANTS_DIR", "tenants")
+WORKERS = int(os.getenv("TENANT_WORKERS", "8"))
+QUANTUM = int(os.getenv("TENANT_QUANTUM", "1"))
+
+_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+# Registry keys passed to `rate_limit.configure()`
+RATE_KEYS = ("rate", "min_rate", "max_rate", "burst", "target_latency")
+
+TENANT_KEYS = {
+    "name", "base_url", "token", "token_env", "concurrency", "directory",
+    "spreadsheet_id", "doc_id", "enabled", *RATE_KEYS,
+}
+
+
+class Tenant:
+    """
+    One account of the registry, with its own rate scope and state files.
+
+    Args:
+        name (str): Unique tenant name (also its rate scope).
+        base_url (str | None): API root. Defaults to `HELENA_API_URL`.
+        token (str): Bearer token.
+        directory (str | None): State directory. Defaults to
+            `TENANTS_DIR/<name>`.
+        rate_limits (dict | None): `rate_limit.configure()` arguments.
+        concurrency (int): Pages prefetched concurrently for this tenant.
+        spreadsheet_id (str | None): Report spreadsheet.
+        doc_id (str | None): Report document.
+    """
+
+    def __init__(self, name, base_url=None, token=None, directory=None, rate_limits=None,
+                 concurrency=1, spreadsheet_id=None, doc_id=None):
+        self.name = name
+        self.account = Account(base_url, token, rate_scope=name)
+        self.directory = directory or os.path.join(TENANTS_DIR, name)
+        self.rate_limits = rate_limits or {}
+        self.concurrency = concurrency
+        self.spreadsheet_id = spreadsheet_id
+        self.doc_id = doc_id
+
+    @property
+    def watermark_file(self):
+        return os.path.join(self.directory, "watermark.json")
+
+    @property
+    def lead_db_file(self):
+        return os.path.join(self.directory, "leads.db")
+
+    @property
+    def sent_db_file(self):
+        return os.path.join(self.directory, "sent.db")
+
+    @property
+    def reports(self):
+        """bool: Whether the tenant has its own report targets."""
+        return bool(self.spreadsheet_id and self.doc_id)
+
+    def prepare(self):
+        """Creates the state directory and applies the tenant's rate limits."""
+        os.makedirs(self.directory, exist_ok=True)
+        rate_limit.configure(self.name, **self.rate_limits)
+
+    def __repr__(self):
+        return f"Tenant({self.name!r}, {self.account.base_url!r})"
+
+
+def _tenant_from_config(config, defaults):
+    entry = {**defaults, **config}
+    unknown = set(entry) - TENANT_KEYS
+    if unknown:
+        raise ValueError(f"unknown key(s) {sorted(unknown)} for tenant {entry.get('name')!r}")
+
+    name = entry.get("name")
+    if not isinstance(name, str) or not _NAME_RE.match(name):
+        raise ValueError(f"invalid tenant name {name!r} (use lowercase letters, digits, - and _)")
+
+    token = entry.get("token")
+    if not token and entry.get("token_env"):
+        token = os.getenv(entry["token_env"])
+        if not token:
+            raise ValueError(f"tenant {name!r}: environment variable {entry['token_env']} is not set")
+    if not token:
+        raise ValueError(f"tenant {name!r}: missing token (set token or token_env)")
+
+    return Tenant(
+        name,
+        base_url=entry.get("base_url"),
+        token=token,
+        directory=entry.get("directory"),
+        rate_limits={k: float(entry[k]) for k in RATE_KEYS if k in entry},
+        concurrency=int(entry.get("concurrency", 1)),
+        spreadsheet_id=entry.get("spreadsheet_id"),
+        doc_id=entry.get("doc_id"),
+    )
+
+
+def load_registry(path=None, include_disabled=False):
+    """
+    Loads the tenant registry.
+
+    Args:
+        path (str | None): Registry file. Defaults to `TENANTS_FILE`.
+        include_disabled (bool): Also return tenants with `"enabled": false`.
+
+    Returns:
+        list[Tenant]: Tenants in registry order.
+
+    Raises:
+        ValueError: If the registry is malformed, a name is repeated or a
+            token is missing.
+    """
+    path = path or TENANTS_FILE
+    with open(path, "r", encoding="utf-8") as f:
+        registry = json.load(f)
+    if isinstance(registry, list):
+        registry = {"tenants": registry}
+
+    defaults = registry.get("defaults", {})
+    tenants, seen = [], set()
+    for config in registry.get("tenants", []):
+        if not config.get("enabled", defaults.get("enabled", True)) and not include_disabled:
+            continue
+        tenant = _tenant_from_config(config, defaults)
+        if tenant.name in seen:
+            raise ValueError(f"duplicate tenant name {tenant.name!r}")
+        seen.add(tenant.name)
+        tenants.append(tenant)
+    return tenants
+
+
+def select(tenants, names=None):
+    """
+    Filters tenants by name.
+
+    Raises:
+        ValueError: If a requested name is not in the registry.
+    """
+    if not names:
+        return tenants
+    missing = set(names) - {t.name for t in tenants}
+    if missing:
+        raise ValueError(f"unknown tenant(s): {', '.join(sorted(missing))}")
+    return [t for t in tenants if t.name in names]
+
+
+class _Job:
+    """Fetch state of one tenant: its page generator and export."""
+
+    def __init__(self, tenant, export, pages):
+        self.tenant = tenant
+        self.export = export
+        self.pages = pages
+        self.turns = 0
+        self.page_count = 0
+
+
+def _advance(job, quantum):
+    """Fetches up to `quantum` pages of a job. Returns (pages, exhausted)."""
+    pages = []
+    for _ in range(quantum):
+        try:
+            pages.append(next(job.pages))
+        except StopIteration:
+            return pages, True
+    return pages, False
+
+
+def _start(tenant, incremental, output_format):
+    tenant.prepare()
+    with ExitStack() as stack:
+        export = stack.enter_context(LeadExport(
+            incremental=incremental,
+            watermark_file=tenant.watermark_file,
+            output_format=output_format,
+            lead_db_file=tenant.lead_db_file,
+            output_dir=tenant.directory,
+        ))
+        pages = iter_lead_pages(
+            export.cutoff, export.end, after=export.watermark,
+            max_in_flight=tenant.concurrency, account=tenant.account,
+        )
+        # Started: the export is now closed by `finish()`, not on this error path
+        stack.pop_all()
+    return _Job(tenant, export, pages)
+
+
+def fetch_tenants(tenants, workers=None, quantum=None, incremental=True, output_format=None):
+    """
+    Fetches every tenant's recent sessions on a shared worker pool.
+
+    Args:
+        tenants (list[Tenant]): Tenants to fetch.
+        workers (int | None): Tenants fetched concurrently.
+            Defaults to `TENANT_WORKERS`.
+        quantum (int | None): Pages fetched per scheduling turn.
+            Defaults to `TENANT_QUANTUM`.
+        incremental (bool): Resume each tenant from its watermark.
+        output_format (str | None): `json` or `ndjson` lead files.
+
+    Returns:
+        dict[str, dict]: Per tenant, `count`, `file`, `pages`, `turns` and
+        `error` (None on success).
+    """
+    workers = max(1, workers or WORKERS)
+    quantum = max(1, quantum or QUANTUM)
+    log.info(f"🏢 Fetching {len(tenants)} tenants ({workers} workers, {quantum} page(s) per turn)")
+
+    results = {}
+    queue = deque()
+    for tenant in tenants:
+        try:
+            queue.append(_start(tenant, incremental, output_format))
+        except Exception as e:
+            log.error(f"❌ [{tenant.name}] could not start: {e}")
+            results[tenant.name] = {"count": 0, "file": None, "pages": 0, "turns": 0, "error": str(e)}
+
+    def finish(job, error=None):
+        job.pages.close()
+        if error is None:
+            job.export.__exit__(None, None, None)
+            result = dict(job.export.result)
+            metrics.inc("tenant_runs_total", tenant=job.tenant.name, result="ok")
+        else:
+            job.export.__exit__(type(error), error, error.__traceback__)
+            result = {"count": 0, "file": None}
+            metrics.inc("tenant_runs_total", tenant=job.tenant.name, result="failed")
+        result.update(pages=job.page_count, turns=job.turns, error=error and str(error))
+        results[job.tenant.name] = result
+
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while queue or in_flight:
+            while queue and len(in_flight) < workers:
+                job = queue.popleft()
+                in_flight[pool.submit(_advance, job, quantum)] = job
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = in_flight.pop(future)
+                job.turns += 1
+                try:
+                    pages, exhausted = future.result()
+                except Exception as e:
+                    log.error(f"❌ [{job.tenant.name}] fetch failed, watermark not advanced: {e}")
+                    finish(job, e)
+                    continue
+
+                # Exports (files and SQLite) are only touched on this thread
+                try:
+                    for leads in pages:
+                        job.export.add(leads)
+                        metrics.inc("tenant_leads_total", len(leads), tenant=job.tenant.name)
+                except Exception as e:
+                    log.error(f"❌ [{job.tenant.name}] export failed, watermark not advanced: {e}")
+                    finish(job, e)
+                    continue
+                job.page_count += len(pages)
+                metrics.inc("tenant_pages_total", len(pages), tenant=job.tenant.name)
+
+                if exhausted:
+                    finish(job)
+                else:
+                    queue.append(job)
+
+    return {t.name: results[t.name] for t in tenants}
+
+
+def report_tenants(tenants):
+    """
+    Reports each tenant's new leads to its own Docs/Sheets targets.
+
+    Tenants without both `spreadsheet_id` and `doc_id` are skipped. A failed
+    tenant is logged and its leads stay unsent for the next run.
+
+    Returns:
+        dict[str, dict]: Per tenant, `count` and `error`.
+    """
+    from .generate_report import report_new_leads
+
+    results = {}
+    for tenant in tenants:
+        if not tenant.reports:
+            log.warning(f"⚠️ [{tenant.name}] no spreadsheet_id/doc_id — skipped")
+            continue
+        log.info(f"📝 [{tenant.name}] reporting new leads")
+        try:
+            count = report_new_leads(
+                lead_db_file=tenant.lead_db_file,
+                sent_db_file=tenant.sent_db_file,
+                doc_id=tenant.doc_id,
+                spreadsheet_id=tenant.spreadsheet_id,
+            )
+        except Exception as e:
+            log.error(f"❌ [{tenant.name}] report failed: {e}")
+            results[tenant.name] = {"count": 0, "error": str(e)}
+            continue
+        results[tenant.name] = {"count": count, "error": None}
+    return results
+
+
+def main(argv=None):
+    """Command-line entry point: list, fetch or report the registry's tenants."""
+    parser = argparse.ArgumentParser(description="Fetch and report many Helena accounts.")
+    parser.add_argument("--file", default=None, help=f"tenant registry (default: {TENANTS_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="show the registry")
+    list_parser.add_argument("--all", action="store_true", help="include disabled tenants")
+
+    fetch_parser = commands.add_parser("fetch", help="fetch recent sessions of every tenant")
+    fetch_parser.add_argument("--only", nargs="+", metavar="NAME", help="tenants to fetch")
+    fetch_parser.add_argument(
+        "--workers", type=int, default=WORKERS,
+        help="tenants fetched concurrently (default: %(default)s)",
+    )
+    fetch_parser.add_argument(
+        "--quantum", type=int, default=QUANTUM,
+        help="pages fetched per scheduling turn (default: %(default)s)",
+    )
+    fetch_parser.add_argument(
+        "--full", action="store_true",
+        help="ignore the stored watermarks and refetch the whole 7-day window",
+    )
+    fetch_parser.add_argument(
+        "--format", choices=("json", "ndjson"), default=None,
+        help="output file format (default: HELENA_OUTPUT_FORMAT)",
+    )
+    fetch_parser.add_argument(
+        "--profile", action="store_true",
+        help="write a cProfile dump of the run next to the metrics",
+    )
+
+    report_parser = commands.add_parser("report", help="report every tenant's new leads")
+    report_parser.add_argument("--only", nargs="+", metavar="NAME", help="tenants to report")
+    args = parser.parse_args(argv)
+
+    try:
+        tenants = load_registry(args.file, include_disabled=getattr(args, "all", False))
+        tenants = select(tenants, getattr(args, "only", None))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.command == "list":
+        for tenant in tenants:
+            targets = "report ✓" if tenant.reports else "no report"
+            print(f"🏢 {tenant.name:<20} {tenant.account.base_url}  [{targets}]  → {tenant.directory}")
+        print(f"({len(tenants)} tenants)")
+        return tenants
+
+    if args.command == "fetch":
+        with metrics.run("tenants_fetch", profile=args.profile):
+            results = fetch_tenants(
+                tenants, workers=args.workers, quantum=args.quantum,
+                incremental=not args.full, output_format=args.format,
+            )
+            for name, result in results.items():
+                if result["error"]:
+                    log.info(f"   ❌ {name}: failed after {result['pages']} pages — {result['error']}")
+                else:
+                    log.info(f"   ✓ {name}: {result['count']} leads in {result['pages']} pages "
+                             f"({result['turns']} turns) → {result['file']}")
+            failed = sum(1 for r in results.values() if r["error"])
+            total = sum(r["count"] for r in results.values())
+            log.info(f"\n📊 Summary → {total} leads from {len(results) - failed} tenants, {failed} failed")
+        if failed:
+            raise SystemExit(1)
+        return results
+
+    with metrics.run("tenants_report"):
+        results = report_tenants(tenants)
+        failed = sum(1 for r in results.values() if r["error"])
+        log.info(f"📊 Reported {sum(r['count'] for r in results.values())} leads "
+                 f"for {len(results) - failed} tenants, {failed} failed")
+    if failed:
+        raise SystemExit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,23 @@
-import requests
-import os
-from dotenv import load_dotenv
+"""
+test_endpoints.py
+-----------------
+Checks which session endpoint variants are reachable with the API token
+(a `probe.py` preset).
+"""
 
-load_dotenv()
+from . import http_client, probe
 
-BASE = os.getenv("HELENA_API_URL")
-TOKEN = os.getenv("HELENA_API_KEY")
+BASE = http_client.BASE_URL
 
-headers = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+headers = http_client.auth_headers(content_type="application/json", accept=None)
 
 endpoints = [
-    f"{BASE}/chat2/session",
-    f"{BASE}/chat2/v1/session",
-    f"{BASE}/chat2/v1/session/search",
-    f"{BASE}/chat/v2/session",
-    f"{BASE}/chat/v2/session/search",
-    f"{BASE}/chat/v1/session/search"
+    "/chat2/session",
+    "/chat2/v1/session",
+    "/chat2/v1/session/search",
+    "/chat/v2/session",
+    "/chat/v2/session/search",
+    "/chat/v1/session/search"
 ]
 
 params = {
@@ -27,17 +26,16 @@ params = {
     "size": 5
 }
 
-print(f"🔍 Testando endpoints no domínio: {BASE}\n")
+PROBES = probe.ProbeSet(
+    "endpoints", BASE, endpoints, params=[params], headers=headers, timeout=20,
+    description="Check session endpoint accessibility.",
+)
+
+
+def main(argv=None):
+    """Runs the preset (see `probe.main` for the options)."""
+    return probe.main(PROBES, argv)
 
-for url in endpoints:
-    print(f"➡️ Testando: {url}")
-    try:
-        r = requests.get(url, headers=headers, params=params, timeout=20)
-        print("Status:", r.status_code)
-        
-        print(r.text[:600])
-        print("-" * 80)
 
-    except Exception as e:
-        print("❌ Erro:", e)
-        print("-" * 80)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,17 @@
-import requests, os, itertools, time
-from dotenv import load_dotenv
+"""
+test_query_params.py
+--------------------
+Tries combinations of date, paging and sort parameters on the session
+endpoint, looking for one that returns recent sessions (a `probe.py`
+preset; equivalent combinations are sent once, several at a time).
+"""
 
-load_dotenv()
+from . import http_client, probe
 
-BASE = os.getenv("HELENA_API_URL", "https://api.chat.resultplus.com.br")
-URL = f"{BASE}/chat/v1/session"
-TOKEN = os.getenv("HELENA_API_KEY")
+BASE = http_client.BASE_URL
 
 HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Accept": "application/json,text/plain,*/*",
+    **http_client.auth_headers(accept="application/json,text/plain,*/*"),
     "User-Agent": "param-discovery/1.0"
 }
 
@@ -57,40 +59,28 @@ extra_pairs = [
 ]
 combos.extend(extra_pairs)
 
-seen = set()
-unique_combos = []
-for c in combos:
-    k = tuple(sorted(c.items()))
-    if k not in seen:
-        seen.add(k)
-        unique_combos.append(c)
+PROBES = probe.ProbeSet(
+    "query-params", BASE, ["/chat/v1/session"], params=combos, headers=HEADERS,
+    markers=["2025-10", "2025-11"], stop_on=["match"], timeout=12,
+    # Plain 200s/404s/500s without recent dates are the norm; print the rest
+    quiet=["ok", "not_found", "routing_error", "server_error"],
+    description="Try date/paging/sort parameter combinations on the session endpoint.",
+)
+
 
-print(f"🔍 Testando {len(unique_combos)} combinações em: {URL}\n(tempo estimado: ~{len(unique_combos)*0.4:.1f}s)")
+def main(argv=None):
+    """Runs the preset (see `probe.main`); stops at the first match unless `--all`."""
+    results = probe.main(PROBES, argv)
+    if results and not any(r["verdict"] == "match" for r in results):
+        print("\n❌ Não encontramos respostas com datas de out/nov usando esses parâmetros comuns.")
+        print("Próximos passos recomendados:")
+        print(" - testar com sessão autenticada (cookie) do painel,")
+        print(" - contatar suporte ResultPlus para endpoint/datas,")
+        print(" - ou solicitar o swagger.json interno.")
+    elif results:
+        print("\n🎯 Achou — veja o bloco de saída acima.")
+    return results
 
-found_any = False
-for i, params in enumerate(unique_combos, 1):
-    try:
-        r = requests.get(URL, headers=HEADERS, params=params, timeout=12)
-        status = r.status_code
-        text = r.text[:2000]
-        if "2025-10" in text or "2025-11" in text:
-            print(f"\n✅ POSSÍVEL ACERTO na combinação #{i} -> status {status}")
-            print("params =", params)
-            print("trecho resposta:\n", text[:1200])
-            found_any = True
-            break
-        else:
-            if i % 10 == 0 or status not in (200, 404, 500):
-                print(f"[{i}/{len(unique_combos)}] status {status} params={params} (sem datas recentes)")
-    except Exception as e:
-        print(f"[{i}] Erro com params={params} -> {e}")
-    time.sleep(0.25)
 
-if not found_any:
-    print("\n❌ Não encontramos respostas com datas de out/nov usando esses parâmetros comuns.")
-    print("Próximos passos recomendados:")
-    print(" - testar com sessão autenticada (cookie) do painel,")
-    print(" - contatar suporte ResultPlus para endpoint/datas,")
-    print(" - ou solicitar o swagger.json interno.")
-else:
-    print("\n🎯 Achou — pare o script e me mande o bloco de saída acima.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
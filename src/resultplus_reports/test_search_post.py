@@ -1,16 +1,7 @@
-import requests, os, json
-from dotenv import load_dotenv
+from . import http_client
 
-load_dotenv()
-
-BASE = os.getenv("HELENA_API_URL")
-TOKEN = os.getenv("HELENA_API_KEY")
-
-url = f"{BASE}/chat/v1/session/search"
-headers = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+url = f"{http_client.BASE_URL}/chat/v1/session/search"
+headers = http_client.auth_headers(content_type="application/json", accept=None)
 
 body = {
     "startDate": "2025-10-01T00:00:00Z",
@@ -20,7 +11,14 @@ body = {
     "sort": [{"property": "createdAt", "direction": "DESC"}]
 }
 
-print("🔍 Testando POST em /chat/v1/session/search ...")
-r = requests.post(url, headers=headers, json=body)
-print("Status:", r.status_code)
-print(r.text[:1000])
\ No newline at end of file
+
+def main(argv=None):
+    """Sends one POST search and prints the response."""
+    print("🔍 Testando POST em /chat/v1/session/search ...")
+    r = http_client.post(url, headers=headers, json=body)
+    print("Status:", r.status_code)
+    print(r.text[:1000])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+watermark.py
+------------
+Persists the newest `createdAt` already ingested from Helena CRM.
+
+`fetch_result` stores the watermark after every successful run and, on the
+next incremental run, stops paginating as soon as it reaches sessions that
+are not newer than it. Since results are sorted `createdAt,desc`, a routine
+run only downloads the one or two pages that contain new sessions.
+
+The watermark is a small JSON file written atomically (temp file + rename),
+so an interrupted run never leaves a truncated file behind.
+
+Environment variables (optional):
+- HELENA_WATERMARK_FILE: Path of the watermark file (default: watermark.json)
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+WATERMARK_FILE = os.getenv("HELENA_WATERMARK_FILE", "watermark.json")
+
+
+def parse_timestamp(value):
+    """
+    Parses a Helena ISO-8601 timestamp (`...Z` or with offset).
+
+    Args:
+        value (str | None): Timestamp string.
+
+    Returns:
+        datetime | None: Timezone-aware datetime, or None if invalid.
+    """
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def load_watermark(path=None):
+    """
+    Loads the stored watermark.
+
+    Args:
+        path (str | None): Watermark file. Defaults to `WATERMARK_FILE`.
+
+    Returns:
+        datetime | None: Newest ingested `createdAt`, or None if unset.
+    """
+    path = path or WATERMARK_FILE
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError:
+            return None
+    return parse_timestamp(data.get("createdAt"))
+
+
+def save_watermark(created_at, path=None):
+    """
+    Atomically stores a new watermark.
+
+    Args:
+        created_at (datetime): Newest ingested `createdAt`.
+        path (str | None): Watermark file. Defaults to `WATERMARK_FILE`.
+    """
+    path = path or WATERMARK_FILE
+    data = {
+        "createdAt": created_at.astimezone(timezone.utc).isoformat(),
+        "updatedAt": datetime.now(timezone.utc).isoformat(),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,67 @@
+"""
+Shared fixtures: a local Helena stand-in and an isolated working directory.
+
+Module settings are read from the environment at import time, so the
+on-disk caches and metric files are switched off here, before the package
+is imported by any test.
+"""
+
+import os
+
+os.environ.setdefault("HELENA_CACHE", "0")
+os.environ.setdefault("HELENA_METRICS", "0")
+os.environ.setdefault("PROBE_CACHE", "0")
+os.environ.setdefault("HELENA_API_KEY", "test-token")
+# The mock server is local: start the shared per-host controllers fast
+os.environ.setdefault("HELENA_RATE", "200")
+os.environ.setdefault("HELENA_RATE_MAX", "1000")
+
+import pytest  # noqa: E402
+
+from resultplus_reports import mock_server, rate_limit  # noqa: E402
+from resultplus_reports.http_client import Account  # noqa: E402
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the test inside an empty temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def serve():
+    """Starts mock servers (`serve(count=..., faults=...)`), stopped after the test."""
+    servers = []
+
+    def start(**kwargs):
+        server = mock_server.serve(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def account(request):
+    """Returns `make(server)`: an `Account` for a mock server with a fast, private rate scope."""
+
+    def make(server, scope=None):
+        scope = scope or f"test-{request.node.name}"
+        rate_limit.configure(scope, rate=500, min_rate=100, max_rate=1000, burst=50)
+        return Account(server.url, "test-token", rate_scope=scope)
+
+    return make
+
+
+def subprocess_env(server=None, **extra):
+    """Environment for running a package entry point as a child process."""
+    env = dict(os.environ, PYTHONPATH=SRC, **extra)
+    if server is not None:
+        env["HELENA_API_URL"] = server.url
+    return env
@@ -0,0 +1,157 @@
+"""The columnar archive round-trips lead files and answers like the LeadStore."""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from resultplus_reports import archive
+from resultplus_reports.archive import LeadArchive, convert
+from resultplus_reports.lead import Lead
+from resultplus_reports.lead_store import LeadStore
+from resultplus_reports.lead_writer import JSONArrayWriter, NDJSONWriter
+
+BASE_TS = int(datetime(2025, 2, 20, tzinfo=timezone.utc).timestamp())
+STATUSES = ("OPEN", "IN_PROGRESS", "CLOSED", None)
+
+
+def make_lead(index, created_ts, status, message=None):
+    created = datetime.fromtimestamp(created_ts, timezone.utc)
+    criado_em = created.isoformat().replace("+00:00", "Z")
+    link = None if index % 5 == 0 else f"https://chat.example/s/{index}"
+    return Lead(f"sess-{index:05d}", created_ts * 1_000_000, criado_em, status,
+                message or f"olá, ação nº {index}", link)
+
+
+def random_leads(rng, ids):
+    """Leads for `ids` spread over late February to early April (whole seconds)."""
+    return [
+        make_lead(i, BASE_TS + rng.randrange(45 * 86400), rng.choice(STATUSES)) for i in ids
+    ]
+
+
+def in_order(leads):
+    return sorted(leads, key=lambda lead: (lead.created_us, lead.id))
+
+
+def by_bucket(rows):
+    return sorted(rows, key=lambda row: (row[0], str(row[1])))
+
+
+@pytest.fixture
+def sources(workdir):
+    """Two overlapping lead files, and a LeadStore loaded from them in file order."""
+    rng = random.Random(11)
+    older = random_leads(rng, range(0, 600))
+    newer = random_leads(rng, range(400, 1000))  # 400-599 moved and/or changed status
+    with JSONArrayWriter("leads_20250301.json") as writer:
+        writer.write_all(lead.to_dict() for lead in older)
+    with NDJSONWriter("leads_20250302.ndjson") as writer:
+        writer.write_all(lead.to_dict() for lead in newer)
+    with LeadStore() as store:
+        store.upsert_many(older)
+        store.upsert_many(newer)
+        yield store, ["leads_20250302.ndjson", "leads_20250301.json"]
+
+
+RANGES = (
+    (None, None),
+    (datetime(2025, 3, 1, tzinfo=timezone.utc), datetime(2025, 4, 1, tzinfo=timezone.utc)),
+    (datetime(2025, 2, 25, 6, tzinfo=timezone.utc), datetime(2025, 3, 10, 18, tzinfo=timezone.utc)),
+    (datetime(2025, 3, 15, 12, 30, 15, tzinfo=timezone.utc), None),
+    (None, datetime(2025, 2, 21, tzinfo=timezone.utc)),
+    (datetime(2030, 1, 1, tzinfo=timezone.utc), None),
+)
+
+
+def test_convert_matches_the_lead_store(sources):
+    store, paths = sources
+    written = convert(paths, "archive")
+    assert list(written) == ["2025-02", "2025-03", "2025-04"]
+    assert sum(written.values()) == 1000
+
+    with LeadArchive("archive") as lead_archive:
+        for start, end in RANGES:
+            assert lead_archive.count_range(start, end) == store.count_range(start, end)
+            assert lead_archive.count_by_status(start, end) == store.count_by_status(start, end)
+            archived = list(lead_archive.iter_range(start, end))
+            assert [lead.created_us for lead in archived] == sorted(
+                (lead.created_us for lead in archived), reverse=True
+            )
+            assert in_order(archived) == in_order(store.iter_range(start, end))
+            assert sorted(lead_archive.iter_ids(start, end)) == sorted(store.iter_ids(start, end))
+
+            closed = list(lead_archive.iter_range(start, end, status="CLOSED"))
+            assert in_order(closed) == in_order(store.iter_range(start, end, status="CLOSED"))
+
+            # The store's rollups are hourly, so compare on hour-aligned bounds
+            if all(b is None or b.minute == b.second == 0 for b in (start, end)):
+                assert by_bucket(lead_archive.iter_buckets(start, end)) == by_bucket(
+                    store.iter_rollup_buckets(start, end)
+                )
+
+        utc = timezone.utc
+        for by in (("month", "status"), ("day", "hour", "status")):
+            assert lead_archive.summarize(by=by, tz=utc) == store.summarize(by=by, tz=utc)
+
+
+def partition_dirs(directory):
+    return sorted(name for name in os.listdir(directory) if name != archive.MANIFEST)
+
+
+def test_add_rewrites_the_partition_and_manifest_atomically(sources):
+    store, paths = sources
+    convert(paths, "archive")
+    march_ts = int(datetime(2025, 3, 5, tzinfo=timezone.utc).timestamp())
+    changed = make_lead(2000, march_ts, "CLOSED", message="primeira versão")
+    with LeadArchive("archive") as lead_archive:
+        before = dict(lead_archive.manifest["partitions"])
+        old_path = before["2025-03"]["path"]
+        old_count = before["2025-03"]["count"]
+
+        written = lead_archive.add([changed, make_lead(2001, march_ts + 60, "OPEN")])
+        assert written == {"2025-03": old_count + 2}
+        changed = make_lead(2000, march_ts + 7200, None, message="segunda versão")
+        assert lead_archive.add([changed]) == {"2025-03": old_count + 2}
+
+        meta = lead_archive.manifest["partitions"]["2025-03"]
+        assert meta["path"] != old_path
+        assert lead_archive.manifest["partitions"]["2025-02"] == before["2025-02"]
+        # Exactly one directory per partition, and no leftover temporary files
+        assert partition_dirs("archive") == sorted(
+            m["path"] for m in lead_archive.manifest["partitions"].values()
+        )
+        assert not any(name.endswith(".tmp") for name in os.listdir("archive"))
+
+    with open(os.path.join("archive", archive.MANIFEST), encoding="utf-8") as f:
+        assert json.load(f)["partitions"]["2025-03"] == meta
+    with LeadArchive("archive") as lead_archive:
+        march = {lead.id: lead for lead in lead_archive.iter_range(*archive._month_bounds("2025-03"))}
+        assert len(march) == old_count + 2
+        assert march["sess-02000"] == changed
+        assert lead_archive.count_range() == 1002
+
+
+def test_failed_rewrite_leaves_the_archive_untouched(sources, monkeypatch):
+    store, paths = sources
+    convert(paths, "archive")
+    with open(os.path.join("archive", archive.MANIFEST), encoding="utf-8") as f:
+        manifest = f.read()
+
+    def failing_write(directory, leads):
+        os.makedirs(directory)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(archive, "write_partition", failing_write)
+    march_ts = int(datetime(2025, 3, 5, tzinfo=timezone.utc).timestamp())
+    with LeadArchive("archive") as lead_archive:
+        with pytest.raises(OSError):
+            lead_archive.add([make_lead(2000, march_ts, "OPEN")])
+
+    with open(os.path.join("archive", archive.MANIFEST), encoding="utf-8") as f:
+        assert f.read() == manifest
+    with LeadArchive("archive") as lead_archive:
+        assert lead_archive.count_range() == store.count_range() == 1000
+        assert in_order(lead_archive.iter_range()) == in_order(store.iter_range())
@@ -0,0 +1,52 @@
+"""A failed backfill resumes from its state file and merges shards by id."""
+
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+from resultplus_reports import backfill
+from resultplus_reports.lead_store import LeadStore
+
+DAY = timedelta(days=1)
+
+
+def test_rerun_fetches_only_unfinished_shards(serve, account, workdir, monkeypatch):
+    start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    # 200 sessions a day: 4 pages per daily shard, so every shard is narrowed
+    server = serve(count=600, span_days=3, newest=start + 3 * DAY)
+    acct = account(server)
+    end = start + 3 * DAY + timedelta(hours=1)
+    failing = (start + DAY, start + 2 * DAY)
+
+    calls = []
+    failed = threading.Event()
+    fetch_shard = backfill.fetch_shard
+
+    def flaky_fetch_shard(shard_start, shard_end, **kwargs):
+        calls.append((shard_start, shard_end))
+        if (shard_start, shard_end) == failing and not failed.is_set():
+            failed.set()
+            raise RuntimeError("connection reset")
+        return fetch_shard(shard_start, shard_end, **kwargs)
+
+    monkeypatch.setattr(backfill, "fetch_shard", flaky_fetch_shard)
+
+    first = backfill.backfill_sessions(start, end, max_pages=2, account=acct)
+    assert first["failed"] == 1
+    state = json.loads((workdir / "backfill_state.json").read_text())
+    assert state["pending"] == [[failing[0].isoformat(), failing[1].isoformat()]]
+
+    calls.clear()
+    requests_before = server.stats["requests"]
+    second = backfill.backfill_sessions(start, end, max_pages=2, account=acct)
+    assert second["failed"] == 0
+    assert calls[0] == failing
+    assert all(failing[0] <= s and e <= failing[1] for s, e in calls)
+    assert len(calls) > 1  # the failed shard was narrowed on the rerun too
+    assert server.stats["requests"] - requests_before < 10
+    assert not (workdir / "backfill_state.json").exists()
+
+    with LeadStore() as store:
+        ids = list(store.iter_ids(start, end))
+    assert second["stored"] == len(ids) == len(set(ids)) == 600
+    assert set(ids) == {f"sess-{i:08d}" for i in range(600)}
@@ -0,0 +1,69 @@
+"""The daemon's /health endpoint follows its polls; each poll gets a fresh trace."""
+
+import requests
+
+from resultplus_reports import daemon, metrics
+from resultplus_reports.daemon import Daemon, serve_health
+from resultplus_reports.mock_server import Faults
+from resultplus_reports.tenants import Tenant
+from resultplus_reports.watermark import load_watermark
+
+FAST = {"rate": 500, "min_rate": 100, "max_rate": 1000, "burst": 50}
+
+
+def health(server):
+    return requests.get(f"{server.url}/health", timeout=5).status_code
+
+
+def test_health_reports_failed_polls(serve, workdir):
+    api = serve(count=100, span_days=2)
+    tenant = Tenant("daemon-test", base_url=api.url, token="test-token", rate_limits=FAST)
+    owner = Daemon(interval=60, report_interval=None, tenants=[tenant])
+    server = serve_health(owner, "127.0.0.1", 0)
+    try:
+        assert health(server) == 200
+        owner.run(once=True)
+        assert owner.last_poll["error"] is None and owner.last_poll["leads"] == 100
+        assert health(server) == 200
+        watermark = load_watermark(tenant.watermark_file)
+
+        # Every failure backs off; /health turns 503 after repeated ones
+        api.faults = Faults(error_rate=1.0, error_status=500)
+        owner.poll()
+        assert owner.last_poll["error"] and owner.poll_failures == 1
+        assert health(server) == 200
+        for _ in range(daemon.UNHEALTHY_AFTER_FAILURES - 1):
+            owner.poll()
+        assert health(server) == 503
+        assert load_watermark(tenant.watermark_file) == watermark
+
+        status = requests.get(f"{server.url}/status", timeout=5).json()
+        assert status["healthy"] is False
+        assert status["poll_failures"] == daemon.UNHEALTHY_AFTER_FAILURES
+
+        api.faults = Faults()
+        owner.poll()
+        assert health(server) == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_each_poll_starts_a_new_trace(serve, workdir, monkeypatch):
+    api = serve(count=10, span_days=2)
+    tenant = Tenant("trace-test", base_url=api.url, token="test-token", rate_limits=FAST)
+    owner = Daemon(report_interval=None, tenants=[tenant])
+    monkeypatch.setattr(metrics, "MAX_TRACE_EVENTS", 50)
+    metrics.REGISTRY.reset()
+    for _ in range(60):
+        metrics.event("filler", 0.0, 0.0)
+    assert metrics.REGISTRY.dropped_events == 10
+
+    owner.poll()
+    names = [event["name"] for event in metrics.REGISTRY.events]
+    assert "daemon_poll" in names and "filler" not in names
+    assert metrics.REGISTRY.dropped_events == 0
+
+    # Counters stay cumulative across polls
+    owner.poll()
+    assert metrics.REGISTRY.counters[("daemon_polls_total", (("result", "ok"),))] == 2
@@ -0,0 +1,45 @@
+"""`python -m resultplus_reports.<module>` runs still print their progress and summary."""
+
+import json
+import subprocess
+import sys
+from datetime import date, timedelta
+
+from conftest import subprocess_env
+
+
+def run_module(module, args, env, cwd):
+    proc = subprocess.run(
+        [sys.executable, "-m", f"resultplus_reports.{module}", *args],
+        env=env, cwd=cwd, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    return proc.stdout
+
+
+def test_fetch_result_prints_summary(serve, workdir):
+    server = serve(count=300, span_days=7)
+    out = run_module("fetch_result", ["--full"], subprocess_env(server), workdir)
+    assert "✅ 300 leads saved to" in out
+    assert "📊 Summary → 300 leads exported" in out
+
+
+def test_backfill_prints_summary(serve, workdir):
+    server = serve(count=200, span_days=3)
+    start = (date.today() - timedelta(days=4)).isoformat()
+    out = run_module("backfill", [start, date.today().isoformat()], subprocess_env(server), workdir)
+    assert "🔄 Backfilling" in out
+    assert "✅ Backfill fetched 200 leads" in out
+
+
+def test_tenants_prints_summary(serve, workdir):
+    servers = [serve(count=120, span_days=7), serve(count=80, span_days=7)]
+    registry = {"tenants": [
+        {"name": f"t{i}", "base_url": server.url, "token": "test-token"}
+        for i, server in enumerate(servers)
+    ]}
+    (workdir / "tenants.json").write_text(json.dumps(registry))
+    out = run_module("tenants", ["fetch"], subprocess_env(), workdir)
+    assert "✓ t0: 120 leads" in out
+    assert "✓ t1: 80 leads" in out
+    assert "📊 Summary → 200 leads from 2 tenants, 0 failed" in out
@@ -0,0 +1,47 @@
+"""Concurrent page fetching returns exactly what the serial path returns."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from resultplus_reports import rate_limit
+from resultplus_reports.fetch_result import iter_leads
+from resultplus_reports.mock_server import Faults
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_RETRIES", 10)
+    monkeypatch.setattr(rate_limit, "BACKOFF_BASE", 0.005)
+
+
+def fetch_ids(account, max_in_flight):
+    end = datetime.now(timezone.utc)
+    leads = iter_leads(end - timedelta(days=7), end, max_in_flight=max_in_flight, account=account)
+    return [lead.id for lead in leads]
+
+
+def test_concurrent_pages_match_serial_order(serve, account):
+    server = serve(count=1500, span_days=6)
+    api = account(server)
+
+    serial = fetch_ids(api, max_in_flight=1)
+    concurrent = fetch_ids(api, max_in_flight=4)
+
+    assert len(serial) == 1500
+    assert concurrent == serial
+
+
+def test_concurrent_pages_survive_throttling_and_errors(serve, account, fast_retries):
+    clean = serve(count=1200, span_days=6)
+    expected = fetch_ids(account(clean, "clean"), max_in_flight=1)
+
+    faulty = serve(
+        count=1200, span_days=6, newest=clean.dataset.newest,
+        faults=Faults(error_rate=0.15, throttle_rate=0.15, retry_after=0),
+    )
+    api = account(faulty, "faulty")
+    assert fetch_ids(api, max_in_flight=1) == expected
+    assert fetch_ids(api, max_in_flight=4) == expected
+    assert faulty.stats["429"] > 0
+    assert faulty.stats["5xx"] > 0
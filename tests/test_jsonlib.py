@@ -0,0 +1,95 @@
+"""Every JSON backend decodes and encodes exactly like the stdlib `json` module."""
+
+import json
+
+import pytest
+import requests
+
+from resultplus_reports import jsonlib
+from resultplus_reports.lead_writer import JSONArrayWriter
+from resultplus_reports.mock_server import SESSION_PATH
+
+BACKENDS = [
+    pytest.param("msgspec", marks=pytest.mark.skipif(jsonlib.msgspec is None, reason="no msgspec")),
+    pytest.param("orjson", marks=pytest.mark.skipif(jsonlib.orjson is None, reason="no orjson")),
+    "json",
+]
+
+RECORDS = [
+    {"id": "sess-1", "criado_em": "2025-03-01T12:00:00.000Z", "status": "OPEN",
+     "ultima_mensagem": "Olá! Quero saber o preço 💬 — ação até sábado", "link_chat": None},
+    {"id": "sess-2", "criado_em": "2025-03-01T12:00:01-03:00", "status": None,
+     "ultima_mensagem": 'aspas "duplas", barra \\ e\nnova linha\ttab\u0001 ',
+     "link_chat": "https://chat.example/s/2?a=1&b=<2>"},
+    {"id": "sess-3", "criado_em": "2025-03-01T12:00:02Z", "status": "CLOSED",
+     "ultima_mensagem": "中文 العربية ελληνικά", "link_chat": "", "extra": {"n": [1, 2, []], "e": {}}},
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    monkeypatch.setattr(jsonlib, "BACKEND", request.param)
+    return request.param
+
+
+def test_backend_selection(backend):
+    assert jsonlib.decoder_name() == backend
+    assert jsonlib.encoder_name() == ("orjson" if backend == "orjson" else "json")
+
+
+def projected(items, fields=jsonlib.SESSION_FIELDS):
+    return [{f: item.get(f) for f in fields} for item in items]
+
+
+def test_page_decoder_matches_json_loads(backend, serve):
+    server = serve(count=120, span_days=1)
+    content = requests.get(
+        server.url + SESSION_PATH, params={"size": 100},
+        headers={"Authorization": "Bearer test-token"}, timeout=5,
+    ).content
+    expected = json.loads(content)
+    assert len(expected["items"]) == 100
+
+    assert jsonlib.loads(content) == expected
+    assert jsonlib.loads(content.decode("utf-8")) == expected
+    assert projected(jsonlib.decode_page(content)) == projected(expected["items"])
+    fields = ("id", "contact", "tags")
+    assert projected(jsonlib.decode_page(content, fields), fields) == projected(expected["items"], fields)
+
+
+def test_page_decoder_handles_odd_pages(backend):
+    page = {"items": [
+        {"id": "a", "createdAt": "2025-03-01T00:00:00Z", "status": None, "lastMessageText": "ñ"},
+        {"id": "b"},
+        {"id": "c", "previewUrl": "https://x", "nested": {"deep": [1, {"x": None}]}},
+    ], "page": 0}
+    content = json.dumps(page, ensure_ascii=False).encode("utf-8")
+    assert projected(jsonlib.decode_page(content)) == projected(page["items"])
+
+    assert jsonlib.decode_page(b'{"items": null}') == []
+    assert jsonlib.decode_page(b'{"page": 3}') == []
+    assert jsonlib.decode_page(b"[]") == []
+    # Non-object items are dropped (msgspec falls back to a full decode)
+    assert jsonlib.decode_page(b'{"items": [1, {"id": "x"}]}') == [{"id": "x"}]
+    for bad in (b'{"items": [', b"", b"nope"):
+        with pytest.raises(ValueError):
+            jsonlib.decode_page(bad)
+        with pytest.raises(ValueError):
+            jsonlib.loads(bad)
+
+
+@pytest.mark.parametrize("record", RECORDS)
+def test_encoders_match_the_stdlib(backend, record):
+    assert jsonlib.dumps(record) == json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+    assert jsonlib.dumps_pretty(record) == json.dumps(record, ensure_ascii=False, indent=2)
+    assert jsonlib.loads(jsonlib.dumps(record)) == record
+
+
+@pytest.mark.parametrize("count", [1, 2, len(RECORDS)])
+def test_json_array_writer_is_byte_identical_to_json_dump(backend, workdir, count):
+    records = RECORDS[:count]
+    with JSONArrayWriter("streamed.json") as writer:
+        writer.write_all(records)
+    with open("dumped.json", "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    assert (workdir / "streamed.json").read_bytes() == (workdir / "dumped.json").read_bytes()
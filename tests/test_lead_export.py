@@ -0,0 +1,61 @@
+"""A failed export leaves the lead file and the watermark as they were."""
+
+import pytest
+
+from resultplus_reports.fetch_result import LeadExport
+from resultplus_reports.lead import Lead
+from resultplus_reports.lead_writer import NDJSONWriter, iter_lead_file
+from resultplus_reports.mock_server import SyntheticDataset
+
+
+def make_leads(count, span_days=1):
+    dataset = SyntheticDataset(count, span_days)
+    return [Lead.from_session(dataset.session(i)) for i in range(count)]
+
+
+@pytest.mark.parametrize("output_format", ["ndjson", "json"])
+def test_failed_incremental_run_is_rolled_back(workdir, output_format):
+    leads = make_leads(120)
+    with LeadExport(output_format=output_format) as first:
+        first.add(leads[60:])
+    path = workdir / first.file_name
+    before = path.read_bytes()
+    watermark = (workdir / "watermark.json").read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with LeadExport(output_format=output_format) as failed:
+            failed.add(leads[:60])
+            raise RuntimeError("fetch interrupted")
+
+    assert path.read_bytes() == before
+    assert (workdir / "watermark.json").read_bytes() == watermark
+
+    with LeadExport(output_format=output_format) as retry:
+        retry.add(leads[:60])
+    ids = [record["id"] for record in iter_lead_file(str(path))]
+    assert sorted(ids) == sorted(lead.id for lead in leads)
+
+
+def test_failed_first_ndjson_run_leaves_no_file(workdir):
+    with pytest.raises(RuntimeError):
+        with LeadExport(output_format="ndjson") as failed:
+            failed.add(make_leads(10))
+            raise RuntimeError("fetch interrupted")
+    assert not list(workdir.glob("leads_*"))
+    assert not (workdir / "watermark.json").exists()
+
+
+def test_full_ndjson_run_replaces_file_only_on_success(workdir):
+    path = workdir / "leads.ndjson"
+    path.write_text('{"id": "old"}\n')
+
+    with pytest.raises(RuntimeError):
+        with NDJSONWriter(str(path), append=False) as writer:
+            writer.write({"id": "new"})
+            raise RuntimeError("fetch interrupted")
+    assert path.read_text() == '{"id": "old"}\n'
+    assert not (workdir / "leads.ndjson.tmp").exists()
+
+    with NDJSONWriter(str(path), append=False) as writer:
+        writer.write({"id": "new"})
+    assert [r["id"] for r in iter_lead_file(str(path))] == ["new"]
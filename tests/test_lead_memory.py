@@ -0,0 +1,33 @@
+"""A `Lead` takes at least a third less memory than the exported lead dict."""
+
+import tracemalloc
+
+from resultplus_reports.lead import Lead
+from resultplus_reports.mock_server import SyntheticDataset
+
+COUNT = 20000
+
+
+def allocated(build, sessions):
+    """Bytes still allocated by `build()` over every session (strings are shared)."""
+    tracemalloc.start()
+    try:
+        objects = [build(session) for session in sessions]
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(objects) == len(sessions)
+    return current
+
+
+def test_lead_is_smaller_than_the_lead_dict():
+    dataset = SyntheticDataset(COUNT, span_days=7)
+    sessions = [dataset.session(i) for i in range(COUNT)]
+    # Both sides keep references to the session's strings; the Lead also
+    # allocates its parsed `created_us`
+    lead_bytes = allocated(Lead.from_session, sessions)
+    dict_bytes = allocated(lambda s: {
+        "id": s["id"], "criado_em": s["createdAt"], "status": s["status"],
+        "ultima_mensagem": s["lastMessageText"], "link_chat": s["previewUrl"],
+    }, sessions)
+    assert lead_bytes <= dict_bytes * 2 / 3, (lead_bytes / COUNT, dict_bytes / COUNT)
@@ -0,0 +1,92 @@
+"""The trigger-maintained `lead_rollup` table always matches the raw leads."""
+
+import random
+from datetime import datetime, timezone
+
+from resultplus_reports.lead import Lead
+from resultplus_reports.lead_store import LeadStore
+
+BASE_TS = int(datetime(2025, 3, 1, tzinfo=timezone.utc).timestamp())
+STATUSES = ("OPEN", "IN_PROGRESS", "CLOSED", None)
+
+
+def make_lead(index, created_ts, status):
+    created = datetime.fromtimestamp(created_ts, timezone.utc)
+    criado_em = created.isoformat().replace("+00:00", "Z")
+    return Lead(f"sess-{index:05d}", created_ts * 1_000_000, criado_em, status)
+
+
+def random_batch(rng, ids):
+    """Leads for `ids` with random hours (across six buckets) and statuses."""
+    return [
+        make_lead(i, BASE_TS + rng.randrange(6 * 3600), rng.choice(STATUSES)) for i in ids
+    ]
+
+
+def by_bucket(rows):
+    return sorted(rows, key=lambda row: (row[0], str(row[1])))
+
+
+def grouped_leads(store):
+    """`GROUP BY` over the raw leads, in `iter_rollup_buckets` form."""
+    return by_bucket(store.conn.execute(
+        "SELECT created_ts / 3600 * 3600, status, COUNT(*) FROM leads GROUP BY 1, 2"
+    ).fetchall())
+
+
+def rollup_buckets(store, start=None, end=None):
+    return by_bucket(store.iter_rollup_buckets(start, end))
+
+
+def test_rollups_follow_inserts_upserts_and_deletes(workdir):
+    rng = random.Random(7)
+    with LeadStore() as store:
+        store.upsert_many(random_batch(rng, range(0, 300)))
+        # Overlapping batches: existing leads move hour and/or change status
+        store.upsert_many(random_batch(rng, range(200, 500)))
+        store.upsert_many(random_batch(rng, range(100, 250)))
+        # Same hour and status, other fields changed: a no-op for the rollups
+        same = list(store.iter_range())[:50]
+        for lead in same:
+            lead.ultima_mensagem = "edited"
+        store.upsert_many(same)
+        with store.conn:
+            store.conn.execute("DELETE FROM leads WHERE id < 'sess-00050'")
+
+        assert store.count_range() == 450
+        assert store.check_rollups() == []
+        expected = grouped_leads(store)
+        assert rollup_buckets(store) == expected
+
+        # A sub-range only returns the buckets inside it
+        start = datetime.fromtimestamp(BASE_TS + 2 * 3600, timezone.utc)
+        end = datetime.fromtimestamp(BASE_TS + 4 * 3600, timezone.utc)
+        window = [row for row in expected if start.timestamp() <= row[0] < end.timestamp()]
+        assert rollup_buckets(store, start, end) == window
+
+
+def test_check_rollups_reports_drift_and_rebuild_repairs_it(workdir):
+    rng = random.Random(3)
+    with LeadStore() as store:
+        store.upsert_many(random_batch(rng, range(100)))
+        with store.conn:
+            store.conn.execute(
+                "UPDATE lead_rollup SET count = count + 1"
+                " WHERE bucket_ts = (SELECT MIN(bucket_ts) FROM lead_rollup)"
+            )
+        drift = store.check_rollups()
+        assert drift and all(rolled == raw + 1 for _, _, rolled, raw in drift)
+
+        store.rebuild_rollups()
+        assert store.check_rollups() == []
+
+
+def test_rollups_are_built_for_databases_that_predate_them(workdir):
+    rng = random.Random(5)
+    with LeadStore() as store:
+        store.upsert_many(random_batch(rng, range(100)))
+        with store.conn:
+            store.conn.execute("DELETE FROM lead_rollup")
+    with LeadStore() as store:
+        assert store.check_rollups() == []
+        assert sum(count for _, _, count in store.iter_rollup_buckets()) == 100
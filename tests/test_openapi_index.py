@@ -0,0 +1,159 @@
+"""The offline spec index matches routes and parameters of Swagger 2 and OpenAPI 3 specs."""
+
+import pytest
+
+from resultplus_reports.openapi_index import SpecIndex, load_index, save_spec
+
+SWAGGER_2 = {
+    "swagger": "2.0",
+    "info": {"title": "Helena", "version": "1.0"},
+    "host": "api.example.com",
+    "basePath": "/chat/v1",
+    "paths": {
+        "/session": {
+            "get": {
+                "operationId": "listSessions",
+                "parameters": [
+                    {"name": "startDate", "in": "query"},
+                    {"name": "endDate", "in": "query"},
+                    {"$ref": "#/parameters/PageSize"},
+                ],
+            },
+            "post": {
+                "parameters": [
+                    {"name": "body", "in": "body", "schema": {"$ref": "#/definitions/NewSession"}},
+                ],
+            },
+        },
+        "/session/list": {"get": {"parameters": [{"name": "status", "in": "query"}]}},
+        "/session/{id}": {
+            "parameters": [{"name": "id", "in": "path", "required": True}],
+            "get": {"operationId": "getSession"},
+        },
+        "/session/{id}/message/{messageId}": {"get": {}},
+    },
+    "parameters": {"PageSize": {"name": "size", "in": "query"}},
+    "definitions": {
+        "Contact": {"properties": {"name": {}, "phone": {}}},
+        "NewSession": {
+            "allOf": [
+                {"$ref": "#/definitions/Contact"},
+                {"properties": {"channel": {}, "tags": {}}},
+            ],
+        },
+    },
+}
+
+OPENAPI_3 = {
+    "openapi": "3.0.1",
+    "info": {"title": "Helena", "version": "2.0"},
+    "servers": [{"url": "https://api.example.com/core/v2"}, {"url": "/core/v2/beta"}],
+    "paths": {
+        "/contact/{contactId}": {
+            "get": {"parameters": [{"name": "contactId", "in": "path", "required": True}]},
+            "put": {
+                "requestBody": {
+                    "content": {"application/json": {"schema": {"$ref": "#/components/schemas/Contact"}}},
+                },
+            },
+        },
+        "/contact/search": {
+            "post": {
+                "requestBody": {"$ref": "#/components/requestBodies/Search"},
+            },
+        },
+        "/webhook": {
+            "post": {"requestBody": {"content": {"application/json": {"schema": {"type": "object"}}}}},
+        },
+    },
+    "components": {
+        "schemas": {
+            "Base": {"properties": {"id": {}}},
+            "Contact": {"allOf": [{"$ref": "#/components/schemas/Base"},
+                                  {"properties": {"name": {}, "email": {}}}]},
+        },
+        "requestBodies": {
+            "Search": {"content": {"application/json": {"schema": {"properties": {"query": {}}}}}},
+        },
+    },
+}
+
+
+@pytest.fixture
+def swagger():
+    return SpecIndex(SWAGGER_2, source="https://docs.example.com/v2/api-docs")
+
+
+@pytest.fixture
+def openapi():
+    return SpecIndex(OPENAPI_3, source="https://docs.example.com/openapi.json")
+
+
+def test_swagger_2_routes_resolve_under_the_base_path(swagger):
+    assert swagger.hosts == {"api.example.com"}
+    assert swagger.base_paths == ["/chat/v1"]
+
+    listed = swagger.check("GET", "https://api.example.com/chat/v1/session?startDate=x&size=50")
+    assert listed["status"] == "documented"
+    assert listed["operation"].operation_id == "listSessions"
+    assert listed["unknown"] == [] and not listed["templated"]
+
+    # The literal route wins over the template that also matches it
+    literal = swagger.check("GET", "/chat/v1/session/list")
+    assert literal["operation"].path == "/session/list" and not literal["templated"]
+    templated = swagger.check("GET", "/chat/v1/session/abc-123/")
+    assert templated["operation"].operation_id == "getSession" and templated["templated"]
+    assert templated["operation"].names("path") == {"id"}
+    assert templated["operation"].required == {"id"}
+
+    nested = swagger.check("GET", "/chat/v1/session/abc/message/42")
+    assert nested["operation"].path == "/session/{id}/message/{messageId}"
+
+    assert swagger.check("GET", "/session")["status"] == "undocumented_route"
+    assert swagger.check("GET", "https://other.example.com/chat/v1/session")["status"] == "not_covered"
+
+
+def test_swagger_2_body_fields_follow_refs_and_all_of(swagger):
+    result = swagger.check("POST", "/chat/v1/session",
+                           json={"name": "Ana", "phone": "1", "channel": "wa", "color": "red"})
+    assert result["operation"].body_fields == {"name", "phone", "channel", "tags"}
+    assert result["unknown"] == ["color"]
+
+
+def test_undocumented_methods_and_params_are_reported(swagger, openapi):
+    assert swagger.check("DELETE", "/chat/v1/session/abc")["status"] == "undocumented_method"
+    assert openapi.check("POST", "/core/v2/contact/7")["status"] == "undocumented_method"
+
+    result = swagger.check("GET", "/chat/v1/session?startDate=x&pageSize=10", params={"sort": "asc"})
+    assert result["status"] == "documented"
+    assert result["unknown"] == ["pageSize", "sort"]
+
+
+def test_openapi_3_servers_and_request_bodies(openapi):
+    assert openapi.hosts == {"api.example.com"}
+    assert openapi.base_paths == ["/core/v2/beta", "/core/v2"]
+
+    contact = openapi.check("PUT", "https://api.example.com/core/v2/contact/7",
+                            json={"id": 7, "email": "a@b.c", "phone": "1"})
+    assert contact["templated"]
+    assert contact["operation"].body_fields == {"id", "name", "email"}
+    assert contact["unknown"] == ["phone"]
+
+    search = openapi.check("POST", "/core/v2/beta/contact/search", json={"query": "x", "limit": 5})
+    assert not search["templated"]
+    assert search["unknown"] == ["limit"]
+
+    # A free-form body accepts any field
+    webhook = openapi.check("POST", "/core/v2/webhook", json={"anything": 1})
+    assert webhook["operation"].body_fields is None and webhook["unknown"] == []
+
+
+def test_cached_spec_loads_offline(workdir):
+    path = str(workdir / "openapi_spec.json")
+    assert load_index(path) is None
+    save_spec(SWAGGER_2, "https://docs.example.com/v2/api-docs", path, hosts=["api.chat.example"])
+    index = load_index(path)
+    assert index is load_index(path)
+    assert index.hosts == {"api.example.com", "api.chat.example"}
+    assert len(index) == 4
+    assert index.check("GET", "https://api.chat.example/chat/v1/session/1")["status"] == "documented"
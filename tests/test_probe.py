@@ -0,0 +1,100 @@
+"""Probe engine against the local mock server: dedup, pacing and grouping."""
+
+import threading
+import time
+
+from resultplus_reports import probe
+from resultplus_reports.mock_server import Faults
+
+AUTH = {"Authorization": "Bearer test-token"}
+
+
+class CountingFaults(Faults):
+    """No faults; records arrival times and the peak of requests in flight."""
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency=latency)
+        self.arrivals = []
+        self.in_flight = 0
+        self.peak = 0
+        self._count_lock = threading.Lock()
+
+    def delay(self):
+        with self._count_lock:
+            self.arrivals.append(time.monotonic())
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            super().delay()
+        finally:
+            with self._count_lock:
+                self.in_flight -= 1
+
+
+def session_url(server):
+    return f"{server.url}/chat/v1/session"
+
+
+def test_dedup_sends_equivalent_probes_once(serve):
+    server = serve(count=50, span_days=1)
+    host_upper = server.url.upper()
+    probes = [
+        probe.Probe("GET", session_url(server), params={"page": 0, "size": 5}, headers=AUTH),
+        probe.Probe("get", f"{session_url(server)}?size=5&page=0", headers=AUTH),
+        probe.Probe("GET", f"{host_upper}/chat/v1/session", params={"size": "5", "page": "0"},
+                    headers=AUTH),
+        probe.Probe("GET", session_url(server), params={"page": 1, "size": 5}, headers=AUTH),
+    ]
+
+    assert len(probe.dedup(probes)) == 2
+    results = probe.run(probes, rate=0)
+
+    assert len(results) == 2
+    assert server.stats["requests"] == 2
+    assert [r["verdict"] for r in results] == ["ok", "ok"]
+
+
+def test_per_host_concurrency_and_rate_are_capped(serve):
+    faults = [CountingFaults(latency=0.05), CountingFaults(latency=0.05)]
+    servers = [serve(count=50, span_days=1, faults=f) for f in faults]
+    probes = [
+        probe.Probe("GET", session_url(server), params={"page": i, "size": 1}, headers=AUTH)
+        for i in range(15) for server in servers
+    ]
+
+    rate = 20
+    started = time.monotonic()
+    results = probe.run(probes, concurrency=3, rate=rate)
+    elapsed = time.monotonic() - started
+
+    assert len(results) == 30
+    assert all(r["verdict"] == "ok" for r in results)
+    for f in faults:
+        assert len(f.arrivals) == 15
+        assert f.peak <= 3
+        # Fixed-rate bucket with burst 1: 15 requests need at least 14 intervals
+        assert f.arrivals[-1] - f.arrivals[0] >= 14 / rate * 0.9
+    # The hosts are paced independently, not one after the other
+    assert elapsed < 2 * 15 / rate
+
+
+def test_results_group_by_response_fingerprint(serve):
+    server = serve(count=50, span_days=1)
+    missing = [probe.Probe("GET", f"{server.url}/chat/v1/{name}", headers=AUTH)
+               for name in ("leads", "contacts", "reports", "export")]
+    unauthorized = [probe.Probe("GET", session_url(server), params={"page": i}) for i in range(3)]
+    pages = [probe.Probe("GET", session_url(server), params={"page": i, "size": 5}, headers=AUTH)
+             for i in range(2)]
+
+    results = probe.run(missing + unauthorized + pages, rate=0, markers=["sess-00000000"])
+    groups = probe.group(results)
+
+    by_verdict = {}
+    for g in groups:
+        by_verdict.setdefault(g["verdict"], []).append(g["count"])
+    assert by_verdict["not_found"] == [4]
+    assert by_verdict["restricted"] == [3]
+    # Different pages are different responses; only page 0 holds the marker
+    assert sorted(by_verdict["match"] + by_verdict["ok"]) == [1, 1]
+    assert [g["count"] for g in groups] == sorted((g["count"] for g in groups), reverse=True)
+    assert sum(g["count"] for g in groups) == len(results) == 9
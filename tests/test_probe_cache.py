@@ -0,0 +1,106 @@
+"""Probe results are grouped by fingerprint and reused only while still valid."""
+
+import time
+
+import pytest
+
+from resultplus_reports.probe_cache import ProbeCache, fingerprint
+
+URL = "https://api.example/chat/v1/session/123"
+
+
+@pytest.fixture
+def cache(workdir):
+    with ProbeCache(str(workdir / "probe_cache.db"), ttl_hours=1) as store:
+        yield store
+
+
+def result(status=404, text="Not Found", url=URL, markers=()):
+    return {
+        "method": "GET", "url": url, "status": status, "bytes": len(text),
+        "fingerprint": fingerprint(status, text, url), "markers": list(markers),
+    }
+
+
+def test_volatile_parts_collapse_to_one_fingerprint():
+    bodies = [
+        ('{"timestamp": "2025-03-01T12:00:00.123Z", "path": "/chat/v1/session/123",'
+         ' "requestId": "0f8fad5b-d9cb-469f-a165-70867728950e"}', URL),
+        ('{"timestamp": "2025-03-02 08:30:59+03:00",  "path": "/chat/v1/session/456",'
+         ' "requestId": "7c9e6679-7425-40de-944b-e07fc1f90ae7"}',
+         "https://api.example/chat/v1/session/456?page=2"),
+        ('{"timestamp": "2024-12-31T23:59:59Z", "path": "/chat/v1/session/789",\n'
+         ' "requestId": "6ba7b810-9dad-11d1-80b4-00c04fd430c8"}',
+         "https://api.example/chat/v1/session/789"),
+    ]
+    fingerprints = {fingerprint(404, text, url) for text, url in bodies}
+    assert len(fingerprints) == 1
+
+    text, url = bodies[0]
+    assert fingerprint(500, text, url) not in fingerprints
+    assert fingerprint(404, text.replace("timestamp", "time"), url) not in fingerprints
+
+
+@pytest.mark.parametrize("status, error", [
+    (429, None), (502, None), (503, None), (504, None), (None, "connection refused"),
+])
+def test_transient_results_are_not_stored(cache, status, error):
+    failed = result(status=status)
+    failed["error"] = error
+    cache.store("key", failed, "Service Unavailable")
+    assert cache.lookup("key") is None
+    assert cache.stats()["results"] == 0
+
+
+def test_lookup_requires_checked_markers_and_a_fresh_result(cache):
+    cache.store("key", result(markers=["Not Found"]), "Not Found",
+                checked=["Not Found", "Incorrect URL"])
+
+    hit = cache.lookup("key", markers=["Incorrect URL"])
+    assert hit["status"] == 404 and hit["markers"] == ["Not Found"]
+    assert cache.lookup("key", markers=["InternalPort"]) is None
+    assert cache.lookup("other") is None
+
+    assert cache.lookup("key", now=time.time() + 3599) is not None
+    assert cache.lookup("key", now=time.time() + 3601) is None
+
+
+def fingerprints_sharing_a_prefix():
+    """Two distinct response bodies whose fingerprints start with the same hex digit."""
+    seen = {}
+    for i in range(100):
+        text = f"body {i}"
+        fp = fingerprint(404, text, URL)
+        if fp[0] in seen:
+            return seen[fp[0]], text
+        seen[fp[0]] = text
+    raise AssertionError("no shared prefix")
+
+
+def test_label_rejects_ambiguous_and_unknown_prefixes(cache):
+    first, second = fingerprints_sharing_a_prefix()
+    cache.store("a", result(text=first), first)
+    cache.store("b", result(text=second), second)
+    fp = fingerprint(404, first, URL)
+
+    with pytest.raises(KeyError):
+        cache.label(fp[0], "routing_error")
+    with pytest.raises(KeyError):
+        cache.label("zz", "routing_error")
+    assert cache.labels() == {}
+
+    assert cache.label(fp[:12].upper(), "routing_error") == fp
+    assert cache.labels() == {fp: "routing_error"}
+
+
+def test_purge_keeps_labelled_fingerprints(cache):
+    cache.store("gateway", result(text="Incorrect URL ... InternalPort"), "Incorrect URL ...")
+    cache.store("missing", result(text="Not Found"), "Not Found")
+    labelled = cache.label(result(text="Incorrect URL ... InternalPort")["fingerprint"],
+                           "routing_error")
+
+    assert cache.purge() == 0  # nothing expired yet
+    assert cache.purge(now=time.time() + 7200) == 2
+    assert cache.stats() == {"results": 0, "fresh": 0, "fingerprints": 1}
+    assert cache.labels() == {labelled: "routing_error"}
+    assert cache.sample(labelled) == "Incorrect URL ..."
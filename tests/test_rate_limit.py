@@ -0,0 +1,128 @@
+"""AIMD pacing, Retry-After pauses and the retry policy for error statuses."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from resultplus_reports import http_client, rate_limit
+from resultplus_reports.mock_server import SESSION_PATH, Faults
+from resultplus_reports.rate_limit import RateController
+
+
+class FakeClock:
+    """Stands in for the `time` module: `sleep()` advances `monotonic()`."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_rate_rises_on_success_and_drops_under_pressure(clock):
+    controller = RateController(rate=4, min_rate=1, max_rate=5, target_latency=2)
+    for _ in range(5):
+        controller.record(200, latency=0.1)
+    assert controller.rate == pytest.approx(4.5)
+    for _ in range(20):
+        controller.record(200, latency=0.1)
+    assert controller.rate == 5
+
+    controller.record(429)
+    assert controller.rate == pytest.approx(2.5)
+    controller.record(200, latency=3)  # slower than the target latency
+    assert controller.rate == pytest.approx(2.0)
+    controller.record(None)  # transport error
+    assert controller.rate == pytest.approx(1.0)
+    for status in (503, 502, 504):
+        controller.record(status)
+    assert controller.rate == 1
+
+    controller.record(500)  # neither success nor backpressure
+    controller.record(404)
+    assert controller.rate == pytest.approx(1.1)
+
+
+def test_acquire_paces_at_the_current_rate(clock):
+    controller = RateController(rate=2, min_rate=1, max_rate=5, burst=2)
+    started = clock.now
+    for _ in range(6):
+        controller.acquire()
+    # Two requests from the burst, then one every 0.5s
+    assert clock.now - started == pytest.approx(2.0)
+
+
+def test_retry_after_blocks_acquire(clock):
+    controller = RateController(rate=10, min_rate=1, max_rate=20, burst=5)
+    controller.acquire()
+    controller.record(429, latency=0.1, retry_after=5)
+    started = clock.now
+    controller.acquire()
+    assert clock.now - started >= 5
+
+    # A shorter Retry-After never shortens a pause already in force
+    controller.record(429, retry_after=10)
+    controller.record(429, retry_after=1)
+    started = clock.now
+    controller.acquire()
+    assert clock.now - started >= 10
+
+
+def test_parse_retry_after():
+    now = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+    assert rate_limit.parse_retry_after("7") == 7.0
+    assert rate_limit.parse_retry_after("Sat, 01 Mar 2025 12:00:30 GMT", now=now) == 30.0
+    assert rate_limit.parse_retry_after("Sat, 01 Mar 2025 11:00:00 GMT", now=now) == 0.0
+    assert rate_limit.parse_retry_after("soon") is None
+    assert rate_limit.parse_retry_after(None) is None
+
+
+def test_each_host_and_scope_gets_its_own_controller(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_controllers", {})
+    monkeypatch.setattr(rate_limit, "_scope_limits", {})
+    get = rate_limit.get_controller
+
+    shared = get("http://api.example/chat/v1/session")
+    assert get("http://api.example/other?page=2") is shared
+    assert get("https://api.example/chat/v1/session") is not shared
+    assert get("http://api.example:8080/chat/v1/session") is not shared
+
+    rate_limit.configure("acme", rate=7, max_rate=9)
+    acme = get("http://api.example/chat/v1/session", scope="acme")
+    assert acme is not shared
+    assert acme is get("http://api.example/x", scope="acme")
+    assert (acme.rate, acme.max_rate) == (7, 9)
+    assert get("http://api.example/x", scope="globex") not in (shared, acme)
+
+    # Reconfiguring a scope replaces its controllers
+    rate_limit.configure("acme", rate=3)
+    assert get("http://api.example/x", scope="acme").rate == 3
+
+
+@pytest.mark.parametrize("status, retried", [
+    (429, True), (502, True), (503, True), (504, True), (500, False),
+])
+def test_error_statuses_are_retried_selectively(serve, account, monkeypatch, status, retried):
+    monkeypatch.setattr(rate_limit, "BACKOFF_BASE", 0.001)
+    if status == 429:
+        faults = Faults(throttle_rate=1.0, retry_after=0)
+    else:
+        faults = Faults(error_rate=1.0, error_status=status)
+    server = serve(count=10, faults=faults)
+    acct = account(server)
+
+    response = http_client.get(
+        acct.url(SESSION_PATH), headers=acct.headers(), retries=2, rate_scope=acct.rate_scope
+    )
+    assert response.status_code == status
+    assert server.stats["requests"] == (3 if retried else 1)
@@ -0,0 +1,130 @@
+"""GET responses are served from the on-disk cache only when that is safe."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from resultplus_reports import http_client, response_cache
+from resultplus_reports.http_client import Account
+from resultplus_reports.mock_server import SESSION_PATH
+from resultplus_reports.response_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def cache(workdir, monkeypatch):
+    """Turns the response cache on, backed by a file in the test directory."""
+    store = ResponseCache(str(workdir / "http_cache.db"))
+    monkeypatch.setattr(response_cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "_cache", store)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def sent_headers(monkeypatch):
+    """Records the headers of every request that reaches the transport."""
+    sent = []
+    send = http_client._send
+
+    def recording_send(session, method, url, timeout, kwargs):
+        sent.append(dict(kwargs.get("headers") or {}))
+        return send(session, method, url, timeout, kwargs)
+
+    monkeypatch.setattr(http_client, "_send", recording_send)
+    return sent
+
+
+def iso(dt):
+    return dt.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def get_page(account, params, **kwargs):
+    return http_client.get(
+        account.url(SESSION_PATH), params=params, headers=account.headers(),
+        rate_scope=account.rate_scope, **kwargs,
+    )
+
+
+def historical_params():
+    now = datetime.now(timezone.utc)
+    return {"startDate": iso(now - timedelta(days=20)), "endDate": iso(now - timedelta(days=10))}
+
+
+def test_historical_page_is_served_from_disk(serve, account, cache):
+    server = serve(count=300, span_days=30)
+    acct = account(server)
+    params = historical_params()
+    first = get_page(acct, params)
+    assert first.status_code == 200 and first.json()["items"]
+    assert cache.stats()["immutable"] == 1
+
+    again = get_page(acct, params)
+    assert server.stats["requests"] == 1
+    assert again.from_cache
+    assert again.content == first.content
+
+
+def test_recent_page_is_revalidated(serve, account, cache, sent_headers):
+    server = serve(count=300, span_days=7)
+    acct = account(server)
+    first = get_page(acct, {"page": 0})
+    assert not cache.stats()["immutable"]
+    assert "If-None-Match" not in sent_headers[0]
+
+    again = get_page(acct, {"page": 0})
+    assert sent_headers[1]["If-None-Match"] == first.headers["ETag"]
+    assert sent_headers[1]["If-Modified-Since"] == first.headers["Last-Modified"]
+    assert server.stats["requests"] == 2
+    assert server.stats["304"] == 1
+    assert again.status_code == 200 and again.from_cache
+    assert again.content == first.content
+
+
+def test_tokens_never_share_entries(serve, account, cache):
+    server = serve(count=300, span_days=30)
+    first = account(server, scope="scope-a")
+    other = Account(server.url, "other-token", rate_scope="scope-b")
+    params = historical_params()
+    get_page(first, params)
+    response = get_page(other, params)
+    assert not getattr(response, "from_cache", False)
+    assert server.stats["requests"] == 2
+    assert cache.stats()["entries"] == 2
+
+    url = first.url(SESSION_PATH)
+    keys = {
+        cache_key("GET", url, headers=first.headers()),
+        cache_key("GET", url, headers=other.headers()),
+        cache_key("GET", url, headers=first.headers(accept="text/html")),
+        cache_key("GET", url),
+    }
+    assert len(keys) == 4
+
+
+def test_lru_eviction_keeps_the_size_bound(workdir):
+    with ResponseCache(str(workdir / "lru.db"), max_bytes=1000) as store:
+        for i in range(3):
+            store.store(f"k{i}", "url", {}, b"x" * 300, immutable=True)
+        store.lookup("k0")  # k1 is now the least recently used
+        store.store("k3", "url", {}, b"x" * 300, immutable=True)
+
+        assert store.stats()["bytes"] <= 1000
+        assert store.lookup("k1") is None
+        assert all(store.lookup(key) for key in ("k0", "k2", "k3"))
+        stored = store.conn.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+        assert store.stats()["bytes"] == stored
+
+        # Entries that could never be reused, or larger than the bound, are skipped
+        store.store("mutable", "url", {}, b"x", immutable=False)
+        store.store("huge", "url", {}, b"x" * 2000, immutable=True)
+        assert store.lookup("mutable") is None and store.lookup("huge") is None
+
+
+def test_cache_false_skips_the_store(serve, account, cache):
+    server = serve(count=300, span_days=30)
+    acct = account(server)
+    params = historical_params()
+    for _ in range(2):
+        assert get_page(acct, params, cache=False).status_code == 200
+    assert server.stats["requests"] == 2
+    assert cache.stats()["entries"] == 0
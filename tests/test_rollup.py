@@ -0,0 +1,119 @@
+"""The NumPy rollup agrees with the pure-Python fallback, DST days included."""
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from resultplus_reports import rollup
+from resultplus_reports.lead import Lead
+from resultplus_reports.watermark import parse_timestamp
+
+np = pytest.importorskip("numpy")
+
+ZONES = ("UTC", "America/Sao_Paulo", "America/New_York")
+
+# Days around DST transitions (Brazil last observed DST in 2018/19)
+DST_DAYS = (
+    "2018-11-04",  # Sao Paulo springs forward at midnight
+    "2019-02-16",  # Sao Paulo falls back at midnight, into the 17th
+    "2025-03-09",  # New York springs forward
+    "2025-11-02",  # New York falls back
+)
+
+DIMENSION_SETS = (
+    ("day", "hour"),
+    ("day", "hour", "status"),
+    ("status", "week"),
+    ("month", "status"),
+    ("hour",),
+)
+
+
+def leads_around(day):
+    """Leads every 7 minutes over the three days around `day`, mixed formats."""
+    start = datetime.fromisoformat(day).replace(tzinfo=timezone.utc) - timedelta(days=1)
+    records = []
+    for i in range(3 * 24 * 60 // 7):
+        created = start + timedelta(minutes=7 * i, seconds=i % 60, milliseconds=i % 1000)
+        if i % 3 == 0:
+            stamp = created.astimezone(timezone(timedelta(hours=-3))).isoformat()
+        else:
+            stamp = created.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        records.append({"criado_em": stamp, "status": ("OPEN", "CLOSED", None)[i % 3]})
+    return records
+
+
+@pytest.mark.parametrize("zone", ZONES)
+@pytest.mark.parametrize("day", DST_DAYS)
+def test_numpy_and_python_paths_agree(zone, day):
+    tz = ZoneInfo(zone)
+    records = leads_around(day)
+    records += [{"criado_em": "garbage", "status": "OPEN"}, {"criado_em": None}]
+    leads = [Lead.from_record(r) for r in records[:-2]]
+    for by in DIMENSION_SETS:
+        expected = rollup._rollup_python(records, by, tz)
+        assert sum(expected.values()) == len(records) - 2
+        assert list(rollup.rollup(records, by=by, tz=tz).items()) == list(expected.items())
+        assert rollup.rollup(leads, by=by, tz=tz) == rollup._rollup_python(leads, by, tz)
+
+
+@pytest.mark.parametrize("zone", ZONES)
+def test_bucket_rollups_agree(zone, monkeypatch):
+    tz = ZoneInfo(zone)
+    start = int(datetime(2025, 3, 8, tzinfo=timezone.utc).timestamp())
+    buckets = [(start + h * 3600, ("OPEN", None)[h % 2], h % 5 + 1) for h in range(72)]
+    vectorized = rollup.rollup_buckets(buckets, by=("day", "hour", "status"), tz=tz)
+    monkeypatch.setattr(rollup, "np", None)
+    assert rollup.rollup_buckets(buckets, by=("day", "hour", "status"), tz=tz) == vectorized
+
+
+def test_dst_day_hours_follow_the_local_clock():
+    counts = rollup.rollup(leads_around("2025-03-09"), by=("day", "hour"),
+                           tz=ZoneInfo("America/New_York"))
+    hours = [hour for (day, hour) in counts if day == "2025-03-09"]
+    assert "02:00" not in hours  # skipped when the clocks spring forward
+    assert len(hours) == 23
+
+
+VALID = (
+    "2025-03-01T12:34:56Z",
+    "2025-03-01T12:34:56.7Z",
+    "2025-03-01T12:34:56.789123Z",
+    "2025-03-01T12:34:56",
+    "2025-03-01T12:34:56.789",
+    "2025-03-01T12:34:56-03:00",
+    "2025-03-01T12:34:56.789+05:30",
+    "2024-02-29T23:59:59Z",
+)
+
+INVALID = (
+    None,
+    "",
+    "garbage",
+    "2025-03-01",
+    "2025-03-01 12:34:56Z",
+    "2025-03-01T12:34:56junk",
+    "2025-03-01T12:34:56.Z",
+    "2025-03-01T12:34:56+0300",  # offsets need a colon
+    "2025-03-01T12:34:56.789-0300",
+    "2025-03-01T12:34:56+05:3x",
+    "2025-13-01T00:00:00Z",
+    "2025-04-31T00:00:00Z",
+    "2025-02-29T00:00:00Z",
+    "2025-03-01T24:00:00Z",
+    "2025-03-01T12:60:00Z",
+)
+
+
+def test_parse_epochs_matches_the_exact_parser():
+    epochs, valid = rollup.parse_epochs(list(VALID))
+    assert valid.all()
+    assert epochs.tolist() == [int(parse_timestamp(v).timestamp()) for v in VALID]
+
+
+def test_parse_epochs_flags_invalid_timestamps():
+    values = [VALID[0], *INVALID]
+    epochs, valid = rollup.parse_epochs(values)
+    assert valid.tolist() == [True] + [False] * len(INVALID)
+    assert (epochs[1:] == -1).all()
@@ -0,0 +1,98 @@
+"""The sent-ID store dedups batches, expires old IDs and serialises runs."""
+
+import json
+import threading
+import time
+
+import pytest
+
+from resultplus_reports.lead import Lead
+from resultplus_reports.mock_server import SyntheticDataset
+from resultplus_reports.sent_store import SentStore, fcntl
+
+DAY = 86400
+
+
+def make_leads(count):
+    dataset = SyntheticDataset(count, span_days=1)
+    return [Lead.from_session(dataset.session(i)) for i in range(count)]
+
+
+def test_filter_new_and_contains_many_on_a_batch(workdir):
+    leads = make_leads(1200)  # more than one IN (...) batch
+    with SentStore() as store:
+        store.mark_sent(lead.id for lead in leads[::2])
+        sent = {lead.id for lead in leads[::2]}
+        assert store.contains_many(lead.id for lead in leads) == sent
+
+        # Unsent leads keep their order and a repeated id is kept once
+        batch = leads + leads[1:4]
+        new = store.filter_new(batch)
+        assert [lead.id for lead in new] == [lead.id for lead in leads[1::2]]
+        assert len(store) == 600
+
+
+def test_expire_and_compact_honour_retention_days(workdir):
+    now = int(time.time())
+    with SentStore(retention_days=3) as store:
+        store.mark_sent(["old"], sent_at=now - 4 * DAY)
+        store.mark_sent(["recent"], sent_at=now - 2 * DAY)
+        store.mark_sent(["older"], sent_at=now - 10 * DAY)
+        assert store.expire() == 2
+        assert store.contains_many(["old", "recent", "older"]) == {"recent"}
+
+        store.mark_sent(["stale"], sent_at=now - 5 * DAY)
+        assert store.expire(retention_days=7) == 0
+        assert store.compact() == 1
+        assert store.contains_many(["recent", "stale"]) == {"recent"}
+
+
+def test_entering_the_store_expires_old_ids(workdir):
+    store = SentStore(retention_days=1)
+    store.mark_sent(["old"], sent_at=int(time.time()) - 2 * DAY)
+    store.close()
+    with SentStore(retention_days=1) as store:
+        assert len(store) == 0
+
+
+def test_migrate_legacy_imports_ids_and_renames_the_file(workdir):
+    (workdir / "sent.json").write_text(json.dumps(["a", "b", "c"]))
+    with SentStore() as store:
+        assert store.contains_many(["a", "b", "c", "d"]) == {"a", "b", "c"}
+    assert not (workdir / "sent.json").exists()
+    assert json.loads((workdir / "sent.json.migrated").read_text()) == ["a", "b", "c"]
+
+    # Already migrated: nothing left to import
+    with SentStore() as store:
+        assert store.migrate_legacy() == 0
+        assert len(store) == 3
+
+
+def test_malformed_legacy_file_is_set_aside(workdir):
+    (workdir / "sent.json").write_text('["a", "b"')
+    with SentStore() as store:
+        assert len(store) == 0
+    assert not (workdir / "sent.json").exists()
+    assert (workdir / "sent.json.migrated").read_text() == '["a", "b"'
+
+
+@pytest.mark.skipif(fcntl is None, reason="file locking needs fcntl")
+def test_overlapping_runs_serialise_on_the_lock(workdir):
+    events = []
+    first_entered = threading.Event()
+
+    def second_run():
+        first_entered.wait()
+        with SentStore() as store:
+            events.append("second entered")
+            assert store.contains_many(["x"]) == {"x"}
+
+    thread = threading.Thread(target=second_run)
+    thread.start()
+    with SentStore() as store:
+        first_entered.set()
+        time.sleep(0.2)  # the second run is blocked on the lock meanwhile
+        store.mark_sent(["x"])
+        events.append("first done")
+    thread.join(timeout=10)
+    assert events == ["first done", "second entered"]
@@ -0,0 +1,83 @@
+"""Tenants share one worker pool but never a watermark, database or failure."""
+
+from datetime import datetime, timedelta, timezone
+
+from resultplus_reports import tenants
+from resultplus_reports.fetch_result import LeadExport
+from resultplus_reports.lead_store import LeadStore
+from resultplus_reports.mock_server import Faults
+from resultplus_reports.tenants import Tenant
+from resultplus_reports.watermark import load_watermark
+
+FAST = {"rate": 500, "min_rate": 100, "max_rate": 1000, "burst": 50}
+
+
+def make_tenant(name, server):
+    return Tenant(name, base_url=server.url, token=f"{name}-token", rate_limits=FAST)
+
+
+def test_tenants_are_fetched_round_robin_into_their_own_state(serve, workdir, monkeypatch):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    big = serve(count=500, span_days=2, newest=now - timedelta(hours=1))
+    small = serve(count=100, span_days=2, newest=now - timedelta(hours=2))
+    broken = serve(count=100, span_days=2, faults=Faults(error_rate=1.0, error_status=500))
+    registry = [make_tenant("big", big), make_tenant("small", small),
+                make_tenant("broken", broken)]
+
+    turns = []
+    advance = tenants._advance
+
+    def recording_advance(job, quantum):
+        turns.append(job.tenant.name)
+        return advance(job, quantum)
+
+    monkeypatch.setattr(tenants, "_advance", recording_advance)
+    results = tenants.fetch_tenants(registry, workers=1, quantum=1)
+
+    # One page per turn, tenants taking turns until each is done
+    assert turns[:7] == ["big", "small", "broken", "big", "small", "big", "small"]
+    assert turns[7:] == ["big"] * (len(turns) - 7)
+    assert results["big"]["turns"] == turns.count("big") > results["small"]["turns"]
+
+    assert results["broken"]["error"] and results["broken"]["count"] == 0
+    assert load_watermark(registry[2].watermark_file) is None
+
+    for tenant, server, count, newest in ((registry[0], big, 500, now - timedelta(hours=1)),
+                                          (registry[1], small, 100, now - timedelta(hours=2))):
+        result = results[tenant.name]
+        assert result["error"] is None
+        assert result["count"] == count
+        assert result["file"].startswith(tenant.directory)
+        assert load_watermark(tenant.watermark_file) == newest
+        with LeadStore(tenant.lead_db_file) as store:
+            assert store.count_range() == count
+        # A page per turn; the last turn finds the end of the data
+        assert server.stats["requests"] == result["turns"] == result["pages"] + 1
+
+
+def test_a_tenant_that_cannot_start_closes_its_export(serve, workdir, monkeypatch):
+    server = serve(count=100, span_days=2)
+    registry = [make_tenant("ok", server), make_tenant("broken", server)]
+
+    exits = []
+
+    class RecordingExport(LeadExport):
+        def __exit__(self, exc_type, exc, tb):
+            exits.append((self.lead_db_file, exc_type))
+            return super().__exit__(exc_type, exc, tb)
+
+    iter_lead_pages = tenants.iter_lead_pages
+
+    def failing_pages(*args, account=None, **kwargs):
+        if account.rate_scope == "broken":
+            raise ValueError("bad window")
+        return iter_lead_pages(*args, account=account, **kwargs)
+
+    monkeypatch.setattr(tenants, "LeadExport", RecordingExport)
+    monkeypatch.setattr(tenants, "iter_lead_pages", failing_pages)
+    results = tenants.fetch_tenants(registry, workers=2)
+
+    assert results["broken"]["error"] == "bad window"
+    assert results["ok"]["error"] is None and results["ok"]["count"] == 100
+    assert (registry[1].lead_db_file, ValueError) in exits
+    assert (registry[0].lead_db_file, None) in exits
@@ -0,0 +1,88 @@
+"""Sessions created at exactly the watermark instant are not lost or duplicated."""
+
+from datetime import datetime, timedelta, timezone
+
+from resultplus_reports.fetch_result import fetch_helena_sessions
+from resultplus_reports.lead_writer import iter_lead_file
+from resultplus_reports.mock_server import SyntheticDataset
+
+PAGE_SIZE = 2
+
+
+class FixedDataset:
+    """Serves a fixed list of sessions (newest first) in pages of `PAGE_SIZE`."""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+
+    def page(self, start=None, end=None, page=0, size=None, ascending=False):
+        items = self.sessions[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+        return {
+            "items": items,
+            "page": page,
+            "size": PAGE_SIZE,
+            "totalItems": len(self.sessions),
+            "hasMorePages": (page + 1) * PAGE_SIZE < len(self.sessions),
+        }
+
+
+def make_session(id, created):
+    session = dict(SyntheticDataset(1).session(0), id=id)
+    session["createdAt"] = session["updatedAt"] = (
+        created.isoformat(timespec="milliseconds").replace("+00:00", "Z"))
+    return session
+
+
+def fetch(server, account):
+    summary = fetch_helena_sessions(output_format="ndjson", account=account(server))
+    return summary["count"], summary["file"]
+
+
+def test_sessions_at_the_watermark_are_kept_once(serve, account, workdir):
+    now = datetime.now(timezone.utc).replace(microsecond=500000)
+    hour = timedelta(hours=1)
+    boundary = now - hour
+    older = [make_session(f"old-{i}", boundary - (i + 1) * hour) for i in range(3)]
+    saved = make_session("saved", boundary)
+
+    server = serve(count=0)
+    server.dataset = FixedDataset([saved] + older)
+    assert fetch(server, account)[0] == 4
+
+    # "late" shares the watermark's timestamp but shows up after the first run,
+    # on the page after the one that reaches the watermark
+    late = make_session("late", boundary)
+    newer = make_session("newer", boundary + timedelta(seconds=1))
+    server.dataset = FixedDataset([newer, saved, late] + older)
+    count, path = fetch(server, account)
+    assert count == 2
+
+    assert fetch(server, account)[0] == 0
+    ids = [record["id"] for record in iter_lead_file(path)]
+    assert sorted(ids) == sorted(["newer", "saved", "late", "old-0", "old-1", "old-2"])
+
+
+def test_missing_watermark_resumes_from_the_lead_database(serve, account, workdir):
+    now = datetime.now(timezone.utc).replace(microsecond=500000)
+    hour = timedelta(hours=1)
+    boundary = now - hour
+    older = [make_session(f"old-{i}", boundary - (i + 1) * hour) for i in range(3)]
+    saved = make_session("saved", boundary)
+
+    server = serve(count=0)
+    server.dataset = FixedDataset([saved] + older)
+    assert fetch(server, account)[0] == 4
+    (workdir / "watermark.json").unlink()
+
+    late = make_session("late", boundary)
+    newer = make_session("newer", boundary + timedelta(seconds=1))
+    server.dataset = FixedDataset([newer, saved, late] + older)
+    requests = server.stats["requests"]
+    count, path = fetch(server, account)
+    assert count == 2
+    # Stopped at the stored leads instead of refetching the whole window
+    assert server.stats["requests"] - requests == 2
+
+    ids = [record["id"] for record in iter_lead_file(path)]
+    assert sorted(ids) == sorted(["newer", "saved", "late", "old-0", "old-1", "old-2"])
+    assert (workdir / "watermark.json").exists()